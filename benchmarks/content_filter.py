@@ -0,0 +1,73 @@
+"""
+Filtro de palavras: varredura antiga (any(w in texto)) vs lista compilada.
+
+Mede µs por chamada com os campos de um formulário típico e com um texto
+longo, na lista padrão e numa lista grande (--words entradas sintéticas).
+
+    python -m benchmarks.content_filter --words 2000
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "coracao_solidario.settings")
+
+# as duas listas/funções como eram antes da unificação
+OLD_SECURITY = {"matar", "suic", "bomba", "arma", "odio", "naz", "estupr", "vaga de emprego", "pix grátis", "golpe"}
+OLD_VALIDATORS = {
+    "puta", "viado", "bicha", "arrombado", "caralho", "porra", "desgraça", "idiota", "retardado",
+    "macaco", "nazista", "estupro", "matar", "suicida", "biscate", "lixo",
+}
+
+
+def old_scan(words):
+    def contains(*fields):
+        text = " ".join([f or "" for f in fields]).lower()
+        return any(w in text for w in words)
+    return contains
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--words", type=int, default=2000)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    import django
+
+    django.setup()
+    from core.utils.content_filter import DEFAULT_WORDS, ContentFilter
+
+    rnd = random.Random(7)
+    synthetic = ["".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(5, 10))) for _ in range(args.words)]
+    form = ("Maria Aparecida dos Santos", "BASICO", "(15) 99123-4567")
+    long_text = (" ".join(form) + " ") * 40
+
+    cases = {
+        "formulário": form,
+        f"texto longo ({len(long_text)} chars)": (long_text,),
+    }
+    lists = {
+        "lista padrão": (old_scan(OLD_SECURITY | OLD_VALIDATORS), ContentFilter(DEFAULT_WORDS).contains),
+        f"lista com {args.words}": (
+            old_scan(OLD_SECURITY | OLD_VALIDATORS | set(synthetic)),
+            ContentFilter(DEFAULT_WORDS + tuple(synthetic)).contains,
+        ),
+    }
+
+    print(f"{'caso':44} {'antigo (µs)':>12} {'compilado (µs)':>15}")
+    for list_name, (old, new) in lists.items():
+        for case_name, fields in cases.items():
+            number = args.number if "longo" not in case_name else args.number // 10
+            t_old = timeit.timeit(lambda: old(*fields), number=number) / number * 1e6
+            t_new = timeit.timeit(lambda: new(*fields), number=number) / number * 1e6
+            print(f"{list_name + ' / ' + case_name:44} {t_old:12.2f} {t_new:15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+manage.py import_registrations com N linhas (meio doadoras, meio receptoras).
+
+Gera os CSVs num diretório temporário, importa num banco SQLite temporário
+e mede o total, incluindo o pareamento no final. Não toca no db.sqlite3.
+
+    python -m benchmarks.import_registrations --rows 100000
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "coracao_solidario.settings")
+
+from benchmarks.indexes import setup_django  # noqa: E402
+
+KITS = ("Kit Básico", "alergia")
+
+
+def write_csv(path, header, rows):
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--posts", type=int, default=50)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    args = parser.parse_args()
+    half = args.rows // 2
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, "bench.sqlite3"))
+        from django.core.management import call_command
+
+        call_command("migrate", verbosity=0)
+
+        posts = os.path.join(tmp, "postos.csv")
+        write_csv(posts, ["name", "city", "type"], [(f"Posto {i}", "Sorocaba", "ubs") for i in range(args.posts)])
+        donors = os.path.join(tmp, "doadoras.csv")
+        write_csv(donors, ["nome", "whatsapp", "kit", "posto"], [
+            (f"Doadora {i}", f"(15) 9{i:08d}"[:16], KITS[i % 2], f"Posto {i % args.posts}") for i in range(half)
+        ])
+        receivers = os.path.join(tmp, "receptoras.csv")
+        write_csv(receivers, ["nome", "whatsapp", "cidade", "bairro", "kit", "posto"], [
+            (f"Receptora {i}", f"+55 (16) 9{i:08d}", "Sorocaba", "Centro", KITS[i % 2], f"Posto {i % args.posts}")
+            for i in range(half)
+        ])
+
+        call_command("import_registrations", posts, kind="post", stdout=StringIO())
+        total = time.perf_counter()
+        for kind, path in (("donor", donors), ("receiver", receivers)):
+            out = StringIO()
+            call_command("import_registrations", path, kind=kind, chunk_size=args.chunk_size, stdout=out)
+            print(f"{kind:9} {out.getvalue().strip()}")
+        print(f"\n{args.rows} linhas em {time.perf_counter() - total:.1f}s (com pareamento)")
+
+
+if __name__ == "__main__":
+    main()
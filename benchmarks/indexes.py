@@ -0,0 +1,129 @@
+"""
+Tempo das queries quentes de matching/dedupe antes e depois da 0007.
+
+Cria um banco SQLite temporário, migra até a 0006, popula com N receptoras
+(padrão 1M), mede, aplica a 0007 e mede de novo. Não toca no db.sqlite3.
+
+    python -m benchmarks.indexes --receivers 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "coracao_solidario.settings")
+
+KITS = ("BASICO", "ALERGIA")
+
+
+def setup_django(db_path):
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = db_path
+    import django
+
+    django.setup()
+
+
+def seed(receivers, posts, matches):
+    from django.db import connection, transaction
+
+    now = "2026-01-01 00:00:00"
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.executemany(
+            "INSERT INTO core_referencepost (name, city, neighborhood_coverage, can_receive_donations,"
+            " public, contact_name, contact_phone, type) VALUES (?, 'Sorocaba', '-', 1, 1, '-', '-', 'ubs')",
+            [(f"Posto {i}",) for i in range(posts)],
+        )
+        batch = []
+        for i in range(receivers):
+            batch.append((
+                f"Receptora {i}", f"+55159{i:08d}", KITS[i % 2], 1 + i % posts,
+                f"2026-01-01 00:{(i // 60000) % 60:02d}:{(i // 1000) % 60:02d}.{i % 1000:06d}",
+                i % 10 != 0,
+            ))
+            if len(batch) == 50_000:
+                cur.executemany(
+                    "INSERT INTO core_receiver (name, whatsapp, city, neighborhood, needed_kit, reference_post_id,"
+                    " is_breast_cancer_patient, created_at, active) VALUES (?, ?, 'Sorocaba', 'Centro', ?, ?, 0, ?, ?)",
+                    batch,
+                )
+                batch = []
+        if batch:
+            cur.executemany(
+                "INSERT INTO core_receiver (name, whatsapp, city, neighborhood, needed_kit, reference_post_id,"
+                " is_breast_cancer_patient, created_at, active) VALUES (?, ?, 'Sorocaba', 'Centro', ?, ?, 0, ?, ?)",
+                batch,
+            )
+        cur.executemany(
+            "INSERT INTO core_donor (name, whatsapp, kit_type, active, created_at) VALUES (?, ?, ?, 1, ?)",
+            [(f"Doadora {i}", f"+55158{i:08d}", KITS[i % 2], now) for i in range(matches)],
+        )
+        cur.executemany(
+            "INSERT INTO core_match (donor_id, receiver_id, reference_post_id, pickup_code, is_completed, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            [(i + 1, i + 1, 1 + i % posts, f"CS-{i:08X}", i % 4 != 0, now) for i in range(matches)],
+        )
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def measure(receivers, repeat):
+    from core.models import Match, Receiver
+
+    rnd = random.Random(42)
+
+    def whatsapp_exists():
+        Receiver.objects.filter(whatsapp=f"+55159{rnd.randrange(receivers):08d}", active=True).exists()
+
+    def open_match_exists():
+        Match.objects.filter(receiver_id=rnd.randrange(receivers), is_completed=False).exists()
+
+    return {
+        "whatsapp ativo (dedupe)": timed(whatsapp_exists, repeat),
+        "match em aberto por receptora": timed(open_match_exists, repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--receivers", type=int, default=1_000_000)
+    parser.add_argument("--posts", type=int, default=50)
+    parser.add_argument("--matches", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, "bench.sqlite3"))
+        from django.core.management import call_command
+
+        call_command("migrate", "core", "0006", verbosity=0)
+        start = time.perf_counter()
+        seed(args.receivers, args.posts, args.matches)
+        print(f"seed: {args.receivers} receptoras em {time.perf_counter() - start:.1f}s")
+
+        before = measure(args.receivers, args.repeat)
+        start = time.perf_counter()
+        call_command("migrate", "core", "0007", verbosity=0)
+        print(f"0007 aplicada em {time.perf_counter() - start:.1f}s")
+        after = measure(args.receivers, args.repeat)
+
+    print(f"{'query':34} {'antes (ms)':>12} {'depois (ms)':>12}")
+    for name in before:
+        print(f"{name:34} {before[name]:12.3f} {after[name]:12.3f}")
+
+
+if __name__ == "__main__":
+    main()
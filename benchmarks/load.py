@@ -0,0 +1,367 @@
+"""
+Carga ponta a ponta nos fluxos doar, receber e retirada (conferir/confirmar).
+
+Monta um banco SQLite temporário do tamanho pedido, sobe o app WSGI de
+verdade (todos os middlewares: sessão, CSRF, rate limit, auth) e dispara
+as requisições de N processos x M threads. Por fluxo: latência p50/p95/p99,
+requisições/segundo, erros e queries por requisição. Erro é status
+inesperado ou, na retirada (que responde 200 também quando recusa o
+código), página sem a mensagem de sucesso; esses últimos aparecem também
+em "failed". O resultado vai para
+um JSON (benchmarks/results/ por padrão) e pode ser comparado com um
+anterior (--baseline). Não toca no db.sqlite3 nem no cache/ do projeto.
+
+    python manage.py loadtest --receivers 20000 --requests 200 --processes 2 --threads 4
+    python -m benchmarks.load --flows doar pickup_check --baseline benchmarks/results/anterior.json
+
+O rate limit continua rodando, mas com limites altos: mede o app, não o
+bloqueio.
+"""
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlencode
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "coracao_solidario.settings")
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+HOST = "loadtest"
+POSTS = 20
+CSRF_SECRET = "loadtestloadtestloadtestloadtest"  # 32 caracteres: o formato do cookie csrftoken
+
+# fluxo -> (método, caminho, status esperado, trecho que só a resposta de sucesso traz)
+FLOWS = {
+    "doar": ("POST", "/doar/", 302, None),
+    "receber": ("POST", "/receber/", 302, None),
+    "pickup_check": ("POST", "/pickup/check/", 200, "Código válido.".encode()),
+    "pickup_confirm": ("POST", "/pickup/confirm/", 200, "Retirada confirmada com sucesso".encode()),
+}
+
+
+# ---------------- CLIENTE WSGI ---------------- #
+
+class WSGIClient:
+    """Chama o app WSGI direto, como o gunicorn faria, guardando os cookies (e o corpo em .body)."""
+
+    def __init__(self, app, remote_addr, cookies=None):
+        self.app = app
+        self.remote_addr = remote_addr
+        self.cookies = dict(cookies or {})
+
+    def _start_response(self, status, headers, exc_info=None):
+        self.status = int(status.split(" ", 1)[0])
+        for name, value in headers:
+            if name.lower() == "set-cookie":
+                key, _, rest = value.partition("=")
+                value = rest.split(";", 1)[0]
+                if value in ("", '""'):
+                    self.cookies.pop(key, None)
+                else:
+                    self.cookies[key] = value
+
+    def request(self, method, path, data=None):
+        body = urlencode(data or {}).encode()
+        environ = {
+            "REQUEST_METHOD": method, "PATH_INFO": path, "QUERY_STRING": "",
+            "SERVER_NAME": HOST, "SERVER_PORT": "80", "SERVER_PROTOCOL": "HTTP/1.1",
+            "HTTP_HOST": HOST, "REMOTE_ADDR": self.remote_addr,
+            "HTTP_COOKIE": "; ".join(f"{k}={v}" for k, v in self.cookies.items()),
+            "CONTENT_TYPE": "application/x-www-form-urlencoded", "CONTENT_LENGTH": str(len(body)),
+            "wsgi.version": (1, 0), "wsgi.url_scheme": "http", "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr, "wsgi.multithread": True, "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        response = self.app(environ, self._start_response)
+        try:
+            self.body = b"".join(response)
+        finally:
+            if hasattr(response, "close"):
+                response.close()
+        return self.status
+
+
+# ---------------- BANCO ---------------- #
+
+def prepare_database(receivers, matches):
+    """Migra e popula o banco atual; devolve o cookie de sessão de uma operadora (perfil admin)."""
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.test import Client
+
+    from benchmarks.indexes import seed
+    from core.models import UserProfile
+    from core.services import reports
+
+    call_command("migrate", verbosity=0)
+    seed(receivers, POSTS, matches)
+    reports.rebuild()
+    user = User.objects.create_user("loadtest")
+    UserProfile.objects.filter(user=user).update(role="admin")
+    client = Client()
+    client.force_login(user)
+    return client.cookies["sessionid"].value
+
+
+def _request_data(flow, worker, i, pending):
+    """Corpo do POST da i-ésima requisição do worker (telefones e códigos únicos)."""
+    index = worker * 100_000 + i
+    if flow == "doar":
+        return {"name": f"Doadora {index}", "whatsapp": f"1597{index:07d}",
+                "kit_type": "BASICO", "reference_post": 1 + index % POSTS}
+    if flow == "receber":
+        return {"name": f"Receptora {index}", "whatsapp": f"1596{index:07d}", "city": "Sorocaba",
+                "neighborhood": "Centro", "needed_kit": "BASICO", "reference_post": 1 + index % POSTS}
+    if flow == "pickup_check":
+        return {"pickup_code": f"CS-{random.choice(pending):08X}"}
+    number = pending[i]  # confirmar: cada worker tem a sua fatia de códigos pendentes
+    return {"match_id": number + 1, "pickup_code": f"CS-{number:08X}"}
+
+
+# ---------------- CARGA ---------------- #
+
+def _thread(app, flow, worker, requests, warmup, pending, session_id, samples):
+    from django.db import connection, connections
+
+    method, path, expected, marker = FLOWS[flow]
+    client = WSGIClient(app, f"10.{worker // 65536}.{worker // 256 % 256}.{worker % 256}",
+                        {"sessionid": session_id, "csrftoken": CSRF_SECRET})
+    queries = [0]
+
+    def count(execute, sql, params, many, context):
+        queries[0] += 1
+        return execute(sql, params, many, context)
+
+    try:
+        with connection.execute_wrapper(count):
+            for i in range(warmup + requests):
+                data = _request_data(flow, worker, i, pending)
+                data["csrfmiddlewaretoken"] = CSRF_SECRET
+                queries[0] = 0
+                start = time.perf_counter()
+                status = client.request(method, path, data)
+                if i >= warmup:
+                    failed = status == expected and marker is not None and marker not in client.body
+                    samples.append((time.perf_counter() - start, status, queries[0], failed))
+    finally:
+        connections.close_all()
+
+
+def _process(index, options, pending, session_id, barrier, results):
+    import logging
+
+    from django.core.handlers.wsgi import WSGIHandler
+
+    logging.disable(logging.CRITICAL)  # erro vira contagem, não traceback no meio da tabela
+    app = WSGIHandler()
+    threads_n = options["threads"]
+    per_flow = {}
+    for flow in options["flows"]:
+        if barrier is not None:
+            barrier.wait()
+        samples = []
+        threads = []
+        for t in range(threads_n):
+            worker = index * threads_n + t
+            requests = options["requests"]
+            mine = pending
+            if flow == "pickup_confirm":
+                mine = pending[worker::options["processes"] * threads_n]
+                requests = max(0, min(requests, len(mine) - options["warmup"]))
+            threads.append(threading.Thread(target=_thread, args=(
+                app, flow, worker, requests, options["warmup"], mine, session_id, samples,
+            )))
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        per_flow[flow] = {"start": start, "end": time.time(), "samples": samples}
+    results.put(per_flow)
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))]
+
+
+def summarize(flow, parts):
+    samples = [s for part in parts for s in part["samples"]]
+    elapsed = max(p["end"] for p in parts) - min(p["start"] for p in parts)
+    latencies = sorted(s[0] * 1000 for s in samples)
+    queries = [s[2] for s in samples]
+    statuses = {}
+    for _, status, _, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    n = len(samples)
+    failed = sum(1 for s in samples if s[3])
+    return {
+        "requests": n,
+        "errors": sum(1 for s in samples if s[1] != FLOWS[flow][2]) + failed,
+        "failed": failed,  # status esperado, mas a página recusou (código inválido, já usado...)
+        "statuses": statuses,
+        "throughput_rps": round(n / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50), 2),
+            "p95": round(_percentile(latencies, 95), 2),
+            "p99": round(_percentile(latencies, 99), 2),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        },
+        "queries_per_request": {
+            "mean": round(sum(queries) / n, 2) if n else 0.0,
+            "max": max(queries, default=0),
+        },
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(flows, receivers=20_000, matches=10_000, requests=200, warmup=5, processes=1, threads=4):
+    """Roda a carga num banco temporário e devolve o relatório (dict pronto para JSON)."""
+    import django
+    from django.conf import settings
+    from django.db import connections
+    from django.test.utils import override_settings
+
+    from core.utils import metrics
+
+    if matches > receivers:
+        raise ValueError("--matches não pode passar de --receivers (cada match usa uma receptora semeada).")
+    unknown = set(flows) - set(FLOWS)
+    if unknown:
+        raise ValueError(f"Fluxos desconhecidos: {', '.join(sorted(unknown))} (use {', '.join(FLOWS)}).")
+    options = {"flows": list(flows), "requests": requests, "warmup": warmup, "processes": processes,
+               "threads": threads}
+
+    database = settings.DATABASES["default"]
+    original_name = database["NAME"]
+    with tempfile.TemporaryDirectory() as tmp, override_settings(
+        ALLOWED_HOSTS=[HOST],
+        CACHES={
+            "default": {"BACKEND": "core.utils.two_tier_cache.TwoTierCache", "LOCATION": f"loadtest-{tmp}",
+                        "OPTIONS": {"SHARED": "shared"}},
+            "shared": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                       "LOCATION": os.path.join(tmp, "cache"), "OPTIONS": {"MAX_ENTRIES": 1000}},
+            "pickup": {"BACKEND": "core.utils.two_tier_cache.TwoTierCache", "LOCATION": f"loadtest-pickup-{tmp}",
+                       "OPTIONS": {"SHARED": "pickup_shared"}},
+            "pickup_shared": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                              "LOCATION": os.path.join(tmp, "cache", "pickup"), "OPTIONS": {"MAX_ENTRIES": 1000}},
+        },
+        RATE_LIMIT_STORE={"BACKEND": "core.utils.rate_limit.MemoryStore"},
+        METRICS={**settings.METRICS, "PATH": os.path.join(tmp, "metrics.sqlite3")},
+        RATE_LIMITS={rule: {"algorithm": "sliding_window", "limit": 10**9, "period": 60, "keys": ["ip"]}
+                     for rule in settings.RATE_LIMITS},
+    ):
+        connections.close_all()
+        database["NAME"] = os.path.join(tmp, "load.sqlite3")  # o wrapper lê este mesmo dict ao conectar
+        try:
+            start = time.perf_counter()
+            session_id = prepare_database(receivers, matches)
+            seeded_in = time.perf_counter() - start
+            pending = list(range(0, matches, 4))  # seed: i % 4 == 0 ainda não retirados
+            connections.close_all()  # nada de conexão herdada pelo fork
+
+            if processes == 1:
+                queue = _ListQueue()
+                _process(0, options, pending, session_id, None, queue)
+                parts = queue.items
+            else:
+                context = multiprocessing.get_context("fork")
+                queue = context.Queue()
+                barrier = context.Barrier(processes)
+                workers = [context.Process(target=_process, args=(i, options, pending, session_id, barrier, queue))
+                           for i in range(processes)]
+                for worker in workers:
+                    worker.start()
+                parts = [queue.get() for _ in workers]
+                for worker in workers:
+                    worker.join()
+        finally:
+            connections.close_all()
+            database["NAME"] = original_name
+            metrics.clear()  # o que sobrou na memória não vai para o metrics.sqlite3 do projeto no atexit
+
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "environment": {
+            "python": platform.python_version(), "django": django.get_version(),
+            "sqlite": sqlite3.sqlite_version, "cpus": os.cpu_count(),
+            "conn_max_age": database.get("CONN_MAX_AGE", 0),
+        },
+        "options": {**options, "receivers": receivers, "matches": matches},
+        "seed_seconds": round(seeded_in, 2),
+        "flows": {flow: summarize(flow, [part[flow] for part in parts]) for flow in options["flows"]},
+    }
+
+
+class _ListQueue:
+    """Fila do caso sem fork (um processo só)."""
+
+    def __init__(self):
+        self.items = []
+
+    def put(self, item):
+        self.items.append(item)
+
+
+# ---------------- SAÍDA ---------------- #
+
+def write_report(report, output=None):
+    path = Path(output) if output else RESULTS_DIR / f"{report['started_at'].replace(':', '')}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    return path
+
+
+def format_report(report, baseline=None):
+    lines = [
+        f"{'fluxo':15} {'req':>6} {'erros':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}"
+    ]
+    for flow, r in report["flows"].items():
+        lat = r["latency_ms"]
+        line = (
+            f"{flow:15} {r['requests']:6d} {r['errors']:6d} {r['throughput_rps']:8.1f} "
+            f"{lat['p50']:8.2f} {lat['p95']:8.2f} {lat['p99']:8.2f} {r['queries_per_request']['mean']:8.2f}"
+        )
+        before = (baseline or {}).get("flows", {}).get(flow)
+        if before and before["throughput_rps"] and before["latency_ms"]["p95"]:
+            line += (
+                f"   vs base: {r['throughput_rps'] / before['throughput_rps']:.2f}x req/s,"
+                f" p95 {lat['p95'] / before['latency_ms']['p95']:.2f}x"
+            )
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main():
+    import django
+
+    django.setup()
+    from django.core.management import call_command
+
+    call_command("loadtest", *sys.argv[1:])
+
+
+if __name__ == "__main__":
+    main()
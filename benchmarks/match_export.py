@@ -0,0 +1,49 @@
+"""
+Exportação de matches: tempo e pico de memória em função do tamanho.
+
+    python -m benchmarks.match_export --matches 50000 200000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "coracao_solidario.settings")
+
+from benchmarks.indexes import seed, setup_django  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--matches", type=int, nargs="+", default=[50_000, 200_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, "bench.sqlite3"))
+        from django.core.management import call_command
+
+        from core.models import Match
+        from core.services import match_export
+
+        call_command("migrate", verbosity=0)
+        seed(max(args.matches), 20, max(args.matches))
+        last_ids = {n: Match.objects.order_by("id").values_list("id", flat=True)[n - 1] for n in args.matches}
+
+        print(f"{'matches':>10} {'linhas/s':>12} {'pico (MiB)':>12}")
+        for n in args.matches:
+            queryset = Match.objects.filter(id__lte=last_ids[n])
+            tracemalloc.start()
+            start = time.perf_counter()
+            size = sum(len(block) for block in match_export.iter_export(queryset, "csv"))
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{n:10} {n / elapsed:12.0f} {peak / 2**20:12.1f}   ({size / 2**20:.0f} MiB de CSV)")
+
+
+if __name__ == "__main__":
+    main()
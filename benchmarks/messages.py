@@ -0,0 +1,57 @@
+"""
+Mensagens de match por segundo e pico de memória: instâncias com
+select_related vs render_many() sobre .values().iterator().
+
+    python -m benchmarks.messages --matches 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "coracao_solidario.settings")
+
+from benchmarks.indexes import seed, setup_django  # noqa: E402
+
+
+def run(label, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = sum(1 for _ in fn())
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:34} {count / elapsed:12.0f} {peak / 2**20:12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--matches", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, "bench.sqlite3"))
+        from django.core.management import call_command
+
+        call_command("migrate", verbosity=0)
+        seed(args.matches, 20, args.matches)
+
+        from core.messages import MATCH_NOTIFICATION, render_many
+        from core.models import Match
+        from core.services.match_notify import build_match_message
+
+        def instances():
+            matches = Match.objects.select_related("donor", "receiver", "reference_post")
+            return [build_match_message(match) for match in matches]
+
+        print(f"{'caminho':34} {'msgs/s':>12} {'pico (MiB)':>12}")
+        run("instâncias (select_related)", instances)
+        run("render_many (.values)", lambda: render_many(MATCH_NOTIFICATION, Match.objects.all()))
+
+
+if __name__ == "__main__":
+    main()
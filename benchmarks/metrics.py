@@ -0,0 +1,87 @@
+"""
+Quanto o MetricsMiddleware custa por requisição: GET /doar/ (página em
+cache, o caminho mais curto do site), GET / e uma URL inexistente (404),
+com e sem o middleware, mais o tempo de um flush e de um render do /metrics.
+
+Banco, cache e métricas em diretório temporário; não toca no db.sqlite3.
+
+    python -m benchmarks.metrics --requests 5000
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "coracao_solidario.settings")
+
+from benchmarks.indexes import seed, setup_django  # noqa: E402
+from benchmarks.load import HOST, WSGIClient  # noqa: E402
+
+MIDDLEWARE = "core.utils.metrics.MetricsMiddleware"
+PATHS = ("/doar/", "/", "/nao-existe/")
+
+
+def _per_request(app, path, requests, rounds=5):
+    client = WSGIClient(app, "10.0.0.1")
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(requests):
+            client.request("GET", path)
+        times.append((time.perf_counter() - start) / requests * 1e6)
+    return statistics.median(times), client.status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        from django.conf import settings
+
+        settings.CACHES["shared"]["LOCATION"] = os.path.join(tmp, "cache")
+        settings.METRICS = {**settings.METRICS, "PATH": os.path.join(tmp, "metrics.sqlite3")}
+        settings.ALLOWED_HOSTS = [HOST]
+        setup_django(os.path.join(tmp, "bench.sqlite3"))
+        from django.core.handlers.wsgi import WSGIHandler
+        from django.core.management import call_command
+
+        from core.utils import metrics
+
+        call_command("migrate", verbosity=0)
+        seed(2000, 20, 1000)
+        logging.disable(logging.CRITICAL)  # sem um "Not Found" por requisição do 404
+
+        apps = {}
+        for label, middleware in (
+            ("sem", [m for m in settings.MIDDLEWARE if m != MIDDLEWARE]),
+            ("com", [MIDDLEWARE, *(m for m in settings.MIDDLEWARE if m != MIDDLEWARE)]),
+        ):
+            settings.MIDDLEWARE = middleware
+            apps[label] = WSGIHandler()
+
+        print(f"{args.requests} requisições por rodada, mediana de 5\n")
+        print(f"{'rota':20} {'sem (µs)':>9} {'com (µs)':>9} {'custo (µs)':>11}")
+        for path in PATHS:
+            _per_request(apps["com"], path, 50)  # aquece caches e conexões
+            without, _ = _per_request(apps["sem"], path, args.requests)
+            with_metrics, status = _per_request(apps["com"], path, args.requests)
+            print(f"{path + f' ({status})':20} {without:9.1f} {with_metrics:9.1f} {with_metrics - without:11.1f}")
+
+        start = time.perf_counter()
+        metrics.flush(force=True)
+        flush_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        text = metrics.render()
+        render_ms = (time.perf_counter() - start) * 1000
+        print(f"\nflush: {flush_ms:.2f} ms   render: {render_ms:.2f} ms ({len(text.splitlines())} linhas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Páginas públicas com e sem o cache de página/fragmento (core.utils.page_cache).
+
+    python -m benchmarks.page_cache --posts 200 --requests 2000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "coracao_solidario.settings")
+
+from benchmarks.indexes import seed, setup_django  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, "bench.sqlite3"))
+        from django.conf import settings
+        from django.contrib.messages.storage.fallback import FallbackStorage
+        from django.contrib.sessions.backends.signed_cookies import SessionStore
+        from django.core.management import call_command
+        from django.test import RequestFactory
+
+        from core import views
+
+        call_command("migrate", verbosity=0)
+        seed(0, args.posts, 0)
+        factory = RequestFactory()
+
+        def request(path):
+            req = factory.get(path)
+            req.session = SessionStore()
+            req._messages = FallbackStorage(req)
+            return req
+
+        print(f"{'página':10} {'sem cache (µs)':>15} {'com cache (µs)':>15} {'ganho':>7}")
+        for name, path in (("home", "/"), ("doar", "/doar/"), ("receber", "/receber/"), ("obrigada", "/obrigada/")):
+            view = getattr(views, name)
+            results = []
+            for timeout in (0, 600):
+                settings.PAGE_CACHE_TIMEOUT = timeout
+                view(request(path))  # aquece o template e o cache
+                start = time.perf_counter()
+                for _ in range(args.requests):
+                    view(request(path))
+                results.append((time.perf_counter() - start) / args.requests * 1e6)
+            print(f"{name:10} {results[0]:15.0f} {results[1]:15.0f} {results[0] / results[1]:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
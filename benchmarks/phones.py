@@ -0,0 +1,88 @@
+"""
+Normalização de telefones em lote e busca pelo telefone canônico.
+
+1. telefones/s: normalize_phone_br antigo (uma regex por valor),
+   normalize_phone e normalize_many, em formatos misturados;
+2. tempo da 0011 (preenchimento em lotes de whatsapp_e164) sobre N receptoras;
+3. busca por telefone (ativo ou não): coluna whatsapp sem índice vs
+   whatsapp_e164 indexada.
+
+    python -m benchmarks.phones --receivers 1000000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "coracao_solidario.settings")
+
+from benchmarks.indexes import seed, setup_django, timed  # noqa: E402
+
+
+def old_normalize_phone_br(raw):
+    if not raw:
+        return ""
+    digits = re.sub(r"\D", "", raw)
+    if digits.startswith("55") and len(digits) in (12, 13):
+        digits = digits[2:]
+    if len(digits) not in (10, 11):
+        return ""
+    return digits
+
+
+def sample_phones(count):
+    rnd = random.Random(3)
+    formats = ("({ddd}) 9{a}-{b}", "+55 {ddd} 9{a}{b}", "{ddd}9{a}{b}", "0{ddd} 9{a} {b}", "55{ddd}9{a}-{b}")
+    return [
+        rnd.choice(formats).format(ddd=rnd.randint(11, 99), a=rnd.randint(1000, 9999), b=rnd.randint(1000, 9999))
+        for _ in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--phones", type=int, default=200_000)
+    parser.add_argument("--receivers", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, "bench.sqlite3"))
+        from django.core.management import call_command
+
+        from core.utils.phone import normalize_many, normalize_phone
+
+        phones = sample_phones(args.phones)
+        print(f"{'normalização':34} {'telefones/s':>12}")
+        for name, fn in (
+            ("normalize_phone_br antigo", lambda: [old_normalize_phone_br(p) for p in phones]),
+            ("normalize_phone", lambda: [normalize_phone(p) for p in phones]),
+            ("normalize_many", lambda: normalize_many(phones)),
+        ):
+            start = time.perf_counter()
+            fn()
+            print(f"{name:34} {args.phones / (time.perf_counter() - start):12.0f}")
+
+        call_command("migrate", "core", "0010", verbosity=0)
+        seed(args.receivers, 50, 0)
+        start = time.perf_counter()
+        call_command("migrate", "core", "0011", verbosity=0)
+        print(f"\n0011 em {args.receivers} receptoras: {time.perf_counter() - start:.1f}s")
+
+        from core.models import Receiver
+
+        rnd = random.Random(5)
+        numbers = [f"{rnd.randrange(args.receivers):08d}" for _ in range(args.repeat)]
+        it = iter(numbers * 2)
+        print(f"{'busca por telefone':34} {'ms':>12}")
+        print(f"{'whatsapp (sem índice)':34} {timed(lambda: Receiver.objects.filter(whatsapp='+55159' + next(it)).exists(), args.repeat):12.3f}")
+        print(f"{'whatsapp_e164 (indexada)':34} {timed(lambda: Receiver.objects.filter(whatsapp_e164='+55159' + next(it)).exists(), args.repeat):12.3f}")
+
+
+if __name__ == "__main__":
+    main()
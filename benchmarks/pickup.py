@@ -0,0 +1,83 @@
+"""
+Conferência e confirmação de retirada: antes (select_related + save) e
+depois (core.services.pickup: retrato em cache + UPDATE condicional).
+
+    python -m benchmarks.pickup --matches 200000 --repeat 500
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "coracao_solidario.settings")
+
+from benchmarks.indexes import seed, setup_django, timed  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--matches", type=int, default=200_000)
+    parser.add_argument("--posts", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        from django.conf import settings
+
+        settings.CACHES["shared"]["LOCATION"] = os.path.join(tmp, "cache")
+        settings.CACHES["pickup_shared"]["LOCATION"] = os.path.join(tmp, "cache", "pickup")
+        setup_django(os.path.join(tmp, "bench.sqlite3"))
+        from django.core.management import call_command
+
+        from core.models import Match
+        from core.services import pickup, reports
+
+        call_command("migrate", verbosity=0)
+        start = time.perf_counter()
+        seed(args.matches, args.posts, args.matches)
+        reports.rebuild()
+        print(f"seed: {args.matches} matches em {time.perf_counter() - start:.1f}s")
+
+        rnd = random.Random(42)
+        hot = [f"CS-{i:08X}" for i in rnd.sample(range(args.matches), 200)]
+        # i % 4 == 0: não retirados; o balcão confere (lookup) antes de confirmar
+        pending = [f"CS-{i:08X}" for i in range(0, args.matches, 4)][:2 * args.repeat]
+        for code in hot + pending:
+            pickup.lookup(code)
+        pending = iter(pending)
+
+        def check_before():
+            Match.objects.select_related("donor", "receiver", "reference_post").filter(
+                pickup_code=rnd.choice(hot)
+            ).first()
+
+        def confirm_before():
+            match = Match.objects.select_related("donor", "receiver", "reference_post").filter(
+                pickup_code=next(pending)
+            ).first()
+            if not match.is_completed:
+                match.is_completed = True
+                match.save()
+
+        def confirm_after():
+            pickup.confirm(pickup.lookup(next(pending)))
+
+        results = {
+            "conferir: select_related": timed(check_before, args.repeat),
+            "conferir: lookup (banco + set)": timed(lambda: pickup.lookup(rnd.choice(hot), fresh=True), args.repeat),
+            "conferir: lookup (cache)": timed(lambda: pickup.lookup(rnd.choice(hot)), args.repeat),
+            "confirmar: select_related + save": timed(confirm_before, args.repeat),
+            "confirmar: UPDATE condicional": timed(confirm_after, args.repeat),
+        }
+
+    print(f"{'operação':34} {'mediana (ms)':>13}")
+    for name, ms in results.items():
+        print(f"{name:34} {ms:13.3f}")
+
+
+if __name__ == "__main__":
+    main()
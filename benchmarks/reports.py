@@ -0,0 +1,43 @@
+"""
+Relatório do admin: COUNT/GROUP BY nas tabelas inteiras vs. resumo incremental.
+
+    python -m benchmarks.reports --receivers 1000000 --matches 500000
+"""
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "coracao_solidario.settings")
+
+from benchmarks.indexes import seed, setup_django, timed  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--receivers", type=int, default=1_000_000)
+    parser.add_argument("--matches", type=int, default=500_000)
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, "bench.sqlite3"))
+        from django.core.management import call_command
+
+        from core.services import reports
+
+        call_command("migrate", verbosity=0)
+        seed(args.receivers, args.posts, args.matches)
+        rebuild_ms = timed(reports.rebuild, 1)
+
+        print(f"{args.receivers} receptoras, {args.matches} matches, {args.posts} postos")
+        print(f"  GROUP BY nas tabelas (o que a página fazia) {timed(reports.rollup_counts, args.repeat):10.1f} ms")
+        print(f"  resumo incremental (summary)                {timed(reports.summary, args.repeat):10.1f} ms")
+        print(f"  rebuild_reports (uma vez)                   {rebuild_ms:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Requisições/segundo de POST /doar/ com vários workers escrevendo no mesmo
+SQLite: conexão padrão (antes) e o perfil de produção (depois: WAL,
+synchronous=NORMAL, busy_timeout, mmap/cache_size e CONN_MAX_AGE).
+
+Cada variante roda num banco temporário novo (o journal_mode fica gravado
+no arquivo), com N processos por alguns segundos. Não toca no db.sqlite3.
+
+    python -m benchmarks.sqlite_profile --workers 8 --seconds 10
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "coracao_solidario.settings")
+
+from benchmarks.indexes import seed, setup_django  # noqa: E402
+
+VARIANTS = {
+    "antes": {"CONN_MAX_AGE": 0, "SQLITE_PRAGMAS": {}},
+    "depois": {"CONN_MAX_AGE": 600, "SQLITE_PRAGMAS": None},  # None = o de settings.py
+}
+
+
+def _worker(n, deadline, results):
+    from django.db import connections
+    from django.test import Client
+
+    logging.disable(logging.CRITICAL)  # os 500 viram contagem, não traceback
+    client = Client(raise_request_exception=False, REMOTE_ADDR=f"10.0.0.{n}")
+    ok = failed = 0
+    latencies = []
+    while time.time() < deadline:
+        start = time.perf_counter()
+        response = client.post("/doar/", {
+            "name": f"Doadora {n}-{ok + failed}", "whatsapp": f"159{n:02d}{ok + failed:06d}",
+            "kit_type": "BASICO", "reference_post": 1 + (ok + failed) % 20,
+        })
+        latencies.append(time.perf_counter() - start)
+        if response.status_code == 302:
+            ok += 1
+        else:
+            failed += 1
+    connections.close_all()
+    results.put((ok, failed, latencies))
+
+
+def _run_variant(name, args, results):
+    with tempfile.TemporaryDirectory() as tmp:
+        from django.conf import settings
+
+        variant = VARIANTS[name]
+        settings.DATABASES["default"]["CONN_MAX_AGE"] = variant["CONN_MAX_AGE"]
+        if variant["SQLITE_PRAGMAS"] is not None:
+            settings.SQLITE_PRAGMAS = variant["SQLITE_PRAGMAS"]
+        settings.CACHES["shared"]["LOCATION"] = os.path.join(tmp, "cache")
+        settings.ALLOWED_HOSTS = ["testserver"]
+        settings.RATE_LIMIT_STORE = {"BACKEND": "core.utils.rate_limit.MemoryStore"}
+        settings.METRICS = {**settings.METRICS, "ENABLED": False}
+        settings.RATE_LIMITS = {
+            rule: {"algorithm": "sliding_window", "limit": 10**9, "period": 60, "keys": ["ip"]}
+            for rule in ("form_doar", "form_receber", "form_phone")
+        }
+        setup_django(os.path.join(tmp, "bench.sqlite3"))
+        from django.core.management import call_command
+        from django.db import connection, connections
+
+        call_command("migrate", verbosity=0)
+        seed(args.receivers, 20, 0)
+        with connection.cursor() as cursor:
+            journal = cursor.execute("PRAGMA journal_mode").fetchone()[0]
+        connections.close_all()  # nada de conexão herdada pelo fork
+
+        queue = multiprocessing.Queue()
+        deadline = time.time() + args.seconds
+        workers = [multiprocessing.Process(target=_worker, args=(n, deadline, queue)) for n in range(args.workers)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        outcomes = [queue.get() for _ in workers]
+        elapsed = time.perf_counter() - start
+        for worker in workers:
+            worker.join()
+
+    ok = sum(o[0] for o in outcomes)
+    failed = sum(o[1] for o in outcomes)
+    latencies = sorted(t * 1000 for o in outcomes for t in o[2])
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+    results.put((name, journal, ok / elapsed, failed, statistics.median(latencies) if latencies else 0.0, p95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--receivers", type=int, default=20_000)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    print(f"{args.workers} workers x {args.seconds:.0f}s de POST /doar/\n")
+    print(f"{'variante':9} {'journal':8} {'req/s':>8} {'erros':>6} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+    for name in VARIANTS:
+        # um processo por variante: o django é configurado uma vez em cada
+        process = context.Process(target=_run_variant, args=(name, args, results))
+        process.start()
+        name, journal, rate, failed, p50, p95 = results.get()
+        process.join()
+        print(f"{name:9} {journal:8} {rate:8.0f} {failed:6d} {p50:9.1f} {p95:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Leitura de chave quente: LocMemCache, FileBasedCache sozinho e TwoTierCache.
+
+O valor é o HTML do <select> de postos (core/_post_select.html). Os caches
+ficam num diretório temporário; não toca no cache/ do projeto.
+
+    python -m benchmarks.two_tier_cache --posts 200 --reads 20000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "coracao_solidario.settings")
+
+from benchmarks.indexes import setup_django  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--reads", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        from django.conf import settings
+
+        settings.CACHES = {
+            "default": {
+                "BACKEND": "core.utils.two_tier_cache.TwoTierCache",
+                "OPTIONS": {"SHARED": "shared"},
+            },
+            "shared": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": os.path.join(tmp, "cache"),
+            },
+            "locmem": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        }
+        setup_django(os.path.join(tmp, "bench.sqlite3"))
+        from django.core.cache import caches
+        from django.template.loader import render_to_string
+
+        from core.services.post_catalogue import PostOption
+
+        html = render_to_string("core/_post_select.html", {
+            "reference_posts": [PostOption(i, f"Posto {i}", "Sorocaba") for i in range(args.posts)],
+        })
+        print(f"valor: {len(html)} bytes, {args.reads} leituras\n")
+        print(f"{'backend':28} {'get (µs)':>9} {'versão+get (µs)':>16}")
+        for label, alias in (("LocMemCache", "locmem"), ("FileBasedCache", "shared"), ("TwoTierCache", "default")):
+            backend = caches[alias]
+            backend.set("posts:version", "v1", None)
+            backend.set("posts:v1:select", html)
+            results = []
+            for keys in (("posts:v1:select",), ("posts:version", "posts:v1:select")):
+                start = time.perf_counter()
+                for _ in range(args.reads):
+                    for key in keys:
+                        backend.get(key)
+                results.append((time.perf_counter() - start) / args.reads * 1e6)
+            print(f"{label:28} {results[0]:9.1f} {results[1]:16.1f}")
+        print(f"\nTwoTierCache: {caches['default'].stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Mensagens/segundo dos backends de envio de WhatsApp com 1k e 10k mensagens.
+
+Sobe um provedor HTTP falso local (com latência configurável por requisição)
+e compara o HttpSender sequencial e em paralelo, além do JsonlFileSender.
+
+    python -m benchmarks.whatsapp_senders --latency-ms 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "coracao_solidario.settings")
+
+
+def stub_server(latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            if latency:
+                time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(sender, count):
+    items = [(f"55159910{n:05d}", "✅ Match gerado! Código de retirada: CS-TESTE") for n in range(count)]
+    start = time.perf_counter()
+    results = sender.send_many(items)
+    elapsed = time.perf_counter() - start
+    assert all(r is True for r in results), "falha no envio"
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000])
+    args = parser.parse_args()
+
+    import django
+
+    django.setup()
+    from core.utils.whatsapp import HttpSender, JsonlFileSender
+
+    server = stub_server(args.latency_ms / 1000)
+    url = f"http://127.0.0.1:{server.server_port}/messages"
+
+    print(f"provedor falso com {args.latency_ms:.1f} ms por requisição")
+    print(f"{'backend':32} " + " ".join(f"{n:>10}" for n in args.sizes) + "   (msgs/s)")
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {
+            "http sequencial": lambda: HttpSender(url, concurrency=1),
+            f"http pool x{args.concurrency}": lambda: HttpSender(url, concurrency=args.concurrency),
+            "jsonl": lambda: JsonlFileSender(os.path.join(tmp, "out.jsonl")),
+        }
+        for name, factory in backends.items():
+            rates = []
+            for size in args.sizes:
+                sender = factory()
+                rates.append(run(sender, size))
+                if hasattr(sender, "close"):
+                    sender.close()
+            print(f"{name:32} " + " ".join(f"{r:10.0f}" for r in rates))
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ Django settings for coracao_solidario project.
 Generated by 'django-admin startproject' using Django 5.2.8.
 """
 
+import os
 from pathlib import Path
 
 # --------------------------------------------------
@@ -49,16 +50,31 @@ INSTALLED_APPS = [
 # MIDDLEWARE
 # --------------------------------------------------
 MIDDLEWARE = [
+    'core.utils.metrics.MetricsMiddleware',  # primeiro: mede a pilha inteira
+    'core.utils.profiler.ProfilerMiddleware',  # só nas requisições sorteadas ou com token
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.auth.ProfileAuthenticationMiddleware',  # request.user + perfil + posto, do retrato na sessão
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 
+# --------------------------------------------------
+# AUTENTICAÇÃO / SESSÃO
+# --------------------------------------------------
+# ProfileBackend: usuário + perfil + posto numa query (core/auth.py).
+AUTHENTICATION_BACKENDS = ["core.auth.ProfileBackend"]
+
+# Sessão no banco com cópia no cache compartilhado: ler a sessão não faz
+# query. O "shared" e não o "default": a sessão muda e não pode ficar velha
+# na memória de um worker.
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+SESSION_CACHE_ALIAS = "shared"
+
+
 # --------------------------------------------------
 # URL / WSGI
 # --------------------------------------------------
@@ -93,20 +109,159 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # uma conexão por worker, reaproveitada (0 = abre e fecha a cada requisição)
+        'CONN_MAX_AGE': int(os.environ.get("DB_CONN_MAX_AGE", "600")),
+        'CONN_HEALTH_CHECKS': True,
+        # banco de teste em arquivo: o SQLite em memória compartilhada usa
+        # lock por tabela e falha na hora, sem esperar o busy timeout, o que
+        # impede testar escrita concorrente entre threads
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
 
+# PRAGMAs de toda conexão SQLite nova (core.db.configure_sqlite).
+# Escritas que leem antes de gravar usam core.db.write_atomic (BEGIN IMMEDIATE).
+# journal_mode=WAL fica gravado no arquivo: a primeira conexão (até um
+# "manage.py makemigrations --check") muda o cabeçalho do db.sqlite3, que
+# passa a aparecer como modificado no git, e cria db.sqlite3-wal/-shm ao lado.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",  # leitura não bloqueia escrita (e vice-versa)
+    "synchronous": "NORMAL",  # com WAL: sem fsync por commit; uma queda de energia perde só os últimos commits
+    "busy_timeout": 20000,  # ms esperando o lock antes de "database is locked"
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -32000,  # negativo = KiB: ~32 MB de páginas por conexão
+    "temp_store": "MEMORY",
+}
+
+
 # --------------------------------------------------
-# CACHE (MVP) — NECESSÁRIO PARA RATE LIMIT
+# CACHE (MVP) — PÁGINAS PÚBLICAS E CATÁLOGO DE POSTOS
 # --------------------------------------------------
+# default: LRU na memória do processo na frente do "shared", que todos os
+# workers enxergam (arquivos aqui; DatabaseCache ou Redis servem igual).
+# Invalidação entre workers por chave de versão (core.utils.two_tier_cache).
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "BACKEND": "core.utils.two_tier_cache.TwoTierCache",
         "LOCATION": "coracao-solidario-cache",
-    }
+        "OPTIONS": {
+            "SHARED": "shared",
+            "LOCAL_MAX_ENTRIES": 5000,
+            "LOCAL_TIMEOUT": 60,  # segundos que um valor fica na memória do worker
+            "VOLATILE_TIMEOUT": 1,  # idem para chaves de versão (":version")
+        },
+    },
+    "shared": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache",
+        # o FileBasedCache lista o diretório a cada set: o custo cresce com
+        # MAX_ENTRIES (~1,6 ms com 1000, ~12 ms com 9000). Precisa de mais? Redis.
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
+    # balcão de retirada (core.services.pickup): uma chave de versão e um
+    # retrato por código conferido. Diretório à parte: o corte do
+    # MAX_ENTRIES (apaga 1/3 dos arquivos ao acaso) só derruba retratos de
+    # retirada, nunca o catálogo de postos e as páginas do "shared".
+    "pickup": {
+        "BACKEND": "core.utils.two_tier_cache.TwoTierCache",
+        "LOCATION": "coracao-solidario-pickup",
+        "OPTIONS": {"SHARED": "pickup_shared", "LOCAL_MAX_ENTRIES": 5000, "LOCAL_TIMEOUT": 60, "VOLATILE_TIMEOUT": 1},
+    },
+    "pickup_shared": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache" / "pickup",
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
+}
+
+
+# --------------------------------------------------
+# RATE LIMIT (formulários públicos)
+# --------------------------------------------------
+# Contadores compartilhados por todos os workers. Backends:
+# core.utils.rate_limit.SQLiteStore | RedisStore ({"url": "redis://..."}) | MemoryStore
+RATE_LIMIT_STORE = {
+    "BACKEND": "core.utils.rate_limit.SQLiteStore",
+    "OPTIONS": {"path": BASE_DIR / "ratelimit.sqlite3"},
 }
 
+# Uma regra por rota (ver core/utils/rate_limit.py). form_phone vale para
+# doar e receber juntos: o mesmo WhatsApp, de qualquer IP.
+RATE_LIMITS = {
+    "form_doar": {"algorithm": "sliding_window", "limit": 5, "period": 300, "keys": ["ip"]},
+    "form_receber": {"algorithm": "sliding_window", "limit": 5, "period": 300, "keys": ["ip"]},
+    "form_phone": {"algorithm": "token_bucket", "limit": 5, "period": 3600, "keys": ["phone"]},
+}
+
+# Páginas públicas em cache (core.utils.page_cache), em segundos; 0 desliga.
+# A chave já muda com o catálogo de postos, então é só um teto.
+PAGE_CACHE_TIMEOUT = 600
+
+
+# --------------------------------------------------
+# CÓDIGOS DE RETIRADA
+# --------------------------------------------------
+# Cada processo reserva block_size números do contador por vez.
+# PICKUP_CODE_KEY (padrão: SECRET_KEY) não pode mudar depois de emitir códigos.
+PICKUP_CODE_ALLOCATOR = {
+    "BACKEND": "core.services.pickup_codes.SequenceAllocator",
+    "OPTIONS": {"block_size": 100},
+}
+
+
+# --------------------------------------------------
+# WHATSAPP (envio das notificações do Outbox)
+# --------------------------------------------------
+# Backends: core.utils.whatsapp.MockSender | JsonlFileSender | HttpSender
+WHATSAPP_SENDER = {
+    "BACKEND": "core.utils.whatsapp.MockSender",
+    "OPTIONS": {},
+}
+
+
+# --------------------------------------------------
+# API /api/matches/ (bot do WhatsApp e outros consumidores)
+# --------------------------------------------------
+# Enviado como "Authorization: Bearer <token>". Vazio = só usuários staff.
+MATCHES_API_TOKEN = os.environ.get("MATCHES_API_TOKEN", "")
+
+
+# --------------------------------------------------
+# MÉTRICAS (GET /metrics, formato Prometheus)
+# --------------------------------------------------
+# Cada worker soma seus contadores no arquivo a cada FLUSH_INTERVAL segundos.
+# Scrape com "Authorization: Bearer <METRICS_TOKEN>"; vazio = só staff.
+METRICS = {
+    "ENABLED": os.environ.get("METRICS_ENABLED", "1") == "1",
+    "PATH": BASE_DIR / "metrics.sqlite3",
+    "FLUSH_INTERVAL": 5,
+    "TOKEN": os.environ.get("METRICS_TOKEN", ""),
+}
+
+
+# --------------------------------------------------
+# PROFILER (cProfile por requisição, ver /admin/profiles/)
+# --------------------------------------------------
+# Sob pedido: token de /admin/profiles/ em "X-Profile" ou "?_profile=".
+# SAMPLE_RATE = N perfila 1 em cada N requisições; 0 = só sob pedido.
+PROFILER = {
+    "SAMPLE_RATE": int(os.environ.get("PROFILER_SAMPLE_RATE", "0")),
+    "DIR": BASE_DIR / "profiles",
+    "MAX_PROFILES": 200,
+    "TOKEN_MAX_AGE": 3600,
+}
+
+
+# --------------------------------------------------
+# FILTRO DE PALAVRAS (formulários)
+# --------------------------------------------------
+# None = lista padrão de core/utils/content_filter.py. Se apontar para um
+# arquivo (uma entrada por linha, "prefixo*" aceito), ele é relido ao mudar.
+BAD_WORDS_FILE = None
+
 
 # --------------------------------------------------
 # PASSWORD VALIDATION
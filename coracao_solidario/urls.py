@@ -9,6 +9,13 @@ from core.views import (
     pickup_screen,
     pickup_check,
     pickup_confirm,
+    matches_feed,
+    metrics_view,
+    admin_reports,
+    admin_reports_csv,
+    admin_profiles,
+    admin_profile_detail,
+    admin_profile_download,
 )
 
 urlpatterns = [
@@ -23,6 +30,17 @@ urlpatterns = [
     path("pickup/check/", pickup_check, name="pickup-check"),
     path("pickup/confirm/", pickup_confirm, name="pickup-confirm"),
 
-    # admin
+    # API (bot do WhatsApp)
+    path("api/matches/", matches_feed, name="api-matches"),
+
+    # Prometheus
+    path("metrics", metrics_view, name="metrics"),
+
+    # admin (antes do admin.site.urls, que captura tudo em /admin/)
+    path("admin/reports/", admin_reports, name="admin-reports"),
+    path("admin/reports/csv/", admin_reports_csv, name="admin-reports-csv"),
+    path("admin/profiles/", admin_profiles, name="admin-profiles"),
+    path("admin/profiles/<str:profile_id>/", admin_profile_detail, name="admin-profile-detail"),
+    path("admin/profiles/<str:profile_id>.prof", admin_profile_download, name="admin-profile-download"),
     path("admin/", admin.site.urls),
 ]
@@ -1,8 +1,10 @@
 from django.contrib import admin
+from django.http import StreamingHttpResponse
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
-from .models import ReferencePost, Donor, Receiver, Match, UserProfile
+from .models import ReferencePost, Donor, Receiver, Match, Outbox, QueueEntry, UserProfile
+from .services import match_export
 
 
 @admin.register(ReferencePost)
@@ -28,12 +30,49 @@ class ReceiverAdmin(admin.ModelAdmin):
     readonly_fields = ("created_at",)
 
 
+def _export_response(queryset, fmt):
+    response = StreamingHttpResponse(
+        match_export.iter_export(queryset, fmt),
+        content_type=match_export.CONTENT_TYPES[fmt],
+    )
+    response["Content-Disposition"] = f'attachment; filename="{match_export.filename(fmt)}"'
+    return response
+
+
 @admin.register(Match)
 class MatchAdmin(admin.ModelAdmin):
     list_display = ("pickup_code", "donor", "receiver", "reference_post", "is_completed", "created_at")
     list_filter = ("reference_post", "is_completed", "created_at")
     search_fields = ("pickup_code", "donor__name", "receiver__name")
     readonly_fields = ("created_at",)
+    actions = ("export_csv", "export_jsonl")
+
+    # Os filtros da lista (posto, status, data; ou ?created_at__gte=...&created_at__lt=...
+    # na URL) já chegam no queryset. "Selecionar todos" exporta tudo em streaming.
+    @admin.action(description="Exportar selecionados (CSV)")
+    def export_csv(self, request, queryset):
+        return _export_response(queryset, "csv")
+
+    @admin.action(description="Exportar selecionados (JSONL)")
+    def export_jsonl(self, request, queryset):
+        return _export_response(queryset, "jsonl")
+
+
+@admin.register(Outbox)
+class OutboxAdmin(admin.ModelAdmin):
+    list_display = ("id", "match", "recipient", "phone", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status", "recipient")
+    search_fields = ("phone", "match__pickup_code")
+    raw_id_fields = ("match",)
+    readonly_fields = ("created_at", "sent_at", "claim_token", "last_error")
+
+
+@admin.register(QueueEntry)
+class QueueEntryAdmin(admin.ModelAdmin):
+    list_display = ("id", "side", "reference_post", "kit", "donor", "receiver", "created_at")
+    list_filter = ("side", "reference_post", "kit")
+    raw_id_fields = ("donor", "receiver")
+    readonly_fields = ("created_at",)
 
 
 @admin.register(UserProfile)
@@ -7,3 +7,6 @@ class CoreConfig(AppConfig):
 
     def ready(self):
         import core.signals
+        from core.messages import validate_catalogue
+
+        validate_catalogue()
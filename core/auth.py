@@ -0,0 +1,150 @@
+# core/auth.py
+"""
+Usuário, perfil e posto carregados uma vez por sessão, não por requisição.
+
+ProfileBackend.get_user traz User + UserProfile + ReferencePost numa query
+só (select_related). ProfileAuthenticationMiddleware (no lugar do
+AuthenticationMiddleware do django) guarda um retrato desses três na sessão,
+marcado com a versão do perfil; enquanto a versão não muda, request.user é
+montado do retrato. Os campos que não estão no retrato ficam "deferred" (o
+django busca se alguém ler, e um save() não os apaga).
+
+is_active, is_staff e is_superuser não entram no retrato: vêm do banco a
+cada requisição (uma query pela chave primária, três colunas). Assim um
+User.objects.update(is_active=False), ação em massa do admin ou correção no
+shell corta o acesso na hora, sem depender de signal.
+
+A versão é uma chave de versão por usuário (core.utils.two_tier_cache)
+junto com a do catálogo de postos. Muda quando:
+  - o User é salvo (senha, nome...), menos o last_login do login;
+  - o UserProfile é salvo/apagado;
+  - qualquer ReferencePost é salvo/apagado (o catálogo troca de versão);
+  - um caminho em lote chama invalidate_profiles() (update/bulk_create não
+    passam pelos signals).
+Com versão nova, a próxima requisição passa pelo caminho normal do django
+(inclusive a conferência do hash da senha na sessão) e refaz o retrato.
+"""
+from django.contrib import auth
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.utils.functional import SimpleLazyObject
+
+from core.models import ReferencePost, UserProfile
+from core.services import post_catalogue
+from core.utils import two_tier_cache
+
+SNAPSHOT_KEY = "_auth_profile"
+BACKEND_PATH = "core.auth.ProfileBackend"
+_LEGACY_BACKEND = "django.contrib.auth.backends.ModelBackend"
+
+USER_FIELDS = ("id", "username", "first_name", "last_name", "email")
+ACCESS_FIELDS = ("is_active", "is_staff", "is_superuser")  # sempre lidos do banco
+PROFILE_FIELDS = ("id", "user_id", "role", "reference_post_id")
+POST_FIELDS = ("id", "name", "city")
+
+
+class ProfileBackend(ModelBackend):
+    """ModelBackend que já traz o perfil e o posto junto com o usuário."""
+
+    def get_user(self, user_id):
+        UserModel = auth.get_user_model()
+        try:
+            user = UserModel._default_manager.select_related("profile__reference_post").get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+
+# ---------------- VERSÃO DO PERFIL ---------------- #
+
+def _namespace(user_id):
+    return f"user:{user_id}:profile"
+
+
+def invalidate_profile(user_id):
+    """O retrato de `user_id` nas sessões deixa de valer."""
+    two_tier_cache.bump_version(_namespace(user_id))
+
+
+def invalidate_profiles(user_ids):
+    """invalidate_profile() para quem mexe em usuários/perfis em lote."""
+    for user_id in user_ids:
+        invalidate_profile(user_id)
+
+
+def profile_version(user_id):
+    return f"{two_tier_cache.get_version(_namespace(user_id))}:{post_catalogue.current_version()}"
+
+
+# ---------------- RETRATO NA SESSÃO ---------------- #
+
+def _values(instance, fields):
+    return {name: getattr(instance, name) for name in fields}
+
+
+def _from_snapshot(model, values):
+    # from_db quer os valores na ordem dos campos do model
+    names = [f.attname for f in model._meta.concrete_fields if f.attname in values]
+    return model.from_db("default", names, [values[name] for name in names])
+
+
+def _snapshot(user):
+    profile = getattr(user, "profile", None)
+    post = profile.reference_post if profile is not None else None
+    return {
+        "user": _values(user, USER_FIELDS),
+        "profile": _values(profile, PROFILE_FIELDS) if profile is not None else None,
+        "post": _values(post, POST_FIELDS) if post is not None else None,
+    }
+
+
+def _restore(snapshot, access):
+    UserModel = auth.get_user_model()
+    user = _from_snapshot(UserModel, {**snapshot["user"], **access})
+    profile = None
+    if snapshot["profile"] is not None:
+        profile = _from_snapshot(UserProfile, snapshot["profile"])
+        UserProfile.user.field.set_cached_value(profile, user)
+        post = _from_snapshot(ReferencePost, snapshot["post"]) if snapshot["post"] is not None else None
+        UserProfile.reference_post.field.set_cached_value(profile, post)
+    UserModel.profile.related.set_cached_value(user, profile)  # None = "não tem perfil", sem query
+    return user
+
+
+def get_user(request):
+    """auth.get_user com o retrato da sessão na frente."""
+    session = request.session
+    user_id = session.get(auth.SESSION_KEY)
+    if user_id is None:
+        return AnonymousUser()
+    if session.get(auth.BACKEND_SESSION_KEY) == _LEGACY_BACKEND:
+        session[auth.BACKEND_SESSION_KEY] = BACKEND_PATH  # sessões de antes do ProfileBackend continuam valendo
+
+    version = profile_version(user_id)
+    saved = session.get(SNAPSHOT_KEY)
+    if (
+        saved is not None
+        and saved["version"] == version
+        and saved["hash"] == session.get(auth.HASH_SESSION_KEY)
+        and session.get(auth.BACKEND_SESSION_KEY) == BACKEND_PATH
+    ):
+        access = (
+            auth.get_user_model()._default_manager.filter(pk=user_id).values_list(*ACCESS_FIELDS).first()
+        )
+        if access is not None and access[0]:
+            return _restore(saved, dict(zip(ACCESS_FIELDS, access)))
+        # apagado ou desativado: o caminho normal do django nega o acesso
+
+    user = auth.get_user(request)  # confere backend e hash da senha; pode deslogar
+    if user.is_authenticated:
+        session[SNAPSHOT_KEY] = {
+            "version": version, "hash": session.get(auth.HASH_SESSION_KEY), **_snapshot(user),
+        }
+    return user
+
+
+class ProfileAuthenticationMiddleware(AuthenticationMiddleware):
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
@@ -0,0 +1,52 @@
+# core/db.py
+import re
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+
+_PRAGMA_NAME = re.compile(r"^[a-z_]+$")
+
+
+def configure_sqlite(connection):
+    """
+    Aplica settings.SQLITE_PRAGMAS numa conexão SQLite recém-aberta (signal
+    connection_created). Com CONN_MAX_AGE a conexão vive entre requisições,
+    então isso roda uma vez por worker, não por requisição.
+    """
+    if connection.vendor != "sqlite":
+        return
+    for name, value in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+        if not _PRAGMA_NAME.match(name):
+            raise ValueError(f"PRAGMA inválido em SQLITE_PRAGMAS: {name!r}")
+        # direto no sqlite3: não aparece como query da requisição
+        connection.connection.execute(f"PRAGMA {name} = {value}")
+
+
+@contextmanager
+def write_atomic(using=None):
+    """
+    transaction.atomic() para blocos que leem e depois escrevem (claim de fila).
+
+    No SQLite a transação padrão é DEFERRED: duas conexões leem a mesma linha
+    e só brigam pelo lock na hora de escrever, e a perdedora toma
+    "database is locked" sem esperar o busy_timeout. Aqui o bloco externo abre
+    com BEGIN IMMEDIATE, pegando o lock de escrita logo de início; as demais
+    esperam na fila do busy_timeout. Dentro de um atomic já aberto vira savepoint.
+    """
+    connection = transaction.get_connection(using)
+    if connection.vendor != "sqlite" or connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+
+    connection.ensure_connection()
+    previous = connection.transaction_mode
+    connection.transaction_mode = "IMMEDIATE"
+    try:
+        with transaction.atomic(using=using):
+            # o BEGIN só é emitido aqui dentro; depois disso o modo pode voltar
+            connection.transaction_mode = previous
+            yield
+    finally:
+        connection.transaction_mode = previous
@@ -0,0 +1,39 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.auth import invalidate_profiles
+from core.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Cria o UserProfile (perfil padrão) dos usuários que ainda não têm. "
+        "O signal só cria perfil para usuário novo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Perfis criados por INSERT.")
+        parser.add_argument("--dry-run", action="store_true", help="Só conta, sem gravar nada.")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        missing = get_user_model().objects.filter(profile__isnull=True).order_by("pk")
+        total = last = 0
+
+        while True:
+            ids = list(missing.filter(pk__gt=last).values_list("pk", flat=True)[:options["chunk_size"]])
+            if not ids:
+                break
+            if not options["dry_run"]:
+                # ignore_conflicts: um perfil criado no meio do caminho não derruba o lote
+                UserProfile.objects.bulk_create([UserProfile(user_id=pk) for pk in ids], ignore_conflicts=True)
+                invalidate_profiles(ids)  # o retrato na sessão ainda diz "sem perfil"
+            total += len(ids)
+            last = ids[-1]
+
+        verb = "seriam criados" if options["dry_run"] else "criados"
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} perfis {verb} em {time.perf_counter() - start:.2f}s."
+        ))
@@ -0,0 +1,51 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import load
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de carga ponta a ponta (doar, receber, conferir e confirmar retirada) num banco "
+        "temporário, pelo app WSGI. Latência p50/p95/p99, req/s e queries por requisição, em JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--flows", nargs="+", default=list(load.FLOWS), choices=list(load.FLOWS))
+        parser.add_argument("--receivers", type=int, default=20_000, help="Receptoras semeadas.")
+        parser.add_argument("--matches", type=int, default=10_000, help="Matches semeados (1 em 4 pendente).")
+        parser.add_argument("--requests", type=int, default=200, help="Requisições medidas por thread e fluxo.")
+        parser.add_argument("--warmup", type=int, default=5, help="Requisições não medidas por thread e fluxo.")
+        parser.add_argument("--processes", type=int, default=1)
+        parser.add_argument("--threads", type=int, default=4, help="Threads por processo.")
+        parser.add_argument("--output", help="Arquivo JSON (padrão: benchmarks/results/<data>.json).")
+        parser.add_argument("--baseline", help="JSON de uma rodada anterior, para comparar.")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["baseline"]:
+            try:
+                with open(options["baseline"], encoding="utf-8") as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Não deu para ler o baseline: {exc}") from exc
+
+        try:
+            report = load.run(
+                options["flows"],
+                receivers=options["receivers"],
+                matches=options["matches"],
+                requests=options["requests"],
+                warmup=options["warmup"],
+                processes=options["processes"],
+                threads=options["threads"],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        path = load.write_report(report, options["output"])
+        self.stdout.write(load.format_report(report, baseline))
+        self.stdout.write(self.style.SUCCESS(
+            f"Seed em {report['seed_seconds']:.1f}s; resultado em {path}."
+        ))
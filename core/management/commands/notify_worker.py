@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.services import outbox
+from core.utils.whatsapp import get_sender
+
+
+class Command(BaseCommand):
+    help = "Envia as notificações pendentes do Outbox (WhatsApp), em lotes e em paralelo."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--threads", type=int, help="Envios simultâneos (padrão: o do backend).")
+        parser.add_argument("--lease", type=int, default=300, help="Segundos até uma mensagem travada voltar à fila.")
+        parser.add_argument("--max-attempts", type=int, default=outbox.MAX_ATTEMPTS)
+        parser.add_argument("--idle-sleep", type=float, default=2.0, help="Pausa quando a fila está vazia.")
+        parser.add_argument("--once", action="store_true", help="Esvazia o que estiver vencido e sai.")
+
+    def handle(self, *args, **options):
+        sent = failed = 0
+        start = time.perf_counter()
+
+        sender = get_sender()
+        try:
+            while True:
+                batch = outbox.claim_batch(options["batch_size"], options["lease"])
+                if not batch:
+                    if options["once"]:
+                        break
+                    time.sleep(options["idle_sleep"])
+                    continue
+
+                results = sender.send_many(
+                    [(row.phone, row.message) for row in batch],
+                    max_workers=options["threads"],
+                )
+                delivered = []
+                for row, result in zip(batch, results):
+                    if result is True:
+                        delivered.append(row)
+                    else:
+                        failed += 1
+                        error = result if isinstance(result, Exception) else "envio recusado pelo provedor"
+                        outbox.mark_failed(row, error, options["max_attempts"])
+                if delivered:
+                    outbox.mark_sent(delivered)
+                sent += len(delivered)
+        except KeyboardInterrupt:
+            pass
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"{sent} mensagens enviadas, {failed} falhas, em {elapsed:.2f}s."
+        ))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services import reports
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula do zero a tabela de resumo dos relatórios (ReportRollup). "
+        "Use depois de updates/deletes em massa feitos por fora do app."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check", action="store_true",
+            help="Só compara resumo e tabelas; sai com erro se houver desvio (para cron/monitoração).",
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if options["check"]:
+            drift = reports.drift()
+            for (post_id, kit), fields in sorted(drift.items(), key=lambda item: (item[0][0] or 0, item[0][1])):
+                changes = ", ".join(f"{name} {old} -> {new}" for name, (old, new) in fields.items())
+                self.stdout.write(f"posto={post_id or '-'} kit={kit}: {changes}")
+            if drift:
+                raise CommandError(f"{len(drift)} linhas do resumo com desvio; rode rebuild_reports.")
+            self.stdout.write(self.style.SUCCESS(f"Resumo confere ({time.perf_counter() - start:.2f}s)."))
+            return
+
+        rows = reports.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Resumo refeito: {rows} linhas (posto/kit) em {time.perf_counter() - start:.2f}s."
+        ))
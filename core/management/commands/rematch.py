@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.services import match_service
+
+
+class Command(BaseCommand):
+    help = "Pareia em lote doadoras e receptoras que estão esperando no mesmo posto/kit."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--post", type=int, help="Só o posto de referência com este id.")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Pares gravados por transação.")
+        parser.add_argument("--dry-run", action="store_true", help="Só conta os pares, sem gravar nada.")
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        start = time.perf_counter()
+        total = 0
+
+        groups = match_service.pending_groups(options["post"])
+        if not groups:
+            self.stdout.write("Nenhuma fila com doadora e receptora esperando.")
+            return
+
+        for group in groups:
+            group_start = time.perf_counter()
+            created = match_service.sweep_group(
+                group["reference_post_id"],
+                group["kit"],
+                chunk_size=options["chunk_size"],
+                dry_run=dry_run,
+            )
+            total += created
+            self.stdout.write(
+                f"posto {group['reference_post_id']} / {group['kit']}: "
+                f"{created} pares em {time.perf_counter() - group_start:.2f}s"
+            )
+
+        elapsed = time.perf_counter() - start
+        rate = total / elapsed if elapsed else 0
+        verb = "seriam criados" if dry_run else "criados"
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} matches {verb} em {elapsed:.2f}s ({rate:.0f} pares/s)."
+        ))
@@ -1,7 +1,16 @@
-def send_whatsapp_message(phone, message):
-    """
-    Mock de envio de WhatsApp.
-    Depois conectamos API oficial.
-    """
-    print(f"[WHATSAPP MOCK] {phone}: {message}")
-    return True
+from django.core.management.base import BaseCommand, CommandError
+
+from core.utils.whatsapp import send_whatsapp_message
+
+
+class Command(BaseCommand):
+    help = "Envia uma mensagem avulsa de WhatsApp pelo backend configurado (settings.WHATSAPP_SENDER)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("phone")
+        parser.add_argument("message")
+
+    def handle(self, *args, **options):
+        if not send_whatsapp_message(options["phone"], options["message"]):
+            raise CommandError("O provedor recusou a mensagem.")
+        self.stdout.write(self.style.SUCCESS("Mensagem enviada."))
@@ -1,50 +1,222 @@
 # core/messages.py
 # Textos padrão para envio via WhatsApp (fase manual / futura automação)
+"""
+Catálogo de mensagens.
 
+Cada MessageTemplate é analisado uma única vez (na importação) e, se tiver
+`model`, os placeholders são conferidos contra os campos do model quando o
+app sobe (CoreConfig.ready -> validate_catalogue). Um campo renomeado vira
+erro de inicialização, não uma mensagem quebrada no meio do lote.
+
+Placeholders com "__" seguem as relações, como no .values():
+    {donor__name}, {reference_post__city}
+
+Para lotes grandes, render_many() lê só as colunas necessárias de um
+queryset (.values().iterator()) e não cria instâncias de model:
+
+    for text in render_many(MATCH_NOTIFICATION, Match.objects.filter(...)):
+        ...
+"""
+from functools import lru_cache
+from operator import itemgetter
+from string import Formatter
+
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models.query import QuerySet
+
+CATALOGUE = {}
+
+
+class MessageTemplate:
+    """
+    text: modelo no formato do str.format, só com placeholders nomeados.
+    model: "app.Model"; se informado, cada placeholder (ou fonte de
+        `computed`) tem de ser um caminho de campo desse model.
+    computed: {"placeholder": (("coluna", ...), func)} para valores derivados;
+        func recebe os valores das colunas na ordem dada.
+    """
+
+    def __init__(self, name, text, model=None, computed=None):
+        self.name = name
+        self.text = text
+        self.model = model
+        self.computed = computed or {}
+
+        pieces, getters, columns = [], [], []
+        for literal, field, spec, conversion in Formatter().parse(text):
+            pieces.append(literal.replace("{", "{{").replace("}", "}}"))
+            if field is None:
+                continue
+            if not field.isidentifier():
+                raise ImproperlyConfigured(f"Mensagem {name}: placeholder inválido {{{field}}}.")
+            if field in self.computed:
+                sources, func = self.computed[field]
+                getters.append(_computed_getter(sources, func))
+                columns.extend(sources)
+            else:
+                getters.append(itemgetter(field))
+                columns.append(field)
+            conversion = f"!{conversion}" if conversion else ""
+            spec = f":{spec}" if spec else ""
+            pieces.append(f"{{{len(getters) - 1}{conversion}{spec}}}")
+
+        self.placeholders = tuple(field for _, field, _, _ in Formatter().parse(text) if field)
+        self.columns = tuple(dict.fromkeys(columns))  # sem repetir, na ordem
+        self._format = "".join(pieces).format
+        self._getters = tuple(getters)
+
+        if name in CATALOGUE:
+            raise ImproperlyConfigured(f"Mensagem {name} registrada duas vezes.")
+        CATALOGUE[name] = self
+
+    def render_row(self, row):
+        """Renderiza a partir de um dict com as colunas de self.columns."""
+        return self._format(*[get(row) for get in self._getters])
+
+    def render(self, **values):
+        return self.render_row(values)
+
+    def render_instance(self, obj):
+        """Renderiza a partir de uma instância (segue "a__b" como obj.a.b)."""
+        return self.render_row({column: _resolve(obj, column) for column in self.columns})
+
+    def validate(self):
+        if self.model is None:
+            return
+        root = apps.get_model(self.model)
+        for column in self.columns:
+            model = root
+            for part in column.split("__"):
+                try:
+                    field = model._meta.get_field(part)
+                except (FieldDoesNotExist, AttributeError):
+                    raise ImproperlyConfigured(
+                        f"Mensagem {self.name}: {column!r} não é campo de {root.__name__}."
+                    ) from None
+                model = field.related_model
+
+    def __repr__(self):
+        return f"<MessageTemplate {self.name}>"
+
+
+def _computed_getter(sources, func):
+    getters = [itemgetter(source) for source in sources]
+    return lambda row: func(*[get(row) for get in getters])
+
+
+def _resolve(obj, path):
+    for part in path.split("__"):
+        obj = getattr(obj, part)
+    return obj
+
+
+def render_many(template, rows, chunk_size=2000):
+    """
+    Gera os textos de `rows`, um por linha, sem guardar a lista inteira.
+    rows pode ser um queryset (só as colunas do template são lidas) ou
+    qualquer iterável de dicts, como o resultado de .values().
+    """
+    if isinstance(rows, QuerySet):
+        rows = rows.values(*template.columns).iterator(chunk_size=chunk_size)
+    render_row = template.render_row
+    for row in rows:
+        yield render_row(row)
+
+
+def validate_catalogue():
+    for template in CATALOGUE.values():
+        template.validate()
+
+
+# ---------------- CATÁLOGO ---------------- #
+
+@lru_cache(maxsize=None)
+def _kit_label(kit_type):
+    from core.models import Donor
+
+    return dict(Donor.KIT_CHOICES).get(kit_type, kit_type)
+
+
+DONOR_CONFIRMATION = MessageTemplate(
+    "donor_confirmation",
+    "Olá {name}! 💗\n"
+    "Aqui é do *Coração Solidário*.\n"
+    "Recebemos o seu cadastro como doadora e ficamos muito felizes com a sua disponibilidade em ajudar.\n"
+    "Assim que encontrarmos alguém compatível com o kit ({kit_label}) e definirmos o posto de referência, "
+    "vamos te avisar por aqui com todos os detalhes.\n\n"
+    "Obrigada por colocar amor em movimento. 🌷",
+)
+
+RECEIVER_CONFIRMATION = MessageTemplate(
+    "receiver_confirmation",
+    "Oi, {name}! 💗\n"
+    "Aqui é do *Coração Solidário*.\n"
+    "Seu pedido foi cadastrado com sucesso.\n"
+    "Agora vamos procurar uma doação compatível com o kit que você precisa e, assim que houver um match, "
+    "vamos te avisar com o posto de referência e o seu código de retirada.\n\n"
+    "Estamos torcendo para que essa ajuda chegue logo até você. 🌻",
+)
+
+RECEIVER_MATCH = MessageTemplate(
+    "receiver_match",
+    "Oi, {name}! 💗\n"
+    "Boas notícias: encontramos uma doação compatível com o kit que você pediu! 🎉\n\n"
+    "Você poderá retirar em:\n"
+    "Posto: {reference_post}\n"
+    "Endereço: {address}\n\n"
+    "📌 Código de retirada: {withdrawal_code}\n\n"
+    "Leve este código e um documento com foto até o posto de referência.\n"
+    "Qualquer dúvida, pode responder esta mensagem.\n\n"
+    "Um abraço do Coração Solidário. 🫶",
+)
+
+DONOR_AFTER_MATCH = MessageTemplate(
+    "donor_after_match",
+    "Oi, {name}! 💗\n"
+    "Passando pra te contar que a sua doação já foi pareada com uma pessoa que precisava muito desse kit.\n"
+    "Ela vai retirar no posto de referência nos próximos dias.\n\n"
+    "Obrigada por fazer parte dessa corrente de cuidado.\n"
+    "Hoje você fez a diferença na vida de alguém. 🌸",
+)
+
+# Notificação de Match (Outbox e feed do bot). Kit vem de donor.kit_type.
+MATCH_NOTIFICATION = MessageTemplate(
+    "match_notification",
+    "✅ Match gerado!\n"
+    "📦 Kit: {kit_label}\n"
+    "🔑 Código de retirada: {pickup_code}\n"
+    "🏥 Posto: {reference_post__name} - {reference_post__city}\n"
+    "👤 Doadora: {donor__name}\n"
+    "🤍 Receptora: {receiver__name}\n",
+    model="core.Match",
+    computed={"kit_label": (("donor__kit_type",), _kit_label)},
+)
+
+
+# ---------------- ATALHOS (API antiga) ---------------- #
 
 def whatsapp_donor_confirmation(name, kit_label):
     """
     Mensagem de confirmação para DOADORA após cadastro ou match.
-    kit_label = donor.get_preferred_kit_display()
-    """
-    return (
-        f"Olá {name}! 💗\n"
-        f"Aqui é do *Coração Solidário*.\n"
-        f"Recebemos o seu cadastro como doadora e ficamos muito felizes com a sua disponibilidade em ajudar.\n"
-        f"Assim que encontrarmos alguém compatível com o kit ({kit_label}) e definirmos o posto de referência, "
-        f"vamos te avisar por aqui com todos os detalhes.\n\n"
-        f"Obrigada por colocar amor em movimento. 🌷"
-    )
+    kit_label = donor.get_kit_type_display()
+    """
+    return DONOR_CONFIRMATION.render(name=name, kit_label=kit_label)
 
 
 def whatsapp_receiver_confirmation(name):
     """
     Mensagem de confirmação para RECEPTORA (após cadastro do pedido).
     """
-    return (
-        f"Oi, {name}! 💗\n"
-        f"Aqui é do *Coração Solidário*.\n"
-        f"Seu pedido foi cadastrado com sucesso.\n"
-        f"Agora vamos procurar uma doação compatível com o kit que você precisa e, assim que houver um match, "
-        f"vamos te avisar com o posto de referência e o seu código de retirada.\n\n"
-        f"Estamos torcendo para que essa ajuda chegue logo até você. 🌻"
-    )
+    return RECEIVER_CONFIRMATION.render(name=name)
 
 
 def whatsapp_receiver_match(name, reference_post, address, withdrawal_code):
     """
     Mensagem para RECEPTORA quando já existe match + posto + código.
     """
-    return (
-        f"Oi, {name}! 💗\n"
-        f"Boas notícias: encontramos uma doação compatível com o kit que você pediu! 🎉\n\n"
-        f"Você poderá retirar em:\n"
-        f"Posto: {reference_post}\n"
-        f"Endereço: {address}\n\n"
-        f"📌 Código de retirada: {withdrawal_code}\n\n"
-        f"Leve este código e um documento com foto até o posto de referência.\n"
-        f"Qualquer dúvida, pode responder esta mensagem.\n\n"
-        f"Um abraço do Coração Solidário. 🫶"
+    return RECEIVER_MATCH.render(
+        name=name, reference_post=reference_post, address=address, withdrawal_code=withdrawal_code
     )
 
 
@@ -52,10 +224,4 @@ def whatsapp_donor_after_match(name):
     """
     Mensagem opcional para DOADORA depois que a doação dela foi utilizada.
     """
-    return (
-        f"Oi, {name}! 💗\n"
-        f"Passando pra te contar que a sua doação já foi pareada com uma pessoa que precisava muito desse kit.\n"
-        f"Ela vai retirar no posto de referência nos próximos dias.\n\n"
-        f"Obrigada por fazer parte dessa corrente de cuidado.\n"
-        f"Hoje você fez a diferença na vida de alguém. 🌸"
-    )
+    return DONOR_AFTER_MATCH.render(name=name)
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def enfileirar_receptoras_em_espera(apps, schema_editor):
+    """
+    Receptoras ativas sem match em aberto entram na fila, na ordem de cadastro.
+    Doadoras antigas não têm posto gravado, então não há como enfileirá-las.
+    """
+    Match = apps.get_model("core", "Match")
+    Receiver = apps.get_model("core", "Receiver")
+    QueueEntry = apps.get_model("core", "QueueEntry")
+
+    waiting = (
+        Receiver.objects
+        .filter(active=True)
+        .exclude(id__in=Match.objects.filter(is_completed=False).values_list("receiver_id", flat=True))
+        .order_by("created_at", "id")
+        .values_list("id", "reference_post_id", "needed_kit")
+    )
+    QueueEntry.objects.bulk_create(
+        [
+            QueueEntry(side="RECEIVER", reference_post_id=post_id, kit=kit, receiver_id=receiver_id)
+            for receiver_id, post_id, kit in waiting.iterator(chunk_size=2000)
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_userprofile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueueEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('side', models.CharField(choices=[('DONOR', 'Doadora'), ('RECEIVER', 'Receptora')], max_length=10, verbose_name='Lado')),
+                ('kit', models.CharField(max_length=30, verbose_name='Tipo de kit')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('donor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.donor', verbose_name='Doador')),
+                ('receiver', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.receiver', verbose_name='Receptora')),
+                ('reference_post', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='core.referencepost', verbose_name='Posto de referência')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['side', 'reference_post', 'kit', 'id'], name='queue_head_idx')],
+            },
+        ),
+        migrations.RunPython(enfileirar_receptoras_em_espera, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:17
+
+from django.db import migrations, models
+
+
+def desativar_whatsapp_duplicado(apps, schema_editor):
+    """
+    O índice único parcial exige um só cadastro ativo por WhatsApp.
+    Mantém ativo o cadastro mais antigo (o que a checagem das views
+    deveria ter protegido) e desativa os repetidos, tirando-os também
+    da fila de espera.
+    """
+    QueueEntry = apps.get_model("core", "QueueEntry")
+    for model_name in ("Donor", "Receiver"):
+        model = apps.get_model("core", model_name)
+        seen = set()
+        duplicated = []
+        for pk, whatsapp in (
+            model.objects.filter(active=True)
+            .order_by("created_at", "id")
+            .values_list("id", "whatsapp")
+            .iterator(chunk_size=2000)
+        ):
+            if whatsapp in seen:
+                duplicated.append(pk)
+            else:
+                seen.add(whatsapp)
+        if duplicated:
+            model.objects.filter(id__in=duplicated).update(active=False)
+            QueueEntry.objects.filter(**{f"{model_name.lower()}_id__in": duplicated}).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_queueentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(desativar_whatsapp_duplicado, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['receiver'], name='match_open_receiver_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['donor'], name='match_open_donor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='receiver',
+            index=models.Index(condition=models.Q(('active', True)), fields=['needed_kit', 'reference_post', 'created_at'], name='receiver_waiting_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='donor',
+            constraint=models.UniqueConstraint(condition=models.Q(('active', True)), fields=('whatsapp',), name='donor_active_whatsapp_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='receiver',
+            constraint=models.UniqueConstraint(condition=models.Q(('active', True)), fields=('whatsapp',), name='receiver_active_whatsapp_uniq'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:36
+
+from django.db import migrations, models
+
+
+def criar_sequencia(apps, schema_editor):
+    PickupCodeSequence = apps.get_model("core", "PickupCodeSequence")
+    PickupCodeSequence.objects.get_or_create(name="pickup_code")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_matching_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PickupCodeSequence',
+            fields=[
+                ('name', models.CharField(max_length=30, primary_key=True, serialize=False)),
+                ('next_value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(criar_sequencia, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_pickupcodesequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Outbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient', models.CharField(choices=[('DONOR', 'Doadora'), ('RECEIVER', 'Receptora')], max_length=10, verbose_name='Destinatária')),
+                ('phone', models.CharField(max_length=30, verbose_name='WhatsApp')),
+                ('message', models.TextField(verbose_name='Mensagem')),
+                ('status', models.CharField(choices=[('PENDING', 'Pendente'), ('SENDING', 'Enviando'), ('SENT', 'Enviada'), ('DEAD', 'Desistida')], default='PENDING', max_length=10, verbose_name='Situação')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próxima tentativa')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='Travada até')),
+                ('claim_token', models.CharField(blank=True, max_length=32)),
+                ('last_error', models.TextField(blank=True, verbose_name='Último erro')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Enviada em')),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbox', to='core.match', verbose_name='Match')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx')],
+                'constraints': [models.UniqueConstraint(fields=('match', 'recipient'), name='outbox_match_recipient_uniq')],
+            },
+        ),
+    ]
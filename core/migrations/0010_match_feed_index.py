@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_outbox'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['created_at', 'id'], name='match_open_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,134 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:55
+
+import re
+
+from django.db import migrations, models, transaction
+
+CHUNK_SIZE = 5000
+
+# cópia congelada de core.utils.phone (migração não importa código vivo)
+_CANONICAL = re.compile(r"(?:00)?(?:55|0)?([1-9]{2}(?:9\d{8}|\d{8}))")
+_NON_DIGITS = re.compile(r"\D+")
+_KEEP = frozenset("0123456789\n")
+
+
+def _normalize_phone(raw):
+    if not raw:
+        return ""
+    match = _CANONICAL.fullmatch(_NON_DIGITS.sub("", str(raw)))
+    return "+55" + match[1] if match else ""
+
+
+def _normalize_many(values):
+    # o lote numa string só: um translate tira a pontuação de todos
+    values = ["" if v is None else str(v) for v in values]
+    text = "\n".join(values)
+    text = text.translate(str.maketrans("", "", "".join(set(text) - _KEEP)))
+    lines = text.split("\n")
+    if len(lines) != len(values):  # algum valor tinha quebra de linha
+        return [_normalize_phone(v) for v in values]
+    return ["+55" + match[1] if (match := _CANONICAL.fullmatch(digits)) else "" for digits in lines]
+
+
+def preencher_whatsapp_e164(apps, schema_editor):
+    """
+    Preenche whatsapp_e164 em lotes por id, cada lote na sua transação:
+    tabelas grandes não ficam travadas numa transação só.
+    Depois, como 0007, mantém ativo só o cadastro mais antigo de cada
+    telefone canônico ("15 99123-4567" e "+55 15 99123-4567" agora são o
+    mesmo) e tira os repetidos da fila de espera.
+    """
+    db = schema_editor.connection.alias
+    QueueEntry = apps.get_model("core", "QueueEntry")
+    for model_name in ("Donor", "Receiver"):
+        model = apps.get_model("core", model_name)
+
+        qn = schema_editor.quote_name
+        update = (
+            f"UPDATE {qn(model._meta.db_table)} SET {qn('whatsapp_e164')} = %s WHERE {qn('id')} = %s"
+        )
+        last_id = 0
+        while True:
+            with transaction.atomic(using=db):
+                rows = list(
+                    model.objects.using(db).filter(id__gt=last_id)
+                    .order_by("id")
+                    .values_list("id", "whatsapp")[:CHUNK_SIZE]
+                )
+                if not rows:
+                    break
+                # UPDATE por id em executemany: bem mais leve que o CASE WHEN do bulk_update
+                with schema_editor.connection.cursor() as cursor:
+                    cursor.executemany(update, [
+                        (e164 or None, pk)
+                        for (pk, _), e164 in zip(rows, _normalize_many(w for _, w in rows))
+                    ])
+            last_id = rows[-1][0]
+
+        seen = set()
+        duplicated = []
+        for pk, e164 in (
+            model.objects.using(db).filter(active=True, whatsapp_e164__isnull=False)
+            .order_by("created_at", "id")
+            .values_list("id", "whatsapp_e164")
+            .iterator(chunk_size=CHUNK_SIZE)
+        ):
+            if e164 in seen:
+                duplicated.append(pk)
+            else:
+                seen.add(e164)
+        with transaction.atomic(using=db):
+            for start in range(0, len(duplicated), CHUNK_SIZE):
+                chunk = duplicated[start:start + CHUNK_SIZE]
+                model.objects.using(db).filter(id__in=chunk).update(active=False)
+                QueueEntry.objects.using(db).filter(**{f"{model_name.lower()}_id__in": chunk}).delete()
+
+
+class Migration(migrations.Migration):
+    # o preenchimento confirma lote a lote (ver preencher_whatsapp_e164)
+    atomic = False
+
+    dependencies = [
+        ('core', '0010_match_feed_index'),
+    ]
+
+    operations = [
+        # coluna sem índice primeiro: o preenchimento não paga manutenção de índice
+        migrations.AddField(
+            model_name='donor',
+            name='whatsapp_e164',
+            field=models.CharField(blank=True, max_length=16, null=True, verbose_name='WhatsApp (E.164)'),
+        ),
+        migrations.AddField(
+            model_name='receiver',
+            name='whatsapp_e164',
+            field=models.CharField(blank=True, max_length=16, null=True, verbose_name='WhatsApp (E.164)'),
+        ),
+        migrations.RunPython(preencher_whatsapp_e164, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='donor',
+            name='whatsapp_e164',
+            field=models.CharField(blank=True, db_index=True, max_length=16, null=True, verbose_name='WhatsApp (E.164)'),
+        ),
+        migrations.AlterField(
+            model_name='receiver',
+            name='whatsapp_e164',
+            field=models.CharField(blank=True, db_index=True, max_length=16, null=True, verbose_name='WhatsApp (E.164)'),
+        ),
+        migrations.RemoveConstraint(
+            model_name='donor',
+            name='donor_active_whatsapp_uniq',
+        ),
+        migrations.RemoveConstraint(
+            model_name='receiver',
+            name='receiver_active_whatsapp_uniq',
+        ),
+        migrations.AddConstraint(
+            model_name='donor',
+            constraint=models.UniqueConstraint(condition=models.Q(('active', True)), fields=('whatsapp_e164',), name='donor_active_whatsapp_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='receiver',
+            constraint=models.UniqueConstraint(condition=models.Q(('active', True)), fields=('whatsapp_e164',), name='receiver_active_whatsapp_uniq'),
+        ),
+    ]
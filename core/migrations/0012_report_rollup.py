@@ -0,0 +1,74 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:07
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+FIELDS = ("donors_active", "receivers_active", "matches_pending", "matches_delivered")
+
+
+def preencher_resumo(apps, schema_editor):
+    """
+    Primeira carga com GROUP BY; daqui em diante os contadores são
+    incrementais. Cópia congelada do reports.rebuild() desta versão: a
+    migração não importa o serviço, que pode mudar depois.
+    """
+    Donor = apps.get_model("core", "Donor")
+    Receiver = apps.get_model("core", "Receiver")
+    Match = apps.get_model("core", "Match")
+    ReportRollup = apps.get_model("core", "ReportRollup")
+    db = schema_editor.connection.alias
+    counts = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+
+    for kit, n in (
+        Donor.objects.using(db).filter(active=True)
+        .values_list("kit_type").annotate(n=Count("id")).order_by()
+    ):
+        counts[(None, kit)]["donors_active"] = n
+    for post_id, kit, n in (
+        Receiver.objects.using(db).filter(active=True)
+        .values_list("reference_post_id", "needed_kit").annotate(n=Count("id")).order_by()
+    ):
+        counts[(post_id, kit)]["receivers_active"] = n
+    for post_id, kit, pending, delivered in (
+        Match.objects.using(db).values_list("reference_post_id", "donor__kit_type")
+        .annotate(
+            pending=Count("id", filter=Q(is_completed=False)),
+            delivered=Count("id", filter=Q(is_completed=True)),
+        )
+        .order_by()
+    ):
+        counts[(post_id, kit)].update(matches_pending=pending, matches_delivered=delivered)
+
+    ReportRollup.objects.using(db).bulk_create([
+        ReportRollup(reference_post_id=post_id, kit=kit, **fields)
+        for (post_id, kit), fields in counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_whatsapp_e164'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kit', models.CharField(max_length=30, verbose_name='Tipo de kit')),
+                ('donors_active', models.IntegerField(default=0, verbose_name='Doadoras ativas')),
+                ('receivers_active', models.IntegerField(default=0, verbose_name='Receptoras ativas')),
+                ('matches_pending', models.IntegerField(default=0, verbose_name='Matches pendentes')),
+                ('matches_delivered', models.IntegerField(default=0, verbose_name='Matches entregues')),
+                ('reference_post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.referencepost', verbose_name='Posto de referência')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('reference_post', 'kit'), name='rollup_post_kit_uniq'), models.UniqueConstraint(condition=models.Q(('reference_post__isnull', True)), fields=('kit',), name='rollup_no_post_kit_uniq')],
+            },
+        ),
+        migrations.RunPython(preencher_resumo, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:48
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# cópia congelada de core.utils.validators.normalize_kit (migração não importa código vivo)
+_WORDS = {
+    "basico": "basico", "basic": "basico",
+    "completo": "completo", "complete": "completo",
+    "alergia": "alergia", "alergica": "alergia", "alergico": "alergia", "allergy": "alergia",
+}
+_KEYS = {(False, False): "BASICO", (True, False): "COMPLETO", (False, True): "ALERGIA", (True, True): "COMPLETO_ALERGIA"}
+_ROLLUP_FIELDS = ("donors_active", "receivers_active", "matches_pending", "matches_delivered")
+
+
+def _kit_key(raw):
+    folded = "".join(
+        c for c in unicodedata.normalize("NFKD", (raw or "").casefold()) if not unicodedata.combining(c)
+    )
+    words = set(re.split(r"[^a-z]+", folded)) - {"kit", "de", "para", "p", ""}
+    parts = {_WORDS.get(word) for word in words}
+    if not parts or None in parts or {"basico", "completo"} <= parts:
+        return ""
+    return _KEYS[("completo" in parts, "alergia" in parts)]
+
+
+def normalizar_kits(apps, schema_editor):
+    """
+    "Basico", "Básico", "KIT_COMPLETO", "complete_allergy"... viram a chave de
+    KIT_CHOICES nos cadastros, na fila e no resumo dos relatórios, para que
+    cadastros do formulário e da importação caiam no mesmo grupo da fila.
+    Valores que não dá para reconhecer ficam como estão.
+    """
+    columns = (("Donor", "kit_type"), ("Receiver", "needed_kit"), ("QueueEntry", "kit"))
+    for model_name, column in columns:
+        model = apps.get_model("core", model_name)
+        for raw in model.objects.values_list(column, flat=True).distinct():
+            key = _kit_key(raw)
+            if key and key != raw:
+                model.objects.filter(**{column: raw}).update(**{column: key})
+
+    # resumo: soma a linha antiga na da chave (pode já existir) e apaga a antiga
+    ReportRollup = apps.get_model("core", "ReportRollup")
+    for row in list(ReportRollup.objects.all()):
+        key = _kit_key(row.kit)
+        if not key or key == row.kit:
+            continue
+        target, _ = ReportRollup.objects.get_or_create(reference_post_id=row.reference_post_id, kit=key)
+        for name in _ROLLUP_FIELDS:
+            setattr(target, name, getattr(target, name) + getattr(row, name))
+        target.save()
+        row.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_report_rollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='donor',
+            name='kit_type',
+            field=models.CharField(choices=[('BASICO', 'Kit Básico'), ('COMPLETO', 'Kit Completo'), ('ALERGIA', 'Kit Alergia'), ('COMPLETO_ALERGIA', 'Kit Completo Alergia')], max_length=30, verbose_name='Tipo de kit doado'),
+        ),
+        migrations.AlterField(
+            model_name='receiver',
+            name='needed_kit',
+            field=models.CharField(choices=[('BASICO', 'Kit Básico'), ('COMPLETO', 'Kit Completo'), ('ALERGIA', 'Kit Alergia'), ('COMPLETO_ALERGIA', 'Kit Completo Alergia')], max_length=30, verbose_name='Tipo de kit necessário'),
+        ),
+        migrations.RunPython(normalizar_kits, migrations.RunPython.noop),
+    ]
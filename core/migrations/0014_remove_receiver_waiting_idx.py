@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:54
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_kit_choices'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='receiver',
+            name='receiver_waiting_idx',
+        ),
+    ]
@@ -1,9 +1,10 @@
-import uuid
-
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
+from core.utils.phone import normalize_phone
+
 
 # =========================
 # POSTOS DE REFERÊNCIA
@@ -51,11 +52,15 @@ class ReferencePost(models.Model):
 class Donor(models.Model):
     KIT_CHOICES = (
         ("BASICO", "Kit Básico"),
+        ("COMPLETO", "Kit Completo"),
         ("ALERGIA", "Kit Alergia"),
+        ("COMPLETO_ALERGIA", "Kit Completo Alergia"),
     )
 
     name = models.CharField("Nome", max_length=120)
     whatsapp = models.CharField("WhatsApp", max_length=20)
+    # forma canônica (+55DDNNNNNNNNN) para dedupe/busca; None se inválido
+    whatsapp_e164 = models.CharField("WhatsApp (E.164)", max_length=16, null=True, blank=True, db_index=True)
 
     kit_type = models.CharField(
         "Tipo de kit doado",
@@ -66,6 +71,19 @@ class Donor(models.Model):
     active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["whatsapp_e164"],
+                condition=models.Q(active=True),
+                name="donor_active_whatsapp_uniq",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.whatsapp_e164 = normalize_phone(self.whatsapp) or None
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.name} ({self.get_kit_type_display()})"
 
@@ -78,6 +96,7 @@ class Receiver(models.Model):
 
     name = models.CharField("Nome", max_length=120)
     whatsapp = models.CharField("WhatsApp", max_length=20)
+    whatsapp_e164 = models.CharField("WhatsApp (E.164)", max_length=16, null=True, blank=True, db_index=True)
     city = models.CharField("Cidade", max_length=100)
     neighborhood = models.CharField("Bairro", max_length=100)
 
@@ -101,6 +120,19 @@ class Receiver(models.Model):
     active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["whatsapp_e164"],
+                condition=models.Q(active=True),
+                name="receiver_active_whatsapp_uniq",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.whatsapp_e164 = normalize_phone(self.whatsapp) or None
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.name} ({self.get_needed_kit_display()})"
 
@@ -141,13 +173,32 @@ class Match(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # "tem match em aberto?" — só as linhas pendentes entram no índice
+            models.Index(
+                fields=["receiver"],
+                condition=models.Q(is_completed=False),
+                name="match_open_receiver_idx",
+            ),
+            models.Index(
+                fields=["donor"],
+                condition=models.Q(is_completed=False),
+                name="match_open_donor_idx",
+            ),
+            # paginação por cursor do /api/matches/ (pendentes, do mais antigo)
+            models.Index(
+                fields=["created_at", "id"],
+                condition=models.Q(is_completed=False),
+                name="match_open_feed_idx",
+            ),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.pickup_code:
-            while True:
-                code = f"CS-{uuid.uuid4().hex[:8].upper()}"
-                if not Match.objects.filter(pickup_code=code).exists():
-                    self.pickup_code = code
-                    break
+            from core.services.pickup_codes import allocate_pickup_codes
+
+            self.pickup_code = allocate_pickup_codes(1)[0]
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -155,6 +206,184 @@ class Match(models.Model):
         return f"{self.receiver.name} ← {self.donor.name} ({self.pickup_code}) [{status}]"
 
 
+# =========================
+# OUTBOX DE NOTIFICAÇÕES
+# =========================
+class Outbox(models.Model):
+    """
+    Mensagem de WhatsApp a enviar, gravada na mesma transação do Match.
+    O envio de verdade fica com o worker (manage.py notify_worker), fora
+    do request. Entrega "pelo menos uma vez": uma linha travada por um
+    worker que morreu volta para a fila quando o lease vence.
+    """
+    STATUS_PENDING = "PENDING"
+    STATUS_SENDING = "SENDING"
+    STATUS_SENT = "SENT"
+    STATUS_DEAD = "DEAD"
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "Pendente"),
+        (STATUS_SENDING, "Enviando"),
+        (STATUS_SENT, "Enviada"),
+        (STATUS_DEAD, "Desistida"),
+    )
+
+    RECIPIENT_CHOICES = (
+        ("DONOR", "Doadora"),
+        ("RECEIVER", "Receptora"),
+    )
+
+    match = models.ForeignKey(
+        Match,
+        on_delete=models.CASCADE,
+        related_name="outbox",
+        verbose_name="Match"
+    )
+
+    recipient = models.CharField("Destinatária", max_length=10, choices=RECIPIENT_CHOICES)
+    phone = models.CharField("WhatsApp", max_length=30)
+    message = models.TextField("Mensagem")
+
+    status = models.CharField(
+        "Situação",
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING
+    )
+
+    attempts = models.PositiveIntegerField("Tentativas", default=0)
+    next_attempt_at = models.DateTimeField("Próxima tentativa", default=timezone.now)
+    locked_until = models.DateTimeField("Travada até", null=True, blank=True)
+    claim_token = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField("Último erro", blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField("Enviada em", null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_due_idx"),
+        ]
+        constraints = [
+            # uma notificação por destinatária por match
+            models.UniqueConstraint(fields=["match", "recipient"], name="outbox_match_recipient_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_recipient_display()} {self.phone} — match {self.match_id} [{self.status}]"
+
+
+# =========================
+# SEQUÊNCIA DOS CÓDIGOS DE RETIRADA
+# =========================
+class PickupCodeSequence(models.Model):
+    """
+    Contador monotônico que alimenta o gerador de códigos de retirada.
+    Cada processo reserva um bloco de números de uma vez (ver
+    core.services.pickup_codes); o código nunca é o número em si.
+    """
+    name = models.CharField(max_length=30, primary_key=True)
+    next_value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+
+# =========================
+# FILA DE ESPERA (MATCHING)
+# =========================
+class QueueEntry(models.Model):
+    """
+    Doadora ou receptora aguardando par no posto, para um tipo de kit.
+    Uma linha por cadastro em espera; a linha sai da fila quando vira Match.
+    A ordem FIFO é a do id (monotônico).
+    """
+    SIDE_DONOR = "DONOR"
+    SIDE_RECEIVER = "RECEIVER"
+    SIDE_CHOICES = (
+        (SIDE_DONOR, "Doadora"),
+        (SIDE_RECEIVER, "Receptora"),
+    )
+
+    side = models.CharField("Lado", max_length=10, choices=SIDE_CHOICES)
+
+    reference_post = models.ForeignKey(
+        ReferencePost,
+        on_delete=models.PROTECT,
+        verbose_name="Posto de referência"
+    )
+
+    kit = models.CharField("Tipo de kit", max_length=30)
+
+    donor = models.ForeignKey(
+        Donor,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        verbose_name="Doador"
+    )
+
+    receiver = models.ForeignKey(
+        Receiver,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        verbose_name="Receptora"
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["side", "reference_post", "kit", "id"],
+                name="queue_head_idx",
+            ),
+        ]
+
+    def __str__(self):
+        who = self.donor if self.side == self.SIDE_DONOR else self.receiver
+        return f"[{self.get_side_display()}] {who} @ posto {self.reference_post_id} ({self.kit})"
+
+
+# =========================
+# RESUMO DOS RELATÓRIOS
+# =========================
+class ReportRollup(models.Model):
+    """
+    Contadores do relatório do admin por (posto, kit), mantidos a cada
+    cadastro/match/entrega (core.services.reports). Doadoras não têm posto:
+    ficam nas linhas com reference_post vazio.
+    """
+    reference_post = models.ForeignKey(
+        ReferencePost,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        verbose_name="Posto de referência"
+    )
+
+    kit = models.CharField("Tipo de kit", max_length=30)
+
+    donors_active = models.IntegerField("Doadoras ativas", default=0)
+    receivers_active = models.IntegerField("Receptoras ativas", default=0)
+    matches_pending = models.IntegerField("Matches pendentes", default=0)
+    matches_delivered = models.IntegerField("Matches entregues", default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["reference_post", "kit"], name="rollup_post_kit_uniq"),
+            # NULL não colide em UNIQUE: as linhas sem posto têm a sua própria
+            models.UniqueConstraint(
+                fields=["kit"],
+                condition=models.Q(reference_post__isnull=True),
+                name="rollup_no_post_kit_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"posto {self.reference_post_id or '-'} / {self.kit}"
+
+
 # =========================
 # PERFIL DE USUÁRIO (CAIXA C)
 # =========================
@@ -2,43 +2,16 @@
 import re
 from django.utils.html import strip_tags
 
-BAD_WORDS = {
-    # ajuste depois — MVP só precisa do básico
-    "matar", "suic", "bomba", "arma", "odio", "naz", "estupr",
-    "vaga de emprego", "pix grátis", "golpe",
-}
+from core.utils import content_filter
+from core.utils.phone import normalize_phone
 
 def normalize_whatsapp(raw: str) -> str:
     """
-    Normaliza para +55DD9XXXXXXXX
+    Normaliza para +55DD9XXXXXXXX (só celular).
     Aceita entradas com espaços/traços/parênteses e com/sem +55.
     """
-    if not raw:
-        return ""
-
-    digits = re.sub(r"\D+", "", raw)
-
-    # Se veio com 00 (ex: 0055...), tira prefixo internacional genérico
-    if digits.startswith("00"):
-        digits = digits[2:]
-
-    # Se não tem DDI, assume BR
-    if not digits.startswith("55"):
-        digits = "55" + digits
-
-    # Agora precisa ter 55 + DDD(2) + número(9)
-    # total = 13 dígitos (55 + 2 + 9)
-    if len(digits) != 13:
-        return ""
-
-    ddd = digits[2:4]
-    number = digits[4:]
-
-    # regra simples: celular BR começa com 9 e DDD não pode ser "00"
-    if ddd == "00" or not number.startswith("9"):
-        return ""
-
-    return f"+{digits}"
+    e164 = normalize_phone(raw)
+    return e164 if len(e164) == 14 else ""
 
 def clean_text(raw: str, max_len: int = 120) -> str:
     if not raw:
@@ -48,5 +21,4 @@ def clean_text(raw: str, max_len: int = 120) -> str:
     return txt[:max_len]
 
 def has_bad_words(*texts: str) -> bool:
-    blob = " ".join(t.lower() for t in texts if t)
-    return any(w in blob for w in BAD_WORDS)
+    return content_filter.contains_bad_words(*texts)
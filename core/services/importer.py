@@ -0,0 +1,319 @@
+"""
+Importação em lote de cadastros (planilhas das ONGs parceiras).
+
+As linhas são lidas em streaming (CSV ou JSONL) e tratadas em lotes:
+mesma sanitização/validação dos formulários (clean_text, telefone canônico,
+filtro de palavras, dedupe por WhatsApp ativo), um bulk_create por lote numa
+transação, e as linhas recusadas vão para um arquivo de rejeitos (JSONL)
+com o número da linha e os motivos.
+
+Doadoras e receptoras importadas entram no fim das filas de espera
+(QueueEntry) dos seus postos; no final, o pareamento roda só nos
+(posto, kit) que receberam gente nova.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.db import IntegrityError
+
+from core.db import write_atomic
+from core.models import Donor, QueueEntry, Receiver, ReferencePost
+from core.services import match_service, post_catalogue, reports
+from core.utils.content_filter import fold, get_filter
+from core.utils.phone import national, normalize_many
+from core.utils.validators import clean_text, normalize_kit
+
+KINDS = ("donor", "receiver", "post")
+POST_TYPES = {key for key, _ in ReferencePost._meta.get_field("type").choices}
+TRUE_VALUES = {"1", "true", "sim", "s", "yes", "y", "x"}
+
+
+# ---------------- LEITURA ---------------- #
+
+def read_rows(fh, fmt):
+    """Gera (número da linha, dict) de um arquivo CSV (com cabeçalho) ou JSONL."""
+    if fmt == "csv":
+        reader = csv.DictReader(fh)
+        for row in reader:
+            yield reader.line_num, {(k or "").strip().lower(): v for k, v in row.items()}
+        return
+
+    for line_no, line in enumerate(fh, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        if not isinstance(row, dict):
+            yield line_no, {"_raw": line.rstrip("\n")}
+            continue
+        yield line_no, {str(k).strip().lower(): v for k, v in row.items()}
+
+
+def _first(row, *names):
+    for name in names:
+        value = row.get(name)
+        if value not in (None, ""):
+            return str(value)
+    return ""
+
+
+def _flag(value, default):
+    if value in (None, ""):
+        return default
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+# ---------------- VALIDAÇÃO ---------------- #
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    imported: int = 0
+    rejected: int = 0
+    matched: int = 0
+    groups: set = field(default_factory=set)
+
+
+class _Importer:
+    model = None
+    side = None
+
+    def __init__(self):
+        self.bad_words = get_filter()
+        self.posts = {}
+        for pk, name in ReferencePost.objects.values_list("id", "name"):
+            self.posts[str(pk)] = pk
+            self.posts.setdefault(fold(name).strip(), pk)
+        self.seen_phones = set()
+
+    def post_id(self, row):
+        ref = _first(row, "reference_post", "reference_post_id", "posto").strip()
+        return self.posts.get(ref) or self.posts.get(fold(ref).strip())
+
+    def validate(self, batch):
+        """[(linha, row)] -> ([(linha, obj, post_id)], [(linha, row, erros)])."""
+        raise NotImplementedError
+
+    def existing_phones(self, phones):
+        return set(
+            self.model.objects.filter(active=True, whatsapp_e164__in=phones)
+            .values_list("whatsapp_e164", flat=True)
+        )
+
+    def save(self, valid):
+        objs = self.model.objects.bulk_create([obj for _, obj, _ in valid])
+        reports.created(objs)  # bulk_create não passa pelos signals
+        QueueEntry.objects.bulk_create([
+            QueueEntry(
+                side=self.side,
+                reference_post_id=post_id,
+                kit=self.kit_of(obj),
+                **{self.model.__name__.lower(): obj},
+            )
+            for obj, (_, _, post_id) in zip(objs, valid)
+        ])
+        return {(post_id, self.kit_of(obj)) for obj, (_, _, post_id) in zip(objs, valid)}
+
+
+class _PersonImporter(_Importer):
+    kit_columns = ()
+
+    def validate(self, batch):
+        raw_phones = [clean_text(_first(row, "whatsapp", "telefone", "phone"), max_len=30) for _, row in batch]
+        phones = normalize_many(raw_phones)
+        taken = self.existing_phones([p for p in phones if p])
+
+        valid, rejects = [], []
+        for (line_no, row), whatsapp_raw, e164 in zip(batch, raw_phones, phones):
+            if "_raw" in row:
+                rejects.append((line_no, row, ["Linha não é um objeto JSON."]))
+                continue
+            errors = []
+            fields = self.clean(row)
+            kit = normalize_kit(fields["kit_raw"])
+            post_id = self.post_id(row)
+
+            if not fields["name"]:
+                errors.append("Nome é obrigatório.")
+            if not e164:
+                errors.append("WhatsApp inválido.")
+            elif e164 in taken or e164 in self.seen_phones:
+                errors.append("WhatsApp já cadastrado.")
+            if not kit:
+                errors.append("Tipo de kit inválido.")
+            if not post_id:
+                errors.append("Posto de referência inválido.")
+            errors += self.extra_errors(fields)
+            if self.bad_words.contains(fields["name"], fields["kit_raw"], whatsapp_raw):
+                errors.append("Por segurança, revise o texto informado.")
+
+            if errors:
+                rejects.append((line_no, row, errors))
+                continue
+            self.seen_phones.add(e164)
+            valid.append((line_no, self.build(fields, kit, e164, post_id), post_id))
+        return valid, rejects
+
+    def clean(self, row):
+        return {
+            "name": clean_text(_first(row, "name", "nome"), max_len=80),
+            "kit_raw": clean_text(_first(row, *self.kit_columns), max_len=40),
+        }
+
+    def extra_errors(self, fields):
+        return []
+
+
+class DonorImporter(_PersonImporter):
+    model = Donor
+    side = QueueEntry.SIDE_DONOR
+    kit_columns = ("kit_type", "preferred_kit", "kit")
+
+    def build(self, fields, kit, e164, post_id):
+        return Donor(
+            name=fields["name"], whatsapp=national(e164), whatsapp_e164=e164, kit_type=kit, active=True
+        )
+
+    def kit_of(self, obj):
+        return obj.kit_type
+
+
+class ReceiverImporter(_PersonImporter):
+    model = Receiver
+    side = QueueEntry.SIDE_RECEIVER
+    kit_columns = ("needed_kit", "kit_type", "kit")
+
+    def clean(self, row):
+        fields = super().clean(row)
+        fields["city"] = clean_text(_first(row, "city", "cidade"), max_len=40)
+        fields["neighborhood"] = clean_text(_first(row, "neighborhood", "bairro"), max_len=60)
+        fields["is_breast_cancer_patient"] = _flag(row.get("is_breast_cancer_patient"), False)
+        return fields
+
+    def extra_errors(self, fields):
+        errors = []
+        if not fields["city"]:
+            errors.append("Cidade é obrigatória.")
+        if not fields["neighborhood"]:
+            errors.append("Bairro é obrigatório.")
+        return errors
+
+    def build(self, fields, kit, e164, post_id):
+        return Receiver(
+            name=fields["name"],
+            whatsapp=national(e164),
+            whatsapp_e164=e164,
+            city=fields["city"],
+            neighborhood=fields["neighborhood"],
+            needed_kit=kit,
+            reference_post_id=post_id,
+            is_breast_cancer_patient=fields["is_breast_cancer_patient"],
+            active=True,
+        )
+
+    def kit_of(self, obj):
+        return obj.needed_kit
+
+
+class PostImporter(_Importer):
+    model = ReferencePost
+
+    def __init__(self):
+        super().__init__()
+        self.seen = {
+            (fold(name).strip(), fold(city).strip())
+            for name, city in ReferencePost.objects.values_list("name", "city")
+        }
+
+    def validate(self, batch):
+        valid, rejects = [], []
+        for line_no, row in batch:
+            if "_raw" in row:
+                rejects.append((line_no, row, ["Linha não é um objeto JSON."]))
+                continue
+            post = ReferencePost(
+                name=clean_text(_first(row, "name", "nome"), max_len=150),
+                city=clean_text(_first(row, "city", "cidade"), max_len=100),
+                neighborhood_coverage=clean_text(_first(row, "neighborhood_coverage", "bairros"), max_len=200),
+                contact_name=clean_text(_first(row, "contact_name", "responsavel"), max_len=100),
+                contact_phone=clean_text(_first(row, "contact_phone", "telefone"), max_len=30),
+                type=clean_text(_first(row, "type", "tipo"), max_len=20).lower(),
+                can_receive_donations=_flag(row.get("can_receive_donations"), True),
+                public=_flag(row.get("public"), True),
+            )
+            key = (fold(post.name).strip(), fold(post.city).strip())
+            errors = []
+            if not post.name or not post.city:
+                errors.append("Nome e cidade são obrigatórios.")
+            elif key in self.seen:
+                errors.append("Posto já cadastrado nesta cidade.")
+            if post.type not in POST_TYPES:
+                errors.append(f"Tipo de posto inválido (use {', '.join(sorted(POST_TYPES))}).")
+            if self.bad_words.contains(post.name, post.neighborhood_coverage, post.contact_name):
+                errors.append("Por segurança, revise o texto informado.")
+            if errors:
+                rejects.append((line_no, row, errors))
+                continue
+            self.seen.add(key)
+            valid.append((line_no, post, None))
+        return valid, rejects
+
+    def save(self, valid):
+        ReferencePost.objects.bulk_create([obj for _, obj, _ in valid])
+        post_catalogue.bump_version()  # bulk_create não passa pelos signals
+        return set()
+
+
+IMPORTERS = {"donor": DonorImporter, "receiver": ReceiverImporter, "post": PostImporter}
+
+
+# ---------------- IMPORTAÇÃO ---------------- #
+
+def import_registrations(kind, rows, chunk_size=2000, rejects=None, dry_run=False, match=True, progress=None):
+    """
+    Importa `rows` ([(linha, dict)], em streaming) do tipo `kind`.
+    `rejects`: arquivo aberto para as linhas recusadas (JSONL).
+    Retorna ImportStats.
+    """
+    importer = IMPORTERS[kind]()
+    stats = ImportStats()
+    rows = iter(rows)
+
+    while True:
+        batch = list(islice(rows, chunk_size))
+        if not batch:
+            break
+        stats.read += len(batch)
+
+        for attempt in range(3):
+            valid, rejected = importer.validate(batch)
+            if dry_run or not valid:
+                break
+            try:
+                with write_atomic():
+                    stats.groups |= importer.save(valid)
+                break
+            except IntegrityError:
+                # um formulário cadastrou o mesmo WhatsApp no meio do lote:
+                # valida de novo (o dedupe agora enxerga essa linha)
+                if attempt == 2:
+                    raise
+                for _, obj, _ in valid:
+                    importer.seen_phones.discard(getattr(obj, "whatsapp_e164", None))
+
+        stats.imported += len(valid)
+        stats.rejected += len(rejected)
+        if rejects is not None:
+            for line_no, row, errors in rejected:
+                rejects.write(json.dumps({"line": line_no, "errors": errors, "row": row}, ensure_ascii=False) + "\n")
+        if progress:
+            progress(stats)
+
+    if match and not dry_run:
+        for post_id, kit in sorted(stats.groups):
+            stats.matched += match_service.sweep_group(post_id, kit, chunk_size=chunk_size)
+    return stats
@@ -0,0 +1,112 @@
+"""
+Exportação de matches (CSV/JSONL) em streaming.
+
+Uma única query com os joins de doadora, receptora e posto, lida com
+.values_list().iterator(chunk_size): nada de instâncias de model nem de
+lista inteira em memória, então exportar um ano custa a mesma memória que
+exportar um dia. Usado pela action do admin e por manage.py export_matches.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from django.utils import timezone
+
+from core.models import Match
+
+# (cabeçalho, caminho no .values_list)
+COLUMNS = (
+    ("id", "id"),
+    ("pickup_code", "pickup_code"),
+    ("is_completed", "is_completed"),
+    ("created_at", "created_at"),
+    ("reference_post_id", "reference_post_id"),
+    ("reference_post", "reference_post__name"),
+    ("reference_post_city", "reference_post__city"),
+    ("kit", "donor__kit_type"),
+    ("donor", "donor__name"),
+    ("donor_whatsapp", "donor__whatsapp"),
+    ("receiver", "receiver__name"),
+    ("receiver_whatsapp", "receiver__whatsapp"),
+    ("receiver_city", "receiver__city"),
+    ("receiver_neighborhood", "receiver__neighborhood"),
+)
+HEADER = [name for name, _ in COLUMNS]
+STATUSES = ("all", "pending", "completed")
+CONTENT_TYPES = {"csv": "text/csv; charset=utf-8", "jsonl": "application/x-ndjson; charset=utf-8"}
+
+_FORMULA_START = ("=", "+", "-", "@")
+
+
+def filter_matches(queryset=None, post=None, status="all", since=None, until=None):
+    """
+    post: id do posto; status: all | pending | completed;
+    since/until: datas (inclusive), no fuso do projeto.
+    """
+    queryset = Match.objects.all() if queryset is None else queryset
+    if post:
+        queryset = queryset.filter(reference_post_id=post)
+    if status == "pending":
+        queryset = queryset.filter(is_completed=False)
+    elif status == "completed":
+        queryset = queryset.filter(is_completed=True)
+    if since:
+        queryset = queryset.filter(created_at__gte=timezone.make_aware(datetime.combine(since, time.min)))
+    if until:
+        next_day = datetime.combine(until + timedelta(days=1), time.min)
+        queryset = queryset.filter(created_at__lt=timezone.make_aware(next_day))
+    return queryset
+
+
+def export_rows(queryset, chunk_size=2000):
+    """Tuplas na ordem de COLUMNS, lidas do banco aos poucos."""
+    return (
+        queryset.order_by("id")
+        .values_list(*(path for _, path in COLUMNS))
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def _cell(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat(timespec="seconds")
+    if isinstance(value, str) and value.startswith(_FORMULA_START):
+        return "'" + value  # planilha não executa como fórmula
+    return value
+
+
+class _Echo:
+    """"Arquivo" do csv.writer que só devolve a linha escrita."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield "\ufeff" + writer.writerow(HEADER)  # BOM: o Excel abre em UTF-8
+    for row in rows:
+        yield writer.writerow([_cell(v) for v in row])
+
+
+def iter_jsonl(rows):
+    for row in rows:
+        record = dict(zip(HEADER, row))
+        record["created_at"] = _cell(record["created_at"])
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def iter_export(queryset, fmt="csv", chunk_size=2000, lines_per_write=500):
+    """Pedaços de texto do arquivo, cada um com até lines_per_write linhas."""
+    rows = export_rows(queryset, chunk_size=chunk_size)
+    lines = iter_csv(rows) if fmt == "csv" else iter_jsonl(rows)
+    while True:
+        block = "".join(islice(lines, lines_per_write))
+        if not block:
+            return
+        yield block
+
+
+def filename(fmt):
+    return f"matches-{timezone.localdate():%Y%m%d}.{fmt}"
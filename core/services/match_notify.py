@@ -1,52 +1,43 @@
-from django.utils import timezone
+from core.messages import MATCH_NOTIFICATION, render_many
+from core.models import Match, Outbox
 
-def notify_match(match):
-    """
-    Envia/gera a mensagem de notificação de Match sem depender de campos antigos.
-    Fonte do kit:
-      - donor.kit_type (doadora)
-      - receiver.needed_kit (receptora)
-    """
 
-    # Evita duplicar notificação
-    if getattr(match, "notified", False):
-        return
-
-    donor = match.donor
-    receiver = match.receiver
-    post = match.reference_post
-
-    # Tipo de kit (compatível com seu modelo)
-    kit_label = donor.get_kit_type_display()  # ✅ CERTO pro seu Donor
-
-    # Mensagem base (você adapta pro WhatsApp depois)
-    message = (
-        f"✅ Match gerado!\n"
-        f"📦 Kit: {kit_label}\n"
-        f"🔑 Código de retirada: {match.pickup_code}\n"
-        f"🏥 Posto: {post.name} - {post.city}\n"
-        f"👤 Doadora: {donor.name}\n"
-        f"🤍 Receptora: {receiver.name}\n"
-    )
+def build_match_message(match):
+    """Mensagem de notificação de Match (kit vem de donor.kit_type)."""
+    return MATCH_NOTIFICATION.render_instance(match)
 
-    # Aqui você chamaria seu envio real (quando quiser):
-    # send_whatsapp(donor.whatsapp, message)
-    # send_whatsapp(receiver.whatsapp, message)
 
-    # Marca como notificado (se você adicionou notified/notified_at no model)
-    if hasattr(match, "notified"):
-        match.notified = True
-    if hasattr(match, "notified_at"):
-        match.notified_at = timezone.now()
+def _outbox_rows(match, message):
+    return [
+        Outbox(match=match, recipient="DONOR", phone=match.donor.whatsapp, message=message),
+        Outbox(match=match, recipient="RECEIVER", phone=match.receiver.whatsapp, message=message),
+    ]
 
-    # Salva somente os campos que existem
-    update_fields = []
-    if hasattr(match, "notified"):
-        update_fields.append("notified")
-    if hasattr(match, "notified_at"):
-        update_fields.append("notified_at")
 
-    if update_fields:
-        match.save(update_fields=update_fields)
+def notify_match(match):
+    """
+    Enfileira no Outbox a notificação do Match para doadora e receptora.
+    Roda na transação de quem criou o Match: se ela for desfeita, a
+    notificação some junto. O envio é feito pelo notify_worker.
+    Chamar de novo para o mesmo Match não duplica (uma linha por destinatária).
+    """
+    message = build_match_message(match)
+    Outbox.objects.bulk_create(_outbox_rows(match, message), ignore_conflicts=True)
+    return message  # útil pra debug
+
 
-    return message  # útil pra debug
\ No newline at end of file
+def notify_matches(match_ids):
+    """
+    Versão em lote de notify_match, para matches criados via bulk_create.
+    Lê só as colunas da mensagem (.values()), sem montar instâncias.
+    """
+    rows = list(
+        Match.objects.filter(id__in=match_ids).values(
+            "id", "donor__whatsapp", "receiver__whatsapp", *MATCH_NOTIFICATION.columns
+        )
+    )
+    outbox = []
+    for row, message in zip(rows, render_many(MATCH_NOTIFICATION, rows)):
+        outbox.append(Outbox(match_id=row["id"], recipient="DONOR", phone=row["donor__whatsapp"], message=message))
+        outbox.append(Outbox(match_id=row["id"], recipient="RECEIVER", phone=row["receiver__whatsapp"], message=message))
+    Outbox.objects.bulk_create(outbox, ignore_conflicts=True)
@@ -1,10 +1,193 @@
-def create_match(donor, receiver):
+"""
+Motor de matching em duas mãos.
+
+Doadoras e receptoras em espera ficam em filas FIFO por (posto, kit),
+materializadas na tabela QueueEntry. Quando alguém chega, basta olhar a
+cabeça da fila do lado oposto: se houver par, vira Match; se não, entra
+no fim da própria fila. Cada cadastro custa um número constante de queries.
+"""
+from django.db import connection
+from django.db.models import Count, Q
+
+from core.db import write_atomic
+from core.models import Match, QueueEntry
+from core.services import reports
+from core.services.match_notify import notify_matches
+from core.services.pickup_codes import allocate_pickup_codes
+
+
+def _active(side):
+    """
+    Só quem continua ativo. O signal tira da fila quem é desativado num
+    save(); um update(active=False) em lote não passa por ele.
+    """
+    return {"donor__active" if side == QueueEntry.SIDE_DONOR else "receiver__active": True}
+
+
+def _pop_head(side, reference_post_id, kit):
+    """
+    Reivindica (claim) e devolve a entrada mais antiga da fila
+    (side, posto, kit), ou None se a fila estiver vazia.
+
+    - Bancos com SKIP LOCKED (PostgreSQL, MySQL 8, Oracle): trava a cabeça
+      da fila e pula as linhas já travadas por outras transações, sem
+      serializar os workers.
+    - SQLite e afins: compare-and-set — a entrada só é nossa se o DELETE
+      dela apagar exatamente uma linha; se outro worker levou antes, tenta
+      a próxima.
+    Deve rodar dentro de write_atomic().
+    """
+    head = (
+        QueueEntry.objects
+        .select_related("donor", "receiver")
+        .filter(side=side, reference_post_id=reference_post_id, kit=kit, **_active(side))
+        .order_by("id")
+    )
+
+    if connection.features.has_select_for_update_skip_locked:
+        entry = head.select_for_update(skip_locked=True, of=("self",)).first()
+        if entry is not None:
+            entry.delete()
+        return entry
+
+    while True:
+        entry = head.first()
+        if entry is None:
+            return None
+        deleted, _ = QueueEntry.objects.filter(pk=entry.pk).delete()
+        if deleted:
+            return entry
+
+
+def create_match(donor, receiver, reference_post_id):
     """
     Cria um Match válido.
     O tipo de kit vem do donor / receiver, não do Match.
     """
-    return {
-        "donor": donor,
-        "receiver": receiver,
-        "kit": donor.get_preferred_kit_display()
-    }
\ No newline at end of file
+    return Match.objects.create(
+        donor=donor,
+        receiver=receiver,
+        reference_post_id=reference_post_id,
+    )
+
+
+def match_donor(donor, reference_post_id):
+    """
+    Doadora recém-cadastrada: pareia com a receptora mais antiga do posto
+    para o mesmo kit ou entra na fila de doadoras.
+    Retorna o Match criado ou None.
+    """
+    with write_atomic():
+        entry = _pop_head(QueueEntry.SIDE_RECEIVER, reference_post_id, donor.kit_type)
+        if entry:
+            return create_match(donor, entry.receiver, reference_post_id)
+
+        QueueEntry.objects.create(
+            side=QueueEntry.SIDE_DONOR,
+            reference_post_id=reference_post_id,
+            kit=donor.kit_type,
+            donor=donor,
+        )
+        return None
+
+
+def match_receiver(receiver):
+    """
+    Receptora recém-cadastrada: pareia com a doadora mais antiga do posto
+    dela para o mesmo kit ou entra na fila de receptoras.
+    Retorna o Match criado ou None.
+    """
+    with write_atomic():
+        entry = _pop_head(QueueEntry.SIDE_DONOR, receiver.reference_post_id, receiver.needed_kit)
+        if entry:
+            return create_match(entry.donor, receiver, receiver.reference_post_id)
+
+        QueueEntry.objects.create(
+            side=QueueEntry.SIDE_RECEIVER,
+            reference_post_id=receiver.reference_post_id,
+            kit=receiver.needed_kit,
+            receiver=receiver,
+        )
+        return None
+
+
+# =========================
+# Varredura em lote (backlog)
+# =========================
+class _ChunkConflict(Exception):
+    """Alguma entrada do lote foi consumida por outro processo no meio do caminho."""
+
+
+def _head(side, reference_post_id, kit, after_id, size):
+    return list(
+        QueueEntry.objects
+        .filter(side=side, reference_post_id=reference_post_id, kit=kit, id__gt=after_id, **_active(side))
+        .order_by("id")
+        .values_list("id", "donor_id" if side == QueueEntry.SIDE_DONOR else "receiver_id")[:size]
+    )
+
+
+def pending_groups(reference_post_id=None):
+    """(posto, kit) que têm doadora e receptora esperando ao mesmo tempo."""
+    groups = QueueEntry.objects.filter(Q(donor__active=True) | Q(receiver__active=True))
+    if reference_post_id is not None:
+        groups = groups.filter(reference_post_id=reference_post_id)
+    return list(
+        groups
+        .values("reference_post_id", "kit")
+        .annotate(
+            donors=Count("id", filter=Q(side=QueueEntry.SIDE_DONOR)),
+            receivers=Count("id", filter=Q(side=QueueEntry.SIDE_RECEIVER)),
+        )
+        .filter(donors__gt=0, receivers__gt=0)
+        .order_by("reference_post_id", "kit")
+    )
+
+
+def sweep_group(reference_post_id, kit, chunk_size=1000, dry_run=False):
+    """
+    Pareia em FIFO todas as doadoras e receptoras em espera de um (posto, kit).
+    Lê as duas filas em páginas por id, casa par a par e grava cada página
+    com bulk_create numa transação; os códigos de retirada do lote saem de
+    uma só vez do gerador. Retorna quantos pares foram (ou seriam) criados.
+
+    bulk_create não dispara post_save: a notificação do lote vai para o
+    Outbox e os contadores do relatório são somados explicitamente, na
+    mesma transação.
+    """
+    created = 0
+    last_donor = last_receiver = 0
+
+    while True:
+        try:
+            with write_atomic():
+                donors = _head(QueueEntry.SIDE_DONOR, reference_post_id, kit, last_donor, chunk_size)
+                receivers = _head(QueueEntry.SIDE_RECEIVER, reference_post_id, kit, last_receiver, chunk_size)
+                pairs = list(zip(donors, receivers))
+                if not pairs:
+                    return created
+
+                if not dry_run:
+                    entry_ids = [d[0] for d, _ in pairs] + [r[0] for _, r in pairs]
+                    deleted, _ = QueueEntry.objects.filter(id__in=entry_ids).delete()
+                    if deleted != len(entry_ids):
+                        raise _ChunkConflict()
+
+                    matches = Match.objects.bulk_create([
+                        Match(
+                            donor_id=donor_id,
+                            receiver_id=receiver_id,
+                            reference_post_id=reference_post_id,
+                            pickup_code=code,
+                        )
+                        for ((_, donor_id), (_, receiver_id)), code in zip(pairs, allocate_pickup_codes(len(pairs)))
+                    ])
+                    notify_matches([match.id for match in matches])
+                    reports.record({(reference_post_id, kit): {"matches_pending": len(matches)}})
+        except _ChunkConflict:
+            # releitura das filas a partir do mesmo ponto
+            continue
+
+        created += len(pairs)
+        last_donor = pairs[-1][0][0]
+        last_receiver = pairs[-1][1][0]
@@ -0,0 +1,73 @@
+"""
+Drenagem do Outbox de notificações (ver models.Outbox).
+
+O worker pega um lote com claim_batch(), envia fora de qualquer transação
+e registra o resultado com mark_sent()/mark_failed(). O claim é um UPDATE
+condicional com um token próprio, então dois workers nunca pegam a mesma
+linha ao mesmo tempo; se um worker morrer, o lease vence e a linha volta
+a ficar disponível (entrega "pelo menos uma vez").
+"""
+import uuid
+from datetime import timedelta
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.models import Outbox
+
+# espera entre tentativas: base * 2^(tentativas-1), com teto
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 6 * 60 * 60
+MAX_ATTEMPTS = 8
+
+
+def _available(now):
+    return Q(status=Outbox.STATUS_PENDING, next_attempt_at__lte=now) | Q(
+        status=Outbox.STATUS_SENDING, locked_until__lt=now
+    )
+
+
+def claim_batch(size=100, lease_seconds=300):
+    """Trava até `size` mensagens vencidas para este worker e as devolve."""
+    now = timezone.now()
+    ids = list(
+        Outbox.objects.filter(_available(now))
+        .order_by("next_attempt_at", "id")
+        .values_list("id", flat=True)[:size]
+    )
+    if not ids:
+        return []
+
+    token = uuid.uuid4().hex
+    Outbox.objects.filter(_available(now), id__in=ids).update(
+        status=Outbox.STATUS_SENDING,
+        claim_token=token,
+        locked_until=now + timedelta(seconds=lease_seconds),
+        attempts=F("attempts") + 1,
+    )
+    return list(Outbox.objects.filter(id__in=ids, claim_token=token).order_by("id"))
+
+
+def mark_sent(rows):
+    Outbox.objects.filter(id__in=[row.id for row in rows], claim_token__in={row.claim_token for row in rows}).update(
+        status=Outbox.STATUS_SENT,
+        sent_at=timezone.now(),
+        locked_until=None,
+        last_error="",
+    )
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS))
+
+
+def mark_failed(row, error, max_attempts=MAX_ATTEMPTS):
+    """Devolve a mensagem para a fila com backoff, ou desiste após max_attempts."""
+    gave_up = row.attempts >= max_attempts
+    Outbox.objects.filter(id=row.id, claim_token=row.claim_token).update(
+        status=Outbox.STATUS_DEAD if gave_up else Outbox.STATUS_PENDING,
+        next_attempt_at=timezone.now() + retry_delay(row.attempts),
+        locked_until=None,
+        last_error=str(error)[:2000],
+    )
+    return not gave_up
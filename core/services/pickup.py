@@ -0,0 +1,117 @@
+"""
+Balcão de retirada: conferir o código e confirmar a entrega.
+
+O código digitado é normalizado antes da busca: caixa, espaços, hífens e o
+prefixo CS- são opcionais, e O/I/L viram 0/1 (como no Crockford base32;
+os códigos antigos em hexadecimal não têm essas letras).
+
+A conferência lê um retrato do match (PickupInfo) guardado no cache com uma
+chave de versão por código: em regime não toca no banco, e quando o match
+muda (confirmação, admin) a versão troca e todos os workers veem em até
+VOLATILE_TIMEOUT. No banco a busca é pelo índice único de pickup_code.
+Retratos e versões vão no cache CACHE_ALIAS, separado do "default": são
+dois por código conferido e não podem empurrar o resto para fora.
+
+A confirmação é um único UPDATE condicional (id, código, posto e ainda não
+concluído): o número de linhas alteradas decide, então dois operadores
+confirmando o mesmo código ao mesmo tempo nunca entregam duas vezes.
+"""
+import re
+from typing import NamedTuple
+
+from django.core.cache import caches
+from django.db import transaction
+
+from core.db import write_atomic
+from core.models import Match
+from core.services import reports
+from core.services.pickup_codes import CODE_PREFIX
+from core.utils import two_tier_cache
+
+CACHE_ALIAS = "pickup"
+CACHE_TIMEOUT = 600
+
+_SEPARATORS = re.compile(r"[\s\-_.]+")
+_CROCKFORD = str.maketrans("OIL", "011")
+
+
+class PickupInfo(NamedTuple):
+    id: int
+    pickup_code: str
+    reference_post_id: int
+    kit: str
+    is_completed: bool
+    donor_name: str
+    receiver_name: str
+    post_name: str
+    post_city: str
+
+
+_FIELDS = (
+    "id", "pickup_code", "reference_post_id", "donor__kit_type", "is_completed",
+    "donor__name", "receiver__name", "reference_post__name", "reference_post__city",
+)
+
+
+def normalize_code(raw):
+    """Forma canônica (CS-XXXXXXXX) do código digitado; "" se não sobrar nada."""
+    compact = _SEPARATORS.sub("", raw or "").upper()
+    if compact.startswith("CS"):  # o corpo nunca começa com CS (hex não tem S; os novos começam em G–Z)
+        compact = compact[2:]
+    return CODE_PREFIX + compact.translate(_CROCKFORD) if compact else ""
+
+
+def _namespace(code):
+    return f"pickup:{normalize_code(code)}"
+
+
+def invalidate(code):
+    """
+    O retrato em cache de `code` deixa de valer (em todos os workers). Troca
+    a versão já e, dentro de uma transação, de novo no commit (como o
+    catálogo de postos): quem releu no meio ainda via o estado antigo.
+    """
+    namespace = _namespace(code)
+    two_tier_cache.bump_version(namespace, using=CACHE_ALIAS)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: two_tier_cache.bump_version(namespace, using=CACHE_ALIAS))
+
+
+def lookup(raw, fresh=False):
+    """PickupInfo do código digitado, ou None. fresh=True ignora o cache."""
+    code = normalize_code(raw)
+    if not code:
+        return None
+    namespace = _namespace(code)
+    cache = caches[CACHE_ALIAS]
+    key = None if fresh else two_tier_cache.versioned_key(namespace, "info", create=False, using=CACHE_ALIAS)
+    info = cache.get(key) if key else None
+    if info is not None:
+        return info
+
+    # o canônico ou, para códigos cadastrados à mão fora do padrão, o que foi digitado
+    row = Match.objects.filter(pickup_code__in={code, raw.strip()}).values_list(*_FIELDS).first()
+    if row is None:
+        return None
+    info = PickupInfo(*row)
+    cache.set(two_tier_cache.versioned_key(namespace, "info", using=CACHE_ALIAS), info, CACHE_TIMEOUT)
+    return info
+
+
+def confirm(info):
+    """
+    Conclui a retirada conferida em `info`. True se esta chamada concluiu;
+    False se outra já concluiu ou o match mudou desde a conferência.
+    """
+    with write_atomic():
+        done = Match.objects.filter(
+            pk=info.id,
+            pickup_code=info.pickup_code,
+            reference_post_id=info.reference_post_id,
+            is_completed=False,
+        ).update(is_completed=True)
+        if done:
+            # update() não passa pelos signals do resumo
+            reports.record({(info.reference_post_id, info.kit): {"matches_pending": -1, "matches_delivered": 1}})
+    invalidate(info.pickup_code)
+    return bool(done)
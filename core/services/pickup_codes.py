@@ -0,0 +1,152 @@
+"""
+Geração de códigos de retirada sem consulta ao banco.
+
+O código é uma permutação com chave (rede de Feistel) de um número tirado
+de um contador monotônico no banco. Como a permutação é bijetora, números
+distintos geram códigos distintos: não há colisão, então não é preciso
+conferir se o código já existe. Para o usuário os códigos não parecem
+sequenciais.
+
+Formato: CS-XXXXXXXX, alfabeto Crockford base32 (sem I, L, O, U). O primeiro
+caractere é sempre uma letra fora do hexadecimal (G–Z), o que separa os
+códigos novos dos antigos (CS- + 8 dígitos hex, gerados por uuid4), que
+portanto também nunca colidem com eles.
+
+Backend configurável em settings.PICKUP_CODE_ALLOCATOR:
+
+    PICKUP_CODE_ALLOCATOR = {
+        "BACKEND": "core.services.pickup_codes.SequenceAllocator",
+        "OPTIONS": {"block_size": 100},
+    }
+
+A chave da permutação vem de settings.PICKUP_CODE_KEY (padrão: SECRET_KEY).
+Ela não pode mudar depois que houver códigos emitidos com ela.
+"""
+import hashlib
+import os
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils.module_loading import import_string
+
+CODE_PREFIX = "CS-"
+BASE32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+# letras Crockford que não existem em hexadecimal: 16 = 4 bits
+FIRST_CHAR = "GHJKMNPQRSTVWXYZ"
+
+HALF_BITS = 20
+HALF_MASK = (1 << HALF_BITS) - 1
+# 4 bits do primeiro caractere + 7 caracteres base32 * 5 bits
+CODE_BITS = 39
+CODE_SPACE = 1 << CODE_BITS
+ROUNDS = 4
+
+
+class PickupCodeAllocator:
+    """Interface dos geradores: allocate(n) devolve n códigos inéditos."""
+
+    def allocate(self, n=1):
+        raise NotImplementedError
+
+
+class SequenceAllocator(PickupCodeAllocator):
+    """
+    Reserva blocos do contador PickupCodeSequence (um UPDATE por bloco) e
+    entrega os números do bloco em memória, embaralhados pela permutação.
+
+    A reserva roda na transação de quem pediu o código. A sobra do bloco só
+    fica guardada para os próximos pedidos depois do commit: se a transação
+    for desfeita, o contador volta e a sobra é descartada junto.
+    """
+
+    def __init__(self, block_size=100, sequence="pickup_code", key=None):
+        self.block_size = block_size
+        self.sequence = sequence
+        secret = key or getattr(settings, "PICKUP_CODE_KEY", None) or settings.SECRET_KEY
+        self._key = hashlib.blake2b(secret.encode(), digest_size=32, person=b"pickup-code").digest()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._next = self._end = 0
+
+    # ---- contador ----
+
+    def _reserve(self, n):
+        from core.models import PickupCodeSequence
+
+        counter = PickupCodeSequence.objects.filter(name=self.sequence)
+        with transaction.atomic():
+            if not counter.update(next_value=F("next_value") + n):
+                PickupCodeSequence.objects.get_or_create(name=self.sequence)
+                counter.update(next_value=F("next_value") + n)
+            end = counter.values_list("next_value", flat=True).get()
+        if end > CODE_SPACE:
+            raise RuntimeError("Espaço de códigos de retirada esgotado.")
+        return end - n, end
+
+    def _take_spare(self, n):
+        with self._lock:
+            if self._pid != os.getpid():
+                # processo filho (fork) não pode reaproveitar o bloco do pai
+                self._pid = os.getpid()
+                self._next = self._end = 0
+            start = self._next
+            self._next = min(self._end, start + n)
+            return list(range(start, self._next))
+
+    def _adopt(self, start, end):
+        with self._lock:
+            if self._pid == os.getpid() and self._next >= self._end:
+                self._next, self._end = start, end
+
+    def allocate(self, n=1):
+        numbers = self._take_spare(n)
+        missing = n - len(numbers)
+        if missing:
+            start, end = self._reserve(max(missing, self.block_size))
+            numbers.extend(range(start, start + missing))
+            if start + missing < end:
+                transaction.on_commit(lambda: self._adopt(start + missing, end))
+        return [self.encode(self.permute(number)) for number in numbers]
+
+    # ---- permutação e formato ----
+
+    def _round(self, i, half):
+        digest = hashlib.blake2b(
+            half.to_bytes(3, "big"), digest_size=4, key=self._key, salt=bytes([i]) * 16
+        ).digest()
+        return int.from_bytes(digest, "big") & HALF_MASK
+
+    def permute(self, number):
+        """Bijeção em [0, 2^39): Feistel de 40 bits com cycle-walking."""
+        value = number
+        while True:
+            left, right = value >> HALF_BITS, value & HALF_MASK
+            for i in range(ROUNDS):
+                left, right = right, left ^ self._round(i, right)
+            value = (left << HALF_BITS) | right
+            if value < CODE_SPACE:
+                return value
+
+    @staticmethod
+    def encode(value):
+        chars = []
+        for _ in range(7):
+            chars.append(BASE32[value & 31])
+            value >>= 5
+        chars.append(FIRST_CHAR[value])
+        return CODE_PREFIX + "".join(reversed(chars))
+
+
+@lru_cache(maxsize=None)
+def get_allocator():
+    config = getattr(settings, "PICKUP_CODE_ALLOCATOR", {})
+    backend = import_string(config.get("BACKEND", "core.services.pickup_codes.SequenceAllocator"))
+    return backend(**config.get("OPTIONS", {}))
+
+
+def allocate_pickup_codes(n=1):
+    """n códigos de retirada inéditos, sem consultar a tabela de matches."""
+    return get_allocator().allocate(n)
@@ -0,0 +1,92 @@
+"""
+Catálogo dos postos que aparecem nos formulários de doar/receber.
+
+Os postos mudam raramente (admin, importação) e são lidos em todo GET e
+POST dos formulários. O catálogo é montado uma vez por processo (uma query)
+e reaproveitado enquanto a versão no cache não mudar: em regime, renderizar
+e validar o formulário não toca no banco.
+
+A versão é uma chave de versão (core.utils.two_tier_cache) trocada a cada
+save/delete de ReferencePost (signals) e na importação em lote. Com o
+TwoTierCache os outros workers enxergam a troca em até VOLATILE_TIMEOUT
+segundos; com o LocMemCache (sem nada compartilhado), em até MAX_AGE.
+"""
+import threading
+import time
+from types import MappingProxyType
+from typing import NamedTuple
+
+from django.db import transaction
+
+from core.models import ReferencePost
+from core.utils import two_tier_cache
+
+NAMESPACE = "post_catalogue"
+VERSION_KEY = two_tier_cache.version_key(NAMESPACE)
+MAX_AGE = 300  # segundos: teto de desatualização sem cache compartilhado
+
+
+class PostOption(NamedTuple):
+    id: int
+    name: str
+    city: str
+
+    def __str__(self):
+        return f"{self.name} - {self.city}"
+
+
+class Catalogue(NamedTuple):
+    version: str
+    posts: tuple  # PostOption em ordem de cidade/nome, como no <select>
+    by_id: MappingProxyType  # "id" (texto do POST) -> PostOption
+
+    def get(self, post_id):
+        """PostOption do id vindo do formulário, ou None se não estiver no catálogo."""
+        return self.by_id.get(str(post_id).strip()) if post_id else None
+
+
+_lock = threading.Lock()
+_state = {"catalogue": None, "built": 0.0}
+
+
+def _build(version):
+    posts = tuple(
+        PostOption(*row)
+        for row in ReferencePost.objects.filter(can_receive_donations=True, public=True)
+        .order_by("city", "name")
+        .values_list("id", "name", "city")
+    )
+    return Catalogue(version, posts, MappingProxyType({str(post.id): post for post in posts}))
+
+
+def current_version():
+    """Token da versão atual; entra em chaves de cache."""
+    return two_tier_cache.get_version(NAMESPACE)
+
+
+def get_catalogue() -> Catalogue:
+    version = current_version()
+    current = _state["catalogue"]
+    if current is not None and current.version == version and time.monotonic() - _state["built"] < MAX_AGE:
+        return current
+
+    with _lock:
+        current = _state["catalogue"]
+        if current is None or current.version != version or time.monotonic() - _state["built"] >= MAX_AGE:
+            current = _build(version)
+            _state.update(catalogue=current, built=time.monotonic())
+        return current
+
+
+def _new_version():
+    two_tier_cache.bump_version(NAMESPACE)
+
+
+def bump_version():
+    """
+    Invalida o catálogo. Troca a versão já (este processo não serve a lista
+    antiga) e de novo no commit: quem remontou no meio da transação, ainda
+    com os dados antigos, remonta outra vez.
+    """
+    _new_version()
+    transaction.on_commit(_new_version)
@@ -0,0 +1,227 @@
+"""
+Relatórios do admin sobre contadores incrementais (ReportRollup).
+
+Cada cadastro, match e entrega soma/subtrai nas linhas (posto, kit) da
+tabela de resumo: um UPDATE ... SET n = n + 1 por evento. Fica na mesma
+transação da escrita quando quem grava abre uma (views, admin, serviços,
+tudo via write_atomic/atomic); um save() solto em autocommit (shell,
+script) grava o UPDATE logo depois, e uma falha entre os dois deixa desvio. A página do admin lê só essa tabela
+(uma linha por posto e kit), então o custo dela não cresce com o número
+de doadoras, receptoras e matches.
+
+As escritas por instância passam pelos signals (core.signals); os caminhos
+em lote (importação, sweep_group) chamam record() direto. rebuild()
+recalcula tudo com GROUP BY (manage.py rebuild_reports): corrige desvios
+desses e de queryset.update()/delete() em massa; drift() só aponta.
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+
+from core.db import write_atomic
+from core.models import Donor, Match, Receiver, ReportRollup
+
+FIELDS = ("donors_active", "receivers_active", "matches_pending", "matches_delivered")
+KIT_LABELS = dict(Donor.KIT_CHOICES)
+
+_UNKNOWN = object()  # instância carregada com .only()/.defer(): estado anterior desconhecido
+_UNCHANGED = object()  # save(update_fields=...) sem nenhum campo que decide o contador
+
+
+# ---------------- ESCRITA INCREMENTAL ---------------- #
+
+def record(deltas):
+    """Soma deltas ({(posto ou None, kit): {campo: n}}) nas linhas do resumo."""
+    for (post_id, kit), changes in deltas.items():
+        changes = {name: n for name, n in changes.items() if n}
+        if not changes:
+            continue
+        rows = ReportRollup.objects.filter(reference_post_id=post_id, kit=kit)
+        increments = {name: F(name) + n for name, n in changes.items()}
+        if rows.update(**increments):
+            continue
+        try:
+            with transaction.atomic():
+                ReportRollup.objects.create(reference_post_id=post_id, kit=kit, **changes)
+        except IntegrityError:
+            rows.update(**increments)  # outro processo criou a linha antes
+
+
+def _snapshot(instance):
+    """Campos que decidem em qual linha/contador o objeto entra."""
+    names = _SNAPSHOT_FIELDS[type(instance)]
+    values = instance.__dict__
+    if any(name not in values for name in names):
+        return _UNKNOWN
+    return tuple(values[name] for name in names)
+
+
+_SNAPSHOT_FIELDS = {
+    Donor: ("active", "kit_type"),
+    Receiver: ("active", "reference_post_id", "needed_kit"),
+    Match: ("reference_post_id", "donor_id", "is_completed"),
+}
+
+
+def _donor_kit(instance, donor_id):
+    if instance.donor_id == donor_id:
+        return instance.donor.kit_type  # em geral já veio no select_related/create
+    return Donor.objects.filter(pk=donor_id).values_list("kit_type", flat=True).first()
+
+
+def _counter(instance, snapshot):
+    """(chave da linha, campo) onde o objeto conta, ou None."""
+    if isinstance(instance, Donor):
+        active, kit = snapshot
+        return ((None, kit), "donors_active") if active else None
+    if isinstance(instance, Receiver):
+        active, post_id, kit = snapshot
+        return ((post_id, kit), "receivers_active") if active else None
+    post_id, donor_id, completed = snapshot
+    field = "matches_delivered" if completed else "matches_pending"
+    return (post_id, _donor_kit(instance, donor_id)), field
+
+
+def _add(deltas, counter, n):
+    if counter is not None:
+        key, field = counter
+        deltas[key][field] = deltas[key].get(field, 0) + n
+
+
+def remember(instance, using=None, update_fields=None):
+    """
+    pre_save: estado gravado no banco antes deste save, para comparar no
+    post_save. Só lê a linha quando o save pode mudar algum contador; quem
+    só lê (feed, exportação, listas do admin) não paga nada.
+    """
+    names = _SNAPSHOT_FIELDS[type(instance)]
+    if instance._state.adding:
+        instance._report_state = None
+        return
+    if update_fields is not None and not {name.removesuffix("_id") for name in names} & {
+        name.removesuffix("_id") for name in update_fields
+    }:
+        instance._report_state = _UNCHANGED
+        return
+    instance._report_state = (
+        type(instance)._base_manager.using(using).filter(pk=instance.pk).values_list(*names).first()
+    )
+
+
+def saved(instance, created):
+    """post_save: move o objeto entre contadores se algo relevante mudou."""
+    old = instance.__dict__.pop("_report_state", _UNKNOWN)
+    if created:
+        old = None
+    new = _snapshot(instance)
+    if old is _UNCHANGED or old == new or old is _UNKNOWN or new is _UNKNOWN:
+        return
+    deltas = defaultdict(dict)
+    if old is not None:
+        _add(deltas, _counter(instance, old), -1)
+    _add(deltas, _counter(instance, new), 1)
+    record(deltas)
+
+
+def deleted(instance):
+    """post_delete: tira o objeto do contador em que estava (valores carregados na instância)."""
+    state = _snapshot(instance)
+    if state is _UNKNOWN:
+        return
+    deltas = defaultdict(dict)
+    _add(deltas, _counter(instance, state), -1)
+    record(deltas)
+
+
+def created(objs):
+    """Versão em lote de saved(created=True), para Donor/Receiver de bulk_create."""
+    deltas = defaultdict(dict)
+    for obj in objs:
+        _add(deltas, _counter(obj, _snapshot(obj)), 1)
+    record(deltas)
+
+
+# ---------------- RECÁLCULO COMPLETO ---------------- #
+
+def rollup_counts():
+    """{(posto ou None, kit): {campo: n}} calculado das tabelas, com GROUP BY."""
+    counts = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+
+    for kit, n in (
+        Donor.objects.filter(active=True)
+        .values_list("kit_type").annotate(n=Count("id")).order_by()
+    ):
+        counts[(None, kit)]["donors_active"] = n
+    for post_id, kit, n in (
+        Receiver.objects.filter(active=True)
+        .values_list("reference_post_id", "needed_kit").annotate(n=Count("id")).order_by()
+    ):
+        counts[(post_id, kit)]["receivers_active"] = n
+    for post_id, kit, pending, delivered in (
+        Match.objects.values_list("reference_post_id", "donor__kit_type")
+        .annotate(
+            pending=Count("id", filter=Q(is_completed=False)),
+            delivered=Count("id", filter=Q(is_completed=True)),
+        )
+        .order_by()
+    ):
+        counts[(post_id, kit)].update(matches_pending=pending, matches_delivered=delivered)
+    return counts
+
+
+def drift():
+    """{(posto ou None, kit): {campo: (no resumo, nas tabelas)}} onde os dois divergem."""
+    stored = {
+        (row.reference_post_id, row.kit): {name: getattr(row, name) for name in FIELDS}
+        for row in ReportRollup.objects.all()
+    }
+    actual = rollup_counts()
+    result = {}
+    for key in stored.keys() | actual.keys():
+        old = stored.get(key, dict.fromkeys(FIELDS, 0))
+        new = actual.get(key, dict.fromkeys(FIELDS, 0))
+        diff = {name: (old[name], new[name]) for name in FIELDS if old[name] != new[name]}
+        if diff:
+            result[key] = diff
+    return result
+
+
+def rebuild():
+    """Refaz a tabela de resumo inteira. Retorna o número de linhas."""
+    with write_atomic():
+        counts = rollup_counts()
+        ReportRollup.objects.all().delete()
+        ReportRollup.objects.bulk_create([
+            ReportRollup(reference_post_id=post_id, kit=kit, **fields)
+            for (post_id, kit), fields in counts.items()
+        ])
+    return len(counts)
+
+
+# ---------------- LEITURA (PÁGINA DO ADMIN) ---------------- #
+
+def summary():
+    """Totais, linhas por kit e por posto, tudo a partir do resumo."""
+    totals = dict.fromkeys(FIELDS, 0)
+    kits = {}
+    posts = {}
+    for row in ReportRollup.objects.select_related("reference_post"):
+        values = {name: getattr(row, name) for name in FIELDS}
+        kit = kits.setdefault(row.kit, {"kit": row.kit, "label": KIT_LABELS.get(row.kit, row.kit), **dict.fromkeys(FIELDS, 0)})
+        post = None
+        if row.reference_post_id:
+            post = posts.setdefault(row.reference_post_id, {"post": row.reference_post, **dict.fromkeys(FIELDS, 0)})
+        for name, n in values.items():
+            totals[name] += n
+            kit[name] += n
+            if post is not None:
+                post[name] += n
+
+    for entry in (totals, *kits.values(), *posts.values()):
+        entry["matches_total"] = entry["matches_pending"] + entry["matches_delivered"]
+    return {
+        "totals": totals,
+        "kits": sorted(kits.values(), key=lambda k: k["label"]),
+        "posts": sorted(posts.values(), key=lambda p: (p["post"].name, p["post"].id)),
+    }
@@ -1,32 +1,118 @@
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
-from .models import Match, UserProfile
+from .models import Donor, Match, QueueEntry, Receiver, ReferencePost, UserProfile
+from core.auth import invalidate_profile
+from core.db import configure_sqlite
+from core.services import pickup, post_catalogue, reports
 from core.services.match_notify import notify_match
 
 
+# =========================
+# Banco: PRAGMAs do SQLite em toda conexão nova
+# =========================
+@receiver(connection_created)
+def configurar_sqlite(sender, connection, **kwargs):
+    configure_sqlite(connection)
+
+
 # =========================
 # Match: notificação ao criar
 # =========================
 @receiver(post_save, sender=Match)
 def notificar_match_criado(sender, instance, created, **kwargs):
     """
-    Dispara notificação apenas quando o Match é criado.
+    Enfileira a notificação (Outbox) apenas quando o Match é criado,
+    na mesma transação do Match. O envio é do notify_worker.
     O pickup_code é gerado no Match.save() (Jeito A), não aqui.
     """
     if created:
         notify_match(instance)
 
 
+# =========================
+# Fila de espera: cadastro desativado sai da fila
+# =========================
+@receiver(post_save, sender=Donor)
+@receiver(post_save, sender=Receiver)
+def tirar_da_fila(sender, instance, raw=False, **kwargs):
+    """
+    Desativado não pode mais ser pareado. Desativação em lote (update)
+    não chega aqui: o matcher também filtra active=True na cabeça da fila.
+    """
+    if not raw and not instance.active:
+        QueueEntry.objects.filter(**{sender._meta.model_name: instance}).delete()
+
+
+# =========================
+# Retirada: retrato do match em cache
+# =========================
+@receiver(post_save, sender=Match)
+@receiver(post_delete, sender=Match)
+def invalidar_retirada(sender, instance, created=False, **kwargs):
+    if not created:  # match novo ainda não foi conferido
+        pickup.invalidate(instance.pickup_code)
+
+
+# =========================
+# Catálogo de postos dos formulários
+# =========================
+@receiver(post_save, sender=ReferencePost)
+@receiver(post_delete, sender=ReferencePost)
+def invalidar_catalogo_postos(sender, **kwargs):
+    post_catalogue.bump_version()
+
+
+# =========================
+# Resumo dos relatórios (ReportRollup)
+# =========================
+@receiver(pre_save, sender=Donor)
+@receiver(pre_save, sender=Receiver)
+@receiver(pre_save, sender=Match)
+def lembrar_estado_relatorio(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    if not raw:
+        reports.remember(instance, using, update_fields)
+
+
+@receiver(post_save, sender=Donor)
+@receiver(post_save, sender=Receiver)
+@receiver(post_save, sender=Match)
+def atualizar_relatorio(sender, instance, created, raw=False, **kwargs):
+    """
+    Cadastro novo, ativo/inativo, troca de posto/kit e entrega concluída
+    mexem nos contadores, na transação do save quando houver uma
+    (ver core.services.reports).
+    """
+    if not raw:
+        reports.saved(instance, created)
+
+
+@receiver(post_delete, sender=Donor)
+@receiver(post_delete, sender=Receiver)
+@receiver(post_delete, sender=Match)
+def descontar_relatorio(sender, instance, **kwargs):
+    reports.deleted(instance)
+
+
 # =========================
 # User: cria UserProfile automático
 # =========================
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def garantir_userprofile(sender, instance, created, **kwargs):
+def garantir_userprofile(sender, instance, created, raw=False, update_fields=None, **kwargs):
     """
-    Garante que todo User tenha um UserProfile.
-    - Se for usuário novo, cria.
-    - Se for usuário antigo sem profile, cria também.
+    Cria o UserProfile junto com o User. Usuários antigos sem perfil:
+    manage.py backfill_profiles (aqui não, senão todo login, que salva o
+    last_login, faria uma query a mais).
     """
-    UserProfile.objects.get_or_create(user=instance)
\ No newline at end of file
+    if created and not raw:
+        UserProfile.objects.get_or_create(user=instance)
+    if not created and update_fields != frozenset({"last_login"}):
+        invalidate_profile(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidar_perfil_na_sessao(sender, instance, **kwargs):
+    invalidate_profile(instance.user_id)
@@ -1,3 +1,1412 @@
-from django.test import TestCase
+import csv
+import importlib.util
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest import addModuleCleanup, mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.db.models import Count
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone, translation
+from django.test.utils import CaptureQueriesContext
+
+from benchmarks import load
+
+from . import whatsapp_bot
+from .auth import invalidate_profile
+from .db import configure_sqlite
+from .messages import CATALOGUE, MATCH_NOTIFICATION, MessageTemplate, render_many
+from .models import Donor, Match, Outbox, QueueEntry, Receiver, ReferencePost, ReportRollup, UserProfile
+from .services import match_service, outbox, pickup, post_catalogue, reports
+from .services.match_notify import notify_match
+from .services.pickup_codes import SequenceAllocator, allocate_pickup_codes
+from .utils import content_filter, metrics, page_cache, profiler, rate_limit, two_tier_cache
+from .utils.phone import normalize_many, normalize_phone
+from .utils.whatsapp import BaseSender, HttpSender, JsonlFileSender
+
+
+def setUpModule():
+    # a suíte não toca nos arquivos do projeto: contadores (ratelimit.sqlite3),
+    # cache/ e metrics.sqlite3 (só MetricsTests liga as métricas, num banco temporário)
+    tmp = tempfile.TemporaryDirectory()
+    addModuleCleanup(tmp.cleanup)
+    isolated = override_settings(
+        RATE_LIMIT_STORE={"BACKEND": "core.utils.rate_limit.MemoryStore"},
+        METRICS={**settings.METRICS, "ENABLED": False, "PATH": os.path.join(tmp.name, "metrics.sqlite3")},
+        CACHES={
+            alias: {**config, "LOCATION": os.path.join(tmp.name, alias)}
+            if config["BACKEND"].endswith(".FileBasedCache") else config
+            for alias, config in settings.CACHES.items()
+        },
+    )
+    isolated.enable()
+    addModuleCleanup(isolated.disable)
+    addModuleCleanup(metrics.clear)  # sem deltas pendentes para o flush do atexit, que já vê o settings real
+
+
+def make_post(**kwargs):
+    data = {
+        "name": "UBS Centro",
+        "city": "Sorocaba",
+        "neighborhood_coverage": "Centro",
+        "contact_name": "Ana",
+        "contact_phone": "15999990000",
+        "type": "ubs",
+    }
+    data.update(kwargs)
+    return ReferencePost.objects.create(**data)
+
+
+def make_donor(n, kit="BASICO"):
+    return Donor.objects.create(name=f"Doadora {n}", whatsapp=f"159910000{n:02d}", kit_type=kit)
+
+
+def make_receiver(n, post, kit="BASICO"):
+    return Receiver.objects.create(
+        name=f"Receptora {n}",
+        whatsapp=f"159920000{n:02d}",
+        city="Sorocaba",
+        neighborhood="Centro",
+        needed_kit=kit,
+        reference_post=post,
+    )
+
+
+class MatchServiceTests(TestCase):
+    def setUp(self):
+        self.post = make_post()
+
+    def test_donor_waits_then_receiver_matches(self):
+        donor = make_donor(1)
+        self.assertIsNone(match_service.match_donor(donor, self.post.id))
+        self.assertEqual(QueueEntry.objects.filter(side=QueueEntry.SIDE_DONOR).count(), 1)
+
+        receiver = make_receiver(1, self.post)
+        match = match_service.match_receiver(receiver)
+
+        self.assertIsNotNone(match)
+        self.assertEqual((match.donor_id, match.receiver_id), (donor.id, receiver.id))
+        self.assertTrue(match.pickup_code.startswith("CS-"))
+        self.assertFalse(QueueEntry.objects.exists())
+
+    def test_receivers_are_served_in_arrival_order(self):
+        first = make_receiver(1, self.post)
+        second = make_receiver(2, self.post)
+        match_service.match_receiver(first)
+        match_service.match_receiver(second)
+
+        match = match_service.match_donor(make_donor(1), self.post.id)
+
+        self.assertEqual(match.receiver_id, first.id)
+        self.assertEqual(QueueEntry.objects.get().receiver_id, second.id)
+
+    def test_no_match_across_kits_or_posts(self):
+        other_post = make_post(name="CRAS Norte")
+        match_service.match_receiver(make_receiver(1, self.post, kit="ALERGIA"))
+        match_service.match_receiver(make_receiver(2, other_post))
+
+        self.assertIsNone(match_service.match_donor(make_donor(1), self.post.id))
+        self.assertEqual(Match.objects.count(), 0)
+        self.assertEqual(QueueEntry.objects.count(), 3)
+
+    def test_deactivated_people_are_never_matched(self):
+        donor = make_donor(1)
+        match_service.match_donor(donor, self.post.id)
+        donor.active = False
+        donor.save()
+        self.assertFalse(QueueEntry.objects.exists())
+
+        bulk = make_donor(2)
+        match_service.match_donor(bulk, self.post.id)
+        Donor.objects.filter(pk=bulk.pk).update(active=False)  # sem signal: a linha fica na fila
+
+        self.assertIsNone(match_service.match_receiver(make_receiver(1, self.post)))
+        self.assertEqual(match_service.pending_groups(), [])
+        self.assertEqual(match_service.sweep_group(self.post.id, "BASICO"), 0)
+        self.assertFalse(Match.objects.exists())
+
+    def test_registration_cost_does_not_grow_with_queue(self):
+        def queries_for_match(n):
+            match_service.match_receiver(make_receiver(n, self.post))
+            donor = make_donor(n)
+            with CaptureQueriesContext(connection) as ctx:
+                match_service.match_donor(donor, self.post.id)
+            return len(ctx)
+
+        small = queries_for_match(0)
+        for n in range(1, 50):
+            match_service.match_receiver(make_receiver(n, self.post))
+        self.assertEqual(queries_for_match(50), small)
+
+
+class FormMatchingTests(TestCase):
+    def setUp(self):
+        rate_limit.get_store().clear()
+        self.post = make_post()
+
+    def test_receiver_arriving_after_donor_gets_matched(self):
+        self.client.post("/doar/", {
+            "name": "Doadora", "whatsapp": "(15) 99100-0001",
+            "kit_type": "Basico", "reference_post": self.post.id,
+        })
+        self.assertEqual(Match.objects.count(), 0)
+
+        self.client.post("/receber/", {
+            "name": "Receptora", "whatsapp": "(15) 99200-0001", "city": "Sorocaba",
+            "neighborhood": "Centro", "needed_kit": "Basico", "reference_post": self.post.id,
+        })
+
+        match = Match.objects.get()
+        self.assertEqual(match.reference_post_id, self.post.id)
+        self.assertFalse(QueueEntry.objects.exists())
+
+    def test_failed_matching_rolls_back_the_registration(self):
+        data = {
+            "name": "Doadora", "whatsapp": "(15) 99100-0001",
+            "kit_type": "Basico", "reference_post": self.post.id,
+        }
+        client = Client(raise_request_exception=False)
+        with mock.patch.object(match_service, "match_donor", side_effect=RuntimeError("database is locked")):
+            self.assertEqual(client.post("/doar/", data).status_code, 500)
+        self.assertFalse(Donor.objects.exists())
+        self.assertEqual(ReportRollup.objects.filter(donors_active__gt=0).count(), 0)
+
+        # sem cadastro órfão, a mesma pessoa consegue se cadastrar de novo
+        self.assertEqual(client.post("/doar/", data).status_code, 302)
+        self.assertTrue(QueueEntry.objects.filter(donor__whatsapp_e164="+5515991000001").exists())
+
+    def test_duplicate_active_whatsapp_is_rejected(self):
+        data = {
+            "name": "Doadora", "whatsapp": "(15) 99100-0001",
+            "kit_type": "Basico", "reference_post": self.post.id,
+        }
+        self.client.post("/doar/", data)
+        response = self.client.post("/doar/", data)
+
+        self.assertContains(response, "já está cadastrado como doador")
+        self.assertEqual(Donor.objects.count(), 1)
+
+    def test_same_phone_in_another_format_is_a_duplicate(self):
+        data = {"name": "Doadora", "kit_type": "Basico", "reference_post": self.post.id}
+        self.client.post("/doar/", {**data, "whatsapp": "(15) 99100-0001"})
+        response = self.client.post("/doar/", {**data, "whatsapp": "+55 15 991000001"}, REMOTE_ADDR="10.0.0.2")
+
+        self.assertContains(response, "já está cadastrado como doador")
+        self.assertEqual(Donor.objects.get().whatsapp_e164, "+5515991000001")
+
+
+class RematchCommandTests(TestCase):
+    def setUp(self):
+        self.post = make_post()
+        self.other_post = make_post(name="CRAS Norte")
+        self.donors = [make_donor(n) for n in range(5)]
+        self.receivers = [make_receiver(n, self.post) for n in range(3)]
+        QueueEntry.objects.bulk_create(
+            [QueueEntry(side=QueueEntry.SIDE_DONOR, reference_post=self.post, kit="BASICO", donor=d)
+             for d in self.donors]
+            + [QueueEntry(side=QueueEntry.SIDE_RECEIVER, reference_post=self.post, kit="BASICO", receiver=r)
+               for r in self.receivers]
+        )
+
+    def test_pairs_waiting_queues_in_fifo_order(self):
+        call_command("rematch", chunk_size=2, stdout=StringIO())
+
+        pairs = list(Match.objects.order_by("receiver_id").values_list("donor_id", "receiver_id"))
+        self.assertEqual(pairs, [(d.id, r.id) for d, r in zip(self.donors, self.receivers)])
+        self.assertEqual(len(set(Match.objects.values_list("pickup_code", flat=True))), 3)
+        self.assertEqual(
+            list(QueueEntry.objects.values_list("donor_id", flat=True)),
+            [self.donors[3].id, self.donors[4].id],
+        )
+
+    def test_dry_run_and_post_filter_write_nothing(self):
+        out = StringIO()
+        call_command("rematch", dry_run=True, stdout=out)
+        self.assertIn("3 matches seriam criados", out.getvalue())
+
+        call_command("rematch", post=self.other_post.id, stdout=StringIO())
+
+        self.assertFalse(Match.objects.exists())
+        self.assertEqual(QueueEntry.objects.count(), 8)
+
+
+class ImportRegistrationsTests(TestCase):
+    def setUp(self):
+        self.post = make_post(name="UBS Éden")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(content)
+        return path
+
+    def test_imports_valid_rows_rejects_the_rest_and_matches(self):
+        make_donor(1)  # já ativa: (15) 99100-0001
+        donors = self.write("doadoras.csv", (
+            "nome,whatsapp,kit,posto\n"
+            "Ana,(15) 99100-0002,Kit Básico,UBS Eden\n"
+            "Bia,+55 15 99100-0003,alergia,{post}\n"
+            "Cris,15 99100-0001,BASICO,{post}\n"  # já cadastrada
+            "Dora,+55 15 99100-0002,BASICO,{post}\n"  # repetida no arquivo
+            "Eva,123,BASICO,{post}\n"
+            "Fê,(15) 99100-0006,BASICO,Posto X\n"
+            "seu idiota,(15) 99100-0007,BASICO,{post}\n"
+        ).format(post=self.post.id))
+        receivers = self.write("receptoras.jsonl", "\n".join([
+            json.dumps({"name": "Gal", "whatsapp": "15992000001", "city": "Sorocaba", "neighborhood": "Centro",
+                        "needed_kit": "basico", "reference_post": self.post.id}),
+            json.dumps({"name": "Hel", "whatsapp": "15992000002", "city": "", "neighborhood": "Centro",
+                        "needed_kit": "basico", "reference_post": self.post.id}),
+            "não é json",
+        ]))
+
+        call_command("import_registrations", donors, kind="donor", chunk_size=2, stdout=StringIO())
+        call_command("import_registrations", receivers, kind="receiver", stdout=StringIO())
+
+        self.assertEqual(sorted(Donor.objects.values_list("name", flat=True)), ["Ana", "Bia", "Doadora 1"])
+        self.assertEqual(Donor.objects.get(name="Ana").whatsapp_e164, "+5515991000002")
+        with open(os.path.join(self.tmp.name, "doadoras.rejects.jsonl"), encoding="utf-8") as fh:
+            rejected = {row["line"]: row["errors"] for row in map(json.loads, fh)}
+        self.assertEqual(sorted(rejected), [4, 5, 6, 7, 8])
+        self.assertIn("WhatsApp já cadastrado.", rejected[5])
+        self.assertIn("Posto de referência inválido.", rejected[7])
+
+        # Gal pareia com Ana (primeira doadora BASICO na fila do posto)
+        match = Match.objects.get()
+        self.assertEqual((match.donor.name, match.receiver.name), ("Ana", "Gal"))
+        self.assertEqual(Outbox.objects.filter(match=match).count(), 2)
+
+    def test_imported_and_form_registrations_share_the_queue(self):
+        receivers = self.write("receptoras.csv", (
+            "nome,whatsapp,cidade,bairro,kit,posto\n"
+            "Gal,15992000001,Sorocaba,Centro,Básico,{post}\n"
+            "Iza,15992000002,Sorocaba,Centro,Completo Alergia,{post}\n"
+        ).format(post=self.post.id))
+        call_command("import_registrations", receivers, kind="receiver", stdout=StringIO())
+
+        data = {"name": "Ana", "reference_post": self.post.id}
+        self.client.post("/doar/", {**data, "whatsapp": "15991000001", "kit_type": "Basico"})
+        self.client.post("/doar/", {**data, "whatsapp": "15991000002", "kit_type": "Completo Alergica"})
+        response = self.client.post("/doar/", {**data, "whatsapp": "15991000003", "kit_type": "Kit surpresa"})
+
+        self.assertContains(response, "Tipo de kit inválido.")
+        self.assertEqual(
+            sorted(Match.objects.values_list("receiver__name", "donor__kit_type")),
+            [("Gal", "BASICO"), ("Iza", "COMPLETO_ALERGIA")],
+        )
+        self.assertFalse(QueueEntry.objects.exists())
+
+    def test_missing_file_is_a_command_error(self):
+        path = os.path.join(self.tmp.name, "nao-existe.csv")
+        with self.assertRaisesMessage(CommandError, f"Arquivo não encontrado: {path}"):
+            call_command("import_registrations", path, kind="donor", stdout=StringIO())
+        self.assertEqual(os.listdir(self.tmp.name), [])  # nem o arquivo de rejeitos
+
+    def test_dry_run_writes_nothing(self):
+        path = self.write("postos.csv", "name,city,type\nCRAS Norte,Sorocaba,cras\nUBS Éden,Sorocaba,ubs\n")
+        call_command("import_registrations", path, kind="post", dry_run=True, stdout=StringIO())
+        self.assertEqual(ReferencePost.objects.count(), 1)
+
+        call_command("import_registrations", path, kind="post", stdout=StringIO())
+        self.assertEqual(ReferencePost.objects.filter(name="CRAS Norte").count(), 1)
+        self.assertEqual(ReferencePost.objects.count(), 2)  # UBS Éden já existia
+
+
+class MatchExportTests(TestCase):
+    def setUp(self):
+        self.post = make_post()
+        other = make_post(name="CRAS Norte")
+        self.matches = []
+        for n in range(6):
+            post = self.post if n < 4 else other
+            self.matches.append(Match.objects.create(
+                donor=make_donor(n), receiver=make_receiver(n, post), reference_post=post
+            ))
+        Match.objects.filter(id=self.matches[0].id).update(is_completed=True)
+        Donor.objects.filter(id=self.matches[1].donor_id).update(name="=HYPERLINK(1)")
+
+    def test_command_filters_by_post_status_and_date(self):
+        out = StringIO()
+        with self.assertNumQueries(1):
+            call_command("export_matches", post=self.post.id, status="pending", stdout=out)
+        rows = list(csv.DictReader(StringIO(out.getvalue().lstrip("\ufeff"))))
+
+        self.assertEqual([int(r["id"]) for r in rows], [m.id for m in self.matches[1:4]])
+        self.assertEqual(rows[0]["donor"], "'=HYPERLINK(1)")
+        self.assertEqual(rows[0]["reference_post"], "UBS Centro")
+
+        today = timezone.localdate()
+        out = StringIO()
+        call_command("export_matches", format="jsonl", since=today, until=today, stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 6)
+        out = StringIO()
+        call_command("export_matches", until=today - timedelta(days=1), stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 1)  # só o cabeçalho
+
+    def test_admin_action_streams_the_filtered_changelist(self):
+        admin_user = User.objects.create_superuser("admin", "a@a.com", "senha")
+        self.client.force_login(admin_user)
+
+        response = self.client.post(
+            f"/admin/core/match/?reference_post__id__exact={self.post.id}",
+            {"action": "export_jsonl", "select_across": "1", "index": "0",
+             "_selected_action": [m.id for m in self.matches]},
+        )
+
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment;", response["Content-Disposition"])
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)["id"] for line in lines], [m.id for m in self.matches[:4]])
+
+
+class ReportRollupTests(TestCase):
+    def setUp(self):
+        self.post = make_post()
+        self.other = make_post(name="CRAS Norte")
+
+    def rollup(self):
+        return {
+            (row.reference_post_id, row.kit): {name: getattr(row, name) for name in reports.FIELDS}
+            for row in ReportRollup.objects.all()
+            if any(getattr(row, name) for name in reports.FIELDS)
+        }
+
+    def expected(self):
+        return {key: fields for key, fields in reports.rollup_counts().items() if any(fields.values())}
+
+    def test_counters_follow_every_write_path(self):
+        for n in range(3):
+            match_service.match_donor(make_donor(n), self.post.id)
+        match_service.match_receiver(make_receiver(0, self.post))
+        match_service.match_receiver(make_receiver(1, self.other, kit="ALERGIA"))
+        for n in range(2, 4):
+            receiver = make_receiver(n, self.post)
+            QueueEntry.objects.create(side=QueueEntry.SIDE_RECEIVER, reference_post=self.post, kit="BASICO",
+                                      receiver=receiver)
+        match_service.sweep_group(self.post.id, "BASICO")  # bulk_create, sem signals
+
+        match = Match.objects.select_related("donor").first()
+        match.is_completed = True
+        match.save()
+        donor = Donor.objects.create(name="Inativa", whatsapp="15991009999", kit_type="ALERGIA")
+        donor.active = False
+        donor.save()
+        Receiver.objects.get(name="Receptora 1").delete()
+
+        totals = reports.summary()["totals"]
+        self.assertEqual(self.rollup(), self.expected())
+        self.assertEqual(
+            (totals["donors_active"], totals["receivers_active"], totals["matches_pending"], totals["matches_delivered"]),
+            (3, 3, 2, 1),
+        )
+
+        # desvio por update em massa: --check aponta, o rebuild corrige
+        call_command("rebuild_reports", check=True, stdout=StringIO())
+        Match.objects.update(is_completed=True)
+        self.assertNotEqual(self.rollup(), self.expected())
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command("rebuild_reports", check=True, stdout=out)
+        self.assertIn("matches_pending 2 -> 0", out.getvalue())
+        call_command("rebuild_reports", stdout=StringIO())
+        self.assertEqual(self.rollup(), self.expected())
+        self.assertEqual(reports.drift(), {})
+
+    def test_reads_and_unrelated_saves_do_not_touch_the_rollup(self):
+        make_donor(0)
+        donor = Donor.objects.get()
+        self.assertNotIn("_report_state", donor.__dict__)  # carregar não tira retrato
+
+        donor.name = "Outro nome"
+        with CaptureQueriesContext(connection) as ctx:
+            donor.save(update_fields=["name"])
+        self.assertEqual(len(ctx), 1)  # só o UPDATE: nada de reler a linha
+
+        donor.kit_type = "ALERGIA"
+        donor.save()
+        self.assertEqual(self.rollup(), {(None, "ALERGIA"): {**dict.fromkeys(reports.FIELDS, 0), "donors_active": 1}})
+
+    def test_reports_page_cost_does_not_grow_with_matches(self):
+        self.client.force_login(User.objects.create_superuser("admin", "a@a.com", "senha"))
+
+        def queries_for_page():
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get("/admin/reports/")
+            self.assertEqual(response.status_code, 200)
+            return len(ctx), response
+
+        queries_for_page()  # o primeiro acesso monta o retrato do usuário na sessão
+        match_service.match_receiver(make_receiver(0, self.post))
+        match_service.match_donor(make_donor(0), self.post.id)
+        small, _ = queries_for_page()
+        for n in range(1, 30):
+            match_service.match_receiver(make_receiver(n, self.post if n % 2 else self.other))
+            match_service.match_donor(make_donor(n), self.post.id if n % 2 else self.other.id)
+        large, response = queries_for_page()
+
+        self.assertEqual(large, small)
+        self.assertContains(response, "Kit Básico")
+        self.assertContains(response, "CRAS Norte")
+        rows = list(csv.reader(StringIO(self.client.get("/admin/reports/csv/").content.decode().lstrip("\ufeff"))))
+        self.assertEqual(rows[1:], [["CRAS Norte", "Sorocaba", "14", "14", "14", "0"],
+                                    ["UBS Centro", "Sorocaba", "16", "16", "16", "0"]])
+
+
+class PostCatalogueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rate_limit.get_store().clear()
+        self.post = make_post()
+        self.hidden = make_post(name="Posto Interno", public=False)
+
+    def test_forms_render_and_validate_without_queries_until_a_post_changes(self):
+        self.client.get("/receber/")
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get("/doar/"), "UBS Centro")
+        with self.assertNumQueries(0):
+            response = self.client.post("/doar/", {"name": "", "whatsapp": "", "reference_post": self.hidden.id})
+        self.assertContains(response, "Posto de referência inválido.")
+        self.assertNotContains(response, "Posto Interno")
+
+        self.post.name = "UBS Centro Novo"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.save()
+        make_post(name="CRAS Norte")
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/doar/")
+        self.assertContains(response, "UBS Centro Novo")
+        self.assertContains(response, "CRAS Norte")
+
+    def test_catalogue_is_immutable_and_keyed_by_form_value(self):
+        catalogue = post_catalogue.get_catalogue()
+
+        self.assertEqual(catalogue.get(f" {self.post.id} "), (self.post.id, "UBS Centro", "Sorocaba"))
+        self.assertIsNone(catalogue.get("abc"))
+        with self.assertRaises(TypeError):
+            catalogue.by_id["99"] = None
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()  # páginas de outros testes
+        rate_limit.get_store().clear()
+        self.post = make_post()
+        page_cache.reset_stats()
+
+    def csrf_token(self, response):
+        return response.content.decode().split('name="csrfmiddlewaretoken" value="', 1)[1].split('"', 1)[0]
+
+    def test_cached_form_gets_a_fresh_csrf_token_per_visitor(self):
+        first, second = Client(enforce_csrf_checks=True), Client(enforce_csrf_checks=True)
+        first.get("/doar/")
+        with self.assertNumQueries(0):
+            response = second.get("/doar/")
+
+        self.assertEqual(page_cache.stats()["page.doar.hit"], 1)
+        token = self.csrf_token(response)
+        self.assertNotIn(page_cache.CSRF_MARKER, token)
+        self.assertIn("csrftoken", response.cookies)
+        response = second.post("/doar/", {
+            "csrfmiddlewaretoken": token, "name": "Doadora", "whatsapp": "(15) 99100-0001",
+            "kit_type": "Basico", "reference_post": self.post.id,
+        })
+        self.assertRedirects(response, "/obrigada/", fetch_redirect_response=False)
+
+    def test_obrigada_is_shared_but_messages_stay_personal(self):
+        self.client.get("/obrigada/")
+        self.client.post("/doar/", {
+            "name": "Doadora", "whatsapp": "(15) 99100-0001", "kit_type": "Basico", "reference_post": self.post.id,
+        })
+
+        self.assertContains(self.client.get("/obrigada/"), "Doação registrada!")
+        self.assertNotContains(Client().get("/obrigada/"), "Doação registrada!")
+        self.assertEqual(page_cache.stats()["page.obrigada.hit"], 2)
+
+    def test_key_follows_language_and_post_catalogue(self):
+        key = page_cache.cache_key("page", "home")
+        with translation.override("pt-br"):
+            self.assertNotEqual(page_cache.cache_key("page", "home"), key)
+        make_post(name="CRAS Norte")
+        self.assertNotEqual(page_cache.cache_key("page", "home"), key)
+
+        self.assertContains(self.client.get("/receber/"), "CRAS Norte")
+        self.assertContains(self.client.post("/receber/", {"name": ""}), "CRAS Norte")
+        self.assertEqual(page_cache.stats()["fragment.post_select.hit"], 1)
+
+
+@override_settings(CACHES={
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "two-tier-tests-default"},
+    "shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "two-tier-tests-shared"},
+})
+class TwoTierCacheTests(SimpleTestCase):
+    def worker(self, name, **options):
+        """Um backend por nome = a memória de um worker; o "shared" é de todos."""
+        options = {"SHARED": "shared", "LOCAL_TIMEOUT": 60, "VOLATILE_TIMEOUT": 0.05, **options}
+        return two_tier_cache.TwoTierCache(name, {"OPTIONS": options})
+
+    def setUp(self):
+        caches["shared"].clear()
+        self.a, self.b = self.worker(f"{self.id()}-a"), self.worker(f"{self.id()}-b")
+
+    def test_local_hits_skip_the_shared_tier(self):
+        self.a.set("k", {"posts": [1, 2]})
+        with mock.patch.object(type(caches["shared"]), "get", side_effect=AssertionError):
+            self.assertEqual(self.a.get("k"), {"posts": [1, 2]})
+        self.assertEqual(self.b.get("k"), {"posts": [1, 2]})
+        self.assertEqual(self.b.get("k"), {"posts": [1, 2]})
+
+        self.assertEqual(self.a.stats()["local_hits"], 1)
+        self.assertEqual(self.b.stats()["shared_hits"], 1)
+        self.assertEqual(self.b.stats()["local_hits"], 1)
+
+    def test_other_worker_sees_version_bump_after_volatile_timeout(self):
+        self.assertIsNone(self.b.get("posts:version"))  # ausência também fica na memória
+        self.a.set("posts:version", "v1")
+        self.b.set("posts:v1:select", "<old>")
+        self.a.set("posts:version", "v2")  # a troca de versão é um set no compartilhado
+
+        self.assertIsNone(self.b.get("posts:version"))
+        time.sleep(0.06)
+        self.assertEqual(self.b.get("posts:version"), "v2")
+        self.assertEqual(self.b.get("posts:v1:select"), "<old>")  # chave antiga: nunca mais lida
+
+    def test_local_tier_is_bounded_and_counters_live_in_shared(self):
+        small = self.worker(f"{self.id()}-small", LOCAL_MAX_ENTRIES=2)
+        for key in "xyz":
+            small.set(key, key)
+        self.assertEqual(small.stats()["local_evictions"], 1)
+        self.assertEqual(small.get("x"), "x")  # despejado da memória, ainda no compartilhado
+        self.assertEqual(small.stats()["shared_hits"], 1)
+
+        self.a.set("hits", 1)
+        self.assertEqual(self.a.get("hits"), 1)
+        self.assertEqual(self.b.incr("hits"), 2)
+        self.assertEqual(self.a.incr("hits", 5), 7)
+        self.assertEqual(self.a.get("hits"), 7)
+        self.assertFalse(self.b.add("hits", 0))
+        self.assertEqual(self.b.get("hits"), 7)
+
+    def test_version_helpers(self):
+        key = two_tier_cache.versioned_key("posts", "select", "pt-br")
+        self.assertEqual(two_tier_cache.versioned_key("posts", "select", "pt-br"), key)
+        two_tier_cache.bump_version("posts")
+        self.assertNotEqual(two_tier_cache.versioned_key("posts", "select", "pt-br"), key)
+        self.assertTrue(key.startswith("posts:") and key.endswith(":select:pt-br"))
+
+
+def _hammer_rate_limit(path, attempts, results):
+    """Processo filho do teste multi-processo: conta quantas passaram."""
+    store = rate_limit.SQLiteStore(path)
+    algorithm = rate_limit.SlidingWindow(limit=30, period=3600)
+    results.put(sum(store.apply("form:ip:10.0.0.1", algorithm).allowed for _ in range(attempts)))
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        rate_limit.get_store().clear()
+        self.post = make_post()
+
+    def test_sliding_window_counts_the_previous_window_and_says_when_to_retry(self):
+        window = rate_limit.SlidingWindow(limit=5, period=100)
+        store = rate_limit.MemoryStore()
+        allowed = [store.apply("k", window, now=1000 + n).allowed for n in range(6)]
+        self.assertEqual(allowed, [True] * 5 + [False])
+
+        # na metade da janela seguinte, metade das 5 ainda conta: sobram 2
+        decisions = [store.apply("k", window, now=1150) for _ in range(3)]
+        self.assertEqual([d.allowed for d in decisions], [True, True, False])
+        self.assertAlmostEqual(decisions[-1].retry_after, 10.0)
+        self.assertFalse(store.apply("k", window, now=1159).allowed)
+        self.assertTrue(store.apply("k", window, now=1160).allowed)
+
+    def test_token_bucket_allows_a_burst_then_refills(self):
+        bucket = rate_limit.TokenBucket(limit=10, period=60, burst=3)
+        store = rate_limit.MemoryStore()
+        self.assertEqual([store.apply("k", bucket, now=0).allowed for _ in range(4)], [True, True, True, False])
+        self.assertAlmostEqual(store.apply("k", bucket, now=0).retry_after, 6.0)
+        self.assertTrue(store.apply("k", bucket, now=6).allowed)
+
+    def test_form_returns_429_with_retry_after_per_ip_and_per_phone(self):
+        data = {"name": "", "kit_type": "Basico", "reference_post": self.post.id}
+        for n in range(5):
+            self.client.post("/doar/", {**data, "whatsapp": f"(15) 99100-00{n:02d}"})
+        response = self.client.post("/doar/", {**data, "whatsapp": "(15) 99100-0099"})
+        self.assertEqual(response.status_code, 429)
+        # janela cheia: a próxima vira "anterior" e ainda pesa 4/5 da cota no começo
+        self.assertTrue(60 <= int(response["Retry-After"]) <= 360)
+
+        # mesmo WhatsApp vindo de IPs diferentes: vale o limite por telefone, nos dois formulários
+        for n in range(5):
+            self.client.post("/receber/", {"whatsapp": "+55 15 99100-0001"}, REMOTE_ADDR=f"10.0.1.{n}")
+        response = self.client.post("/receber/", {"whatsapp": "15991000001"}, REMOTE_ADDR="10.0.2.1")
+        self.assertEqual(response.status_code, 429)
+        self.assertAlmostEqual(int(response["Retry-After"]), 720, delta=5)  # 5 por hora: uma ficha a cada 12 min
+        self.assertEqual(self.client.get("/doar/", REMOTE_ADDR="10.0.2.1").status_code, 200)
+
+    def test_limit_holds_across_processes(self):
+        import multiprocessing
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "ratelimit.sqlite3")
+            ctx = multiprocessing.get_context("fork")
+            results = ctx.Queue()
+            workers = [ctx.Process(target=_hammer_rate_limit, args=(path, 25, results)) for _ in range(4)]
+            for worker in workers:
+                worker.start()
+            allowed = sum(results.get(timeout=30) for _ in workers)
+            for worker in workers:
+                worker.join()
+
+        self.assertEqual(allowed, 30)  # 100 tentativas em 4 processos, limite 30: nem uma a mais
+
+
+class SQLiteProfileTests(SimpleTestCase):
+    databases = {"default"}
+
+    def test_connections_get_the_production_pragmas(self):
+        with connection.cursor() as cursor:
+            pragmas = {
+                name: cursor.execute(f"PRAGMA {name}").fetchone()[0]
+                for name in ("journal_mode", "synchronous", "busy_timeout", "temp_store")
+            }
+        self.assertEqual(pragmas, {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 20000, "temp_store": 2})
+
+        with override_settings(SQLITE_PRAGMAS={"journal_mode; DROP TABLE core_match": "WAL"}):
+            with self.assertRaises(ValueError):
+                configure_sqlite(connection)
+
+
+class LoadTestCommandTests(SimpleTestCase):
+    databases = {"default"}
+
+    def test_loadtest_drives_every_flow_and_writes_json(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "run.json")
+            out = StringIO()
+            call_command(
+                "loadtest", "--receivers", "200", "--matches", "100", "--requests", "3", "--warmup", "1",
+                "--threads", "2", "--output", output, stdout=out,
+            )
+            with open(output, encoding="utf-8") as f:
+                report = json.load(f)
+
+        self.assertEqual(set(report["flows"]), {"doar", "receber", "pickup_check", "pickup_confirm"})
+        for flow, result in report["flows"].items():
+            self.assertEqual((flow, result["requests"], result["errors"], result["failed"]), (flow, 6, 0, 0))
+            self.assertLessEqual(result["latency_ms"]["p50"], result["latency_ms"]["p99"])
+            self.assertGreater(result["throughput_rps"], 0)
+        self.assertGreater(report["flows"]["doar"]["queries_per_request"]["mean"], 0)
+        self.assertIn("pickup_confirm", out.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command("loadtest", "--receivers", "10", "--matches", "20", stdout=StringIO())
+
+    def test_refused_pickups_count_as_errors_despite_the_200(self):
+        def unknown_code(flow, worker, i, pending):
+            return {"pickup_code": "CS-FFFFFFFF"}  # a view responde 200 com "Código não encontrado"
+
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(load, "_request_data", unknown_code):
+            output = os.path.join(tmp, "run.json")
+            call_command(
+                "loadtest", "--flows", "pickup_check", "--receivers", "20", "--matches", "8", "--requests", "2",
+                "--warmup", "0", "--threads", "1", "--output", output, stdout=StringIO(),
+            )
+            with open(output, encoding="utf-8") as f:
+                result = json.load(f)["flows"]["pickup_check"]
+        self.assertEqual((result["statuses"], result["errors"], result["failed"]), ({"200": 2}, 2, 2))
+
+
+def _count_in_child(path, results):
+    """Processo filho do teste de métricas: conta 10 e grava."""
+    with override_settings(METRICS={"ENABLED": True, "PATH": path}):
+        for _ in range(10):
+            metrics.inc("rate_limit_errors_total", rule="form_doar")
+        metrics.flush(force=True)
+    results.put(True)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "metrics.sqlite3")
+        override = override_settings(METRICS={"ENABLED": True, "PATH": self.path, "TOKEN": "s3cret"})
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.clear()
+        rate_limit.get_store().clear()
+        metrics.clear()
+        self.post = make_post()
+
+    def _value(self, text, series):
+        for line in text.splitlines():
+            if line.startswith(series + " "):
+                return float(line.rsplit(" ", 1)[1])
+        self.fail(f"{series} não está no /metrics")
+
+    def test_records_routes_queries_cache_and_rate_limit(self):
+        self.client.get("/doar/")
+        self.client.get("/doar/")
+        data = {"name": "Ana", "kit_type": "BASICO", "reference_post": self.post.id}
+        statuses = [
+            self.client.post("/doar/", {**data, "whatsapp": f"1599100{n:04d}"}).status_code for n in range(6)
+        ]
+        self.assertEqual(statuses, [302] * 5 + [429])
+        self.client.get("/nao-existe/")
+
+        text = metrics.render()
+        self.assertEqual(self._value(text, 'http_requests_total{method="GET",route="doar",status="200"}'), 2)
+        self.assertEqual(self._value(text, 'http_requests_total{method="POST",route="doar",status="302"}'), 5)
+        self.assertEqual(self._value(text, 'http_requests_total{method="POST",route="doar",status="429"}'), 1)
+        self.assertEqual(self._value(text, 'http_requests_total{method="GET",route="unmatched",status="404"}'), 1)
+        self.assertEqual(self._value(text, 'rate_limit_rejections_total{key="ip",rule="form_doar"}'), 1)
+        self.assertEqual(self._value(text, 'page_cache_requests_total{kind="page",name="doar",result="hit"}'), 1)
+
+        # histograma cumulativo: +Inf == _count
+        self.assertEqual(
+            self._value(text, 'http_request_duration_seconds_bucket{method="POST",route="doar",le="+Inf"}'), 6
+        )
+        self.assertEqual(self._value(text, 'http_request_duration_seconds_count{method="POST",route="doar"}'), 6)
+        self.assertGreater(self._value(text, 'http_request_db_queries_sum{route="doar"}'), 5)
+        self.assertGreater(self._value(text, 'db_query_duration_seconds_total{route="doar"}'), 0)
+        self.assertIn("# TYPE http_request_duration_seconds histogram", text)
+
+    def test_endpoint_needs_token_or_staff(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer errado").status_code, 403)
+
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn(b'http_requests_total{method="GET",route="metrics",status="403"} 2', response.content)
+
+    def test_counters_add_up_across_processes(self):
+        import multiprocessing
+
+        metrics.inc("rate_limit_errors_total", rule="form_doar")  # pendente no pai: o filho não herda
+        ctx = multiprocessing.get_context("fork")
+        results = ctx.Queue()
+        workers = [ctx.Process(target=_count_in_child, args=(self.path, results)) for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        for _ in workers:
+            results.get(timeout=30)
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(self._value(metrics.render(), 'rate_limit_errors_total{rule="form_doar"}'), 31)
+
+
+class ProfilerTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.config = {"SAMPLE_RATE": 0, "DIR": tmp.name, "MAX_PROFILES": 3, "TOKEN_MAX_AGE": 3600}
+        override = override_settings(PROFILER=self.config)
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.clear()
+        rate_limit.get_store().clear()
+        self.post = make_post()
+        self.staff = User.objects.create_user("suporte", is_staff=True)
+
+    def test_signed_token_profiles_the_whole_donation(self):
+        self.client.post("/receber/", {
+            "name": "Receptora", "whatsapp": "(15) 99200-0001", "city": "Sorocaba",
+            "neighborhood": "Centro", "needed_kit": "Basico", "reference_post": self.post.id,
+        })
+        self.client.get("/doar/", HTTP_X_PROFILE="forjado")
+        self.assertEqual(profiler.list_profiles(), [])
+
+        token = profiler.make_token(self.staff)
+        response = self.client.post("/doar/", {
+            "name": "Doadora", "whatsapp": "(15) 99100-0001", "kit_type": "Basico", "reference_post": self.post.id,
+        }, HTTP_X_PROFILE=token)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Match.objects.exists())
+
+        [meta] = profiler.list_profiles()
+        self.assertEqual(
+            (meta["method"], meta["route"], meta["status"], meta["reason"], meta["user_id"]),
+            ("POST", "doar", 302, "token", str(self.staff.pk)),
+        )
+        text = profiler.report(meta["id"], limit=None)
+        self.assertIn("match_donor", text)
+        self.assertIn("notify_match", text)  # o signal do Match entra no perfil
+
+        with override_settings(PROFILER={**self.config, "TOKEN_MAX_AGE": -1}):
+            self.client.get("/doar/", {"_profile": token})
+        self.assertEqual(len(profiler.list_profiles()), 1)
+
+    def test_sampling_keeps_only_the_newest_profiles(self):
+        self.config["SAMPLE_RATE"] = 1
+        for path in ("/", "/doar/", "/receber/", "/obrigada/", "/doar/"):
+            self.client.get(path)
+        self.assertEqual([p["path"] for p in profiler.list_profiles()], ["/doar/", "/obrigada/", "/receber/"])
+        self.assertEqual(len(os.listdir(self.config["DIR"])), 6)  # .prof + .json de cada
+
+    def test_admin_lists_shows_and_downloads_profiles(self):
+        self.client.get("/doar/", HTTP_X_PROFILE=profiler.make_token(self.staff))
+        [meta] = profiler.list_profiles()
+        self.assertEqual(self.client.get("/admin/profiles/").status_code, 302)  # login do admin
+
+        self.client.force_login(self.staff)
+        response = self.client.get("/admin/profiles/")
+        self.assertContains(response, "X-Profile: ")
+        self.assertContains(response, f"/admin/profiles/{meta['id']}/")
+        self.assertContains(self.client.get(f"/admin/profiles/{meta['id']}/?sort=ncalls"), "ncalls")
+        download = self.client.get(f"/admin/profiles/{meta['id']}.prof")
+        self.assertEqual(download.status_code, 200)
+        self.assertGreater(len(b"".join(download.streaming_content)), 0)
+        self.assertEqual(self.client.get("/admin/profiles/..%2F..%2Fdb/").status_code, 404)
+
+
+class ConcurrentDonationTests(TransactionTestCase):
+    """
+    Dispara centenas de doações simultâneas pelo formulário e confere
+    que nenhuma receptora ficou com dois matches em aberto.
+    """
+    DONATIONS = 300
+    RECEIVERS = 200
+    WORKERS = 16
+
+    def test_parallel_donations_claim_each_receiver_once(self):
+        rate_limit.get_store().clear()
+        post = make_post()
+        for n in range(self.RECEIVERS):
+            match_service.match_receiver(make_receiver(n, post))
+
+        def donate(n):
+            try:
+                client = Client(REMOTE_ADDR=f"10.0.{n // 256}.{n % 256}")
+                response = client.post("/doar/", {
+                    "name": f"Doadora {n}", "whatsapp": f"159930{n:05d}",
+                    "kit_type": "BASICO", "reference_post": post.id,
+                })
+                return response.status_code
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            statuses = list(pool.map(donate, range(self.DONATIONS)))
+
+        self.assertEqual(set(statuses), {302})
+        open_per_receiver = (
+            Match.objects.filter(is_completed=False)
+            .values("receiver_id").annotate(n=Count("id")).filter(n__gt=1)
+        )
+        self.assertFalse(open_per_receiver.exists())
+        self.assertEqual(Match.objects.count(), self.RECEIVERS)
+        self.assertEqual(
+            QueueEntry.objects.filter(side=QueueEntry.SIDE_DONOR).count(),
+            self.DONATIONS - self.RECEIVERS,
+        )
+
+
+class PickupCodeTests(TestCase):
+    def setUp(self):
+        self.allocator = SequenceAllocator(block_size=50, key="chave-de-teste")
+
+    def test_codes_are_unique_and_well_formed(self):
+        codes = self.allocator.allocate(500) + self.allocator.allocate(120)
+
+        self.assertEqual(len(set(codes)), 620)
+        for code in codes:
+            self.assertRegex(code, r"^CS-[G-Z][0-9A-HJKMNP-TV-Z]{7}$")
+
+    def test_permutation_is_a_bijection_that_hides_the_counter(self):
+        values = [self.allocator.permute(n) for n in range(5000)]
+
+        self.assertEqual(len(set(values)), 5000)
+        self.assertTrue(all(0 <= v < 2 ** 39 for v in values))
+        self.assertNotEqual(sorted(values), values)
+
+    def test_spare_block_is_dropped_when_transaction_rolls_back(self):
+        try:
+            with transaction.atomic():
+                self.allocator.allocate(1)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.allocator.allocate(1)
+        # a reserva desfeita volta para o contador; o próximo bloco começa do zero
+        self.assertEqual(first, [SequenceAllocator.encode(self.allocator.permute(0))])
+        self.assertEqual(self.allocator.allocate(49)[-1], SequenceAllocator.encode(self.allocator.permute(49)))
+
+    def test_bulk_created_matches_get_codes_without_lookups(self):
+        post = make_post()
+        donors = [make_donor(n) for n in range(3)]
+        receivers = [make_receiver(n, post) for n in range(3)]
+        codes = allocate_pickup_codes(3)
+
+        with CaptureQueriesContext(connection) as ctx:
+            Match.objects.bulk_create([
+                Match(donor=d, receiver=r, reference_post=post, pickup_code=c)
+                for d, r, c in zip(donors, receivers, codes)
+            ])
+        self.assertFalse(any("core_match" in q["sql"] and "SELECT" in q["sql"] for q in ctx.captured_queries))
+        self.assertEqual(set(Match.objects.values_list("pickup_code", flat=True)), set(codes))
+
+
+class PickupDeskTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches[pickup.CACHE_ALIAS].clear()
+        self.post = make_post()
+        self.match = Match.objects.create(
+            donor=make_donor(1), receiver=make_receiver(1, self.post), reference_post=self.post
+        )
+        self.operator = User.objects.create_user("operadora")
+        self.operator.profile.role = "operator"
+        self.operator.profile.reference_post = self.post
+        self.operator.profile.save()
+        self.client.force_login(self.operator)
+
+    def messy(self, code):
+        body = code.removeprefix("CS-").lower().replace("0", "o").replace("1", "l")
+        return f"  cs {body[:4]} {body[4:]} "
+
+    def test_normalize_code(self):
+        self.assertEqual(pickup.normalize_code(" cs-gabc def0 "), "CS-GABCDEF0")
+        self.assertEqual(pickup.normalize_code("gabcdeoi"), "CS-GABCDE01")
+        self.assertEqual(pickup.normalize_code("CS-9bf3420b"), "CS-9BF3420B")
+        self.assertEqual(pickup.normalize_code(" - "), "")
+
+    def test_check_accepts_messy_codes_and_is_cached(self):
+        response = self.client.post("/pickup/check/", {"pickup_code": self.messy(self.match.pickup_code)})
+        self.assertContains(response, "Código válido")
+        self.assertContains(response, "Receptora 1")
+        with self.assertNumQueries(0):
+            info = pickup.lookup(self.match.pickup_code.lower())
+        self.assertEqual((info.id, info.is_completed), (self.match.id, False))
+        namespace = f"pickup:{self.match.pickup_code}"
+        self.assertIsNone(two_tier_cache.get_version(namespace, create=False))  # nada no "default"
+        self.assertIsNotNone(two_tier_cache.get_version(namespace, create=False, using=pickup.CACHE_ALIAS))
+
+        legacy = Match.objects.create(
+            donor=make_donor(2), receiver=make_receiver(2, self.post), reference_post=self.post, pickup_code="cs-01"
+        )
+        self.assertEqual(pickup.lookup("cs-01").id, legacy.id)
+
+    def test_confirm_is_a_single_conditional_update(self):
+        first, second = pickup.lookup(self.match.pickup_code), pickup.lookup(self.match.pickup_code)
+        self.assertTrue(pickup.confirm(first))
+        self.assertFalse(pickup.confirm(second))  # conferiu antes, confirmou depois: não entrega de novo
+
+        rollup = ReportRollup.objects.get(reference_post=self.post, kit="BASICO")
+        self.assertEqual((rollup.matches_pending, rollup.matches_delivered), (0, 1))
+        self.assertTrue(pickup.lookup(self.match.pickup_code).is_completed)
+
+        response = self.client.post("/pickup/confirm/", {"match_id": self.match.id, "pickup_code": self.match.pickup_code})
+        self.assertContains(response, "Este código já foi usado")
+
+    def test_confirm_view_and_post_permission(self):
+        other = User.objects.create_user("outra")
+        other.profile.role = "operator"
+        other.profile.reference_post = make_post(name="CRAS Norte")
+        other.profile.save()
+        data = {"match_id": self.match.id, "pickup_code": self.messy(self.match.pickup_code)}
+
+        self.client.force_login(other)
+        self.assertContains(self.client.post("/pickup/confirm/", data), "Sem permissão")
+        self.client.force_login(self.operator)
+        self.assertContains(self.client.post("/pickup/confirm/", data), "Retirada confirmada com sucesso")
+        self.match.refresh_from_db()
+        self.assertTrue(self.match.is_completed)
+
+        self.match.is_completed = False  # admin desfez: o retrato em cache acompanha
+        self.match.save()
+        self.assertFalse(pickup.lookup(self.match.pickup_code).is_completed)
+
+
+class ProfileSessionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches[pickup.CACHE_ALIAS].clear()
+        self.post = make_post()
+        self.match = Match.objects.create(
+            donor=make_donor(1), receiver=make_receiver(1, self.post), reference_post=self.post
+        )
+        self.user = User.objects.create_user("operadora", password="senha-forte-1")
+        UserProfile.objects.filter(user=self.user).update(role="operator", reference_post=self.post)
+        self.client.login(username="operadora", password="senha-forte-1")
+
+    def check(self):
+        return self.client.post("/pickup/check/", {"pickup_code": self.match.pickup_code})
+
+    def test_operator_requests_skip_auth_queries_once_warm(self):
+        self.assertContains(self.check(), "Código válido")
+        with self.assertNumQueries(1):  # só is_active/is_staff/is_superuser, pela chave primária
+            response = self.check()
+        self.assertContains(response, "Receptora 1")
+        self.assertEqual(response.wsgi_request.user.profile.reference_post.name, "UBS Centro")
+
+    def test_snapshot_follows_profile_post_and_password_changes(self):
+        self.check()
+        profile = UserProfile.objects.get(user=self.user)
+        profile.role = "auditor"
+        profile.save()
+        self.assertEqual(self.check().status_code, 403)
+
+        profile.role = "operator"
+        profile.save()
+        self.post.name = "UBS Centro Novo"
+        self.post.save()
+        self.assertEqual(self.check().wsgi_request.user.profile.reference_post.name, "UBS Centro Novo")
+
+        self.user.set_password("outra-senha-2")  # trocou em outro lugar: esta sessão cai
+        self.user.save()
+        self.assertEqual(self.check().status_code, 403)
+
+    def test_bulk_updates_revoke_access_right_away(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get("/admin/reports/").status_code, 200)
+
+        User.objects.filter(pk=self.user.pk).update(is_staff=False)  # sem signal
+        self.assertEqual(self.client.get("/admin/reports/").status_code, 302)
+        self.assertEqual(self.check().status_code, 200)
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.check().status_code, 403)
+        self.assertFalse(self.check().wsgi_request.user.is_authenticated)
+
+    def test_profiles_are_created_only_with_the_user_and_backfilled(self):
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=["last_login"])  # o login não procura perfil
+
+        orphans = [User.objects.create_user(f"antiga{n}") for n in range(5)]
+        UserProfile.objects.filter(user__in=orphans).delete()
+        out = StringIO()
+        call_command("backfill_profiles", "--chunk-size", "2", stdout=out)
+        self.assertIn("5 perfis criados", out.getvalue())
+        self.assertEqual(UserProfile.objects.filter(user__in=orphans).count(), 5)
+
+        # sessão aberta antes do backfill, com "sem perfil" no retrato, passa a ver o perfil
+        client = Client()
+        client.force_login(orphans[0])
+        UserProfile.objects.filter(user=orphans[0]).delete()
+        invalidate_profile(orphans[0].pk)
+        self.assertIsNone(getattr(client.get("/admin/reports/").wsgi_request.user, "profile", None))
+        call_command("backfill_profiles", stdout=StringIO())
+        self.assertIsNotNone(getattr(client.get("/admin/reports/").wsgi_request.user, "profile", None))
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        post = make_post()
+        match_service.match_receiver(make_receiver(1, post))
+        self.match = match_service.match_donor(make_donor(1), post.id)
+
+    def drain(self, send):
+        sender = BaseSender()
+        sender.send = send
+        with mock.patch("core.management.commands.notify_worker.get_sender", return_value=sender):
+            call_command("notify_worker", once=True, stdout=StringIO())
+
+    def test_match_enqueues_one_message_per_recipient(self):
+        rows = Outbox.objects.filter(match=self.match)
+        self.assertEqual(sorted(rows.values_list("recipient", flat=True)), ["DONOR", "RECEIVER"])
+        self.assertIn(self.match.pickup_code, rows.first().message)
+
+        notify_match(self.match)
+        self.assertEqual(rows.count(), 2)
+
+    def test_worker_sends_and_marks_rows(self):
+        sender = mock.Mock(return_value=True)
+        self.drain(sender)
+
+        self.assertEqual(sender.call_count, 2)
+        self.assertEqual(Outbox.objects.filter(status=Outbox.STATUS_SENT).count(), 2)
+
+    def test_failed_send_is_retried_later(self):
+        self.drain(mock.Mock(side_effect=ConnectionError("provedor fora do ar")))
+
+        row = Outbox.objects.first()
+        self.assertEqual((row.status, row.attempts), (Outbox.STATUS_PENDING, 1))
+        self.assertIn("provedor fora do ar", row.last_error)
+        self.assertGreater(row.next_attempt_at, timezone.now())
+
+        sender = mock.Mock(return_value=True)
+        self.drain(sender)
+        sender.assert_not_called()
+
+    def test_expired_lease_is_claimed_again(self):
+        claimed = outbox.claim_batch(size=10, lease_seconds=300)
+        self.assertEqual(len(claimed), 2)
+        self.assertEqual(outbox.claim_batch(size=10), [])
+
+        Outbox.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(len(outbox.claim_batch(size=10)), 2)
+
+
+class StubProviderHandler(BaseHTTPRequestHandler):
+    """Provedor de WhatsApp falso: 200 para qualquer número, 400 para "recusar"."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.received.append((payload["to"], self.client_address[1]))
+        status = 400 if payload["to"] == "recusar" else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+class WhatsAppSenderTests(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubProviderHandler)
+        self.server.received = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/messages"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_http_sender_reuses_pooled_connections(self):
+        sender = HttpSender(self.url, concurrency=4)
+        items = [(f"55159910{n:05d}", "oi") for n in range(200)]
+
+        results = sender.send_many(items)
+        sender.close()
+
+        self.assertEqual(results, [True] * 200)
+        self.assertEqual(len(self.server.received), 200)
+        # cada conexão TCP tem uma porta local própria: no máximo uma por envio simultâneo
+        self.assertLessEqual(len({port for _, port in self.server.received}), 4)
+
+    def test_http_sender_reports_refusals_and_network_errors(self):
+        sender = HttpSender(self.url)
+        self.assertFalse(sender.send("recusar", "oi"))
+
+        dead = HttpSender("http://127.0.0.1:9/messages", timeout=1)
+        (result,) = dead.send_many([("5515991000000", "oi")])
+        self.assertIsInstance(result, OSError)
+
+    def test_jsonl_sender_appends_one_line_per_message(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "out.jsonl")
+            JsonlFileSender(path, concurrency=4).send_many([("1", "a"), ("2", "b"), ("3", "c")])
+            with open(path, encoding="utf-8") as fh:
+                phones = sorted(json.loads(line)["phone"] for line in fh)
+        self.assertEqual(phones, ["1", "2", "3"])
+
+
+class WhatsAppBotBatchTests(SimpleTestCase):
+    ITEMS = [{"id": n, "phone": f"55159910000{n}", "message": f"mensagem {n}"} for n in range(5)]
+
+    def test_batch_resumes_after_crash_from_checkpoint(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "checkpoint.json")
+            delivered = []
+            crashes = ["mensagem 2"]
+
+            def flaky(phone, message):
+                if message in crashes:
+                    crashes.remove(message)
+                    raise RuntimeError("navegador caiu")
+                delivered.append(message)
+
+            first = whatsapp_bot.run_batch(self.ITEMS[:3], flaky, whatsapp_bot.Checkpoint(path), log=lambda _: None)
+            second = whatsapp_bot.run_batch(self.ITEMS, flaky, whatsapp_bot.Checkpoint(path), log=lambda _: None)
+
+        self.assertEqual((first["sent"], first["failed"]), (2, 1))
+        self.assertEqual((second["sent"], second["skipped"]), (3, 2))
+        self.assertEqual(delivered, [f"mensagem {n}" for n in range(5)])
+
+    @skipUnless(importlib.util.find_spec("selenium"), "selenium não instalado")
+    def test_sends_through_local_standin_page(self):
+        page = (Path(whatsapp_bot.__file__).parent / "whatsapp_standin.html").as_uri()
+        try:
+            driver = whatsapp_bot.open_driver(tempfile.mkdtemp(), headless=True)
+        except Exception as exc:
+            self.skipTest(f"Chrome indisponível: {exc}")
+        try:
+            web = whatsapp_bot.WhatsAppWeb(driver, home_url=page, send_url=page + "?phone={phone}&text={text}", timeout=5)
+            web.wait_ready(login_timeout=5)
+            with tempfile.TemporaryDirectory() as tmp:
+                stats = whatsapp_bot.run_batch(
+                    self.ITEMS, web.send, whatsapp_bot.Checkpoint(os.path.join(tmp, "c.json")), log=lambda _: None
+                )
+            sent = json.loads(driver.execute_script("return localStorage.getItem('sent') || '[]'"))
+        finally:
+            driver.quit()
+
+        self.assertEqual(stats["sent"], 5)
+        self.assertEqual([entry["text"] for entry in sent][-5:], [item["message"] for item in self.ITEMS])
+
+
+@override_settings(MATCHES_API_TOKEN="segredo")
+class MatchesFeedTests(TestCase):
+    AUTH = {"HTTP_AUTHORIZATION": "Bearer segredo"}
+
+    def setUp(self):
+        self.post = make_post()
+        self.matches = [
+            Match.objects.create(donor=make_donor(n), receiver=make_receiver(n, self.post), reference_post=self.post)
+            for n in range(7)
+        ]
+
+    def get(self, url, **extra):
+        response = self.client.get(url, **{**self.AUTH, **extra})
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        return response, (json.loads(body) if response.status_code == 200 else None)
+
+    def test_pages_cover_pending_matches_in_order(self):
+        Match.objects.filter(id=self.matches[3].id).update(is_completed=True)
+
+        seen, url, pages = [], "/api/matches/?limit=2", 0
+        while url:
+            with self.assertNumQueries(2):  # ETag + página
+                response, data = self.get(url)
+            seen += [item["id"] for item in data["matches"]]
+            url, pages = data["next"], pages + 1
+
+        expected = [m.id for m in self.matches if m.id != self.matches[3].id]
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, 3)
+        first = self.get("/api/matches/")[1]["matches"][0]
+        self.assertEqual(first["phone"], self.matches[0].receiver.whatsapp)
+        self.assertIn(self.matches[0].pickup_code, first["message"])
+
+    def test_unchanged_feed_returns_304(self):
+        response, _ = self.get("/api/matches/")
+        etag = response["ETag"]
+
+        self.assertEqual(self.get("/api/matches/", HTTP_IF_NONE_MATCH=etag)[0].status_code, 304)
+
+        Match.objects.create(donor=make_donor(50), receiver=make_receiver(50, self.post), reference_post=self.post)
+        self.assertEqual(self.get("/api/matches/", HTTP_IF_NONE_MATCH=etag)[0].status_code, 200)
+
+    def test_items_carry_the_outbox_status_and_the_etag_follows_it(self):
+        response, data = self.get("/api/matches/")
+        self.assertEqual(data["matches"][0]["notification"], {"donor": "PENDING", "receiver": "PENDING"})
+
+        # tentativa que falhou: as contagens por situação voltam iguais, as tentativas não
+        etag = response["ETag"]
+        for row in outbox.claim_batch(size=1):
+            outbox.mark_failed(row, "timeout")
+        self.assertEqual(self.get("/api/matches/", HTTP_IF_NONE_MATCH=etag)[0].status_code, 200)
+
+        etag = self.get("/api/matches/")[0]["ETag"]
+        outbox.mark_sent(outbox.claim_batch(size=1))
+        response, data = self.get("/api/matches/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("SENT", {status for item in data["matches"] for status in item["notification"].values()})
+
+    def test_requires_token_or_staff(self):
+        self.assertEqual(self.client.get("/api/matches/").status_code, 403)
+        self.assertEqual(
+            self.client.get("/api/matches/", HTTP_AUTHORIZATION="Bearer errado").status_code, 403
+        )
+        self.assertEqual(self.get("/api/matches/?cursor=%%%")[0].status_code, 400)
+
+
+class MessageCatalogueTests(TestCase):
+    def test_render_many_from_values_matches_instance_rendering(self):
+        post = make_post()
+        for n in range(5):
+            Match.objects.create(donor=make_donor(n, kit="ALERGIA"), receiver=make_receiver(n, post), reference_post=post)
+
+        with self.assertNumQueries(1):
+            texts = list(render_many(MATCH_NOTIFICATION, Match.objects.order_by("id")))
+
+        expected = [
+            MATCH_NOTIFICATION.render_instance(m)
+            for m in Match.objects.select_related("donor", "receiver", "reference_post").order_by("id")
+        ]
+        self.assertEqual(texts, expected)
+        self.assertIn("📦 Kit: Kit Alergia", texts[0])
+
+    def test_placeholders_are_checked_against_the_model(self):
+        template = MessageTemplate("teste_campo_antigo", "{donor__preferred_kit}", model="core.Match")
+        self.addCleanup(CATALOGUE.pop, "teste_campo_antigo")
+
+        with self.assertRaisesMessage(ImproperlyConfigured, "donor__preferred_kit"):
+            template.validate()
+        with self.assertRaises(ImproperlyConfigured):
+            MessageTemplate("teste_posicional", "Oi {}!")
+
+
+class ContentFilterTests(SimpleTestCase):
+    def tearDown(self):
+        content_filter.reload()
+
+    def test_folds_accents_case_and_leetspeak(self):
+        for text in ("Desgraça", "DESGRACADO", "p0rr4", "m@t4r", "vaga   de-emprego", "Pix Grátis"):
+            with self.subTest(text=text):
+                self.assertTrue(content_filter.contains_bad_words(text))
+
+    def test_whole_words_do_not_flag_names_or_phones(self):
+        for text in ("Armando", "Nazaré", "Suíça", "lixeira", "(15) 99123-4567", "Maria Golpeia"):
+            with self.subTest(text=text):
+                self.assertFalse(content_filter.contains_bad_words(text))
+
+    def test_check_many_reports_only_flagged_fields(self):
+        flagged = content_filter.check_many({"name": "Ana", "obs": "seu idiota", "kit": "BASICO"})
+        self.assertEqual(flagged, {"obs": {"idiota"}})
+
+    def test_words_file_is_reloaded_when_it_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bad_words.txt")
+            with open(path, "w", encoding="utf-8") as fh:
+                fh.write("# lista de teste\nbanana\n")
+            with self.settings(BAD_WORDS_FILE=path), mock.patch.object(content_filter, "RELOAD_INTERVAL", 0):
+                self.assertTrue(content_filter.contains_bad_words("BANANA"))
+                self.assertFalse(content_filter.contains_bad_words("laranja"))
+
+                with open(path, "w", encoding="utf-8") as fh:
+                    fh.write("laranj*\n")
+                os.utime(path, (time.time() + 10, time.time() + 10))
+
+                self.assertTrue(content_filter.contains_bad_words("laranjada"))
+                self.assertFalse(content_filter.contains_bad_words("banana"))
+
+
+class PhoneNormalizationTests(SimpleTestCase):
+    CASES = {
+        "(15) 99123-4567": "+5515991234567",
+        "+55 15 99123 4567": "+5515991234567",
+        "0055 15 991234567": "+5515991234567",
+        "015 99123-4567": "+5515991234567",
+        "(15) 3212-3456": "+551532123456",
+        "(55) 99123-4567": "+5555991234567",  # DDD 55 (RS), não DDI
+        "15 89123-4567": "",  # celular sem o 9
+        "(10) 99123-4567": "",  # DDD não tem 0
+        "123": "",
+        "": "",
+        None: "",
+    }
+
+    def test_formats_share_one_canonical_form(self):
+        for raw, expected in self.CASES.items():
+            with self.subTest(raw=raw):
+                self.assertEqual(normalize_phone(raw), expected)
+
+    def test_normalize_many_matches_single_calls(self):
+        values = list(self.CASES) + ["15\n99123-4567"]
+        self.assertEqual(normalize_many(values), [normalize_phone(v) for v in values])
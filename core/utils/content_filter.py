@@ -0,0 +1,171 @@
+# core/utils/content_filter.py
+"""
+Filtro de palavras proibidas dos formulários (lista única).
+
+A lista é compilada uma vez numa única expressão regular em forma de trie
+(prefixos comuns compartilhados), então cada texto é lido uma vez só,
+qualquer que seja o tamanho da lista.
+
+Antes de comparar, o texto é "dobrado":
+  - minúsculas e sem acento ("Desgraça" -> "desgraca");
+  - pontuação, espaços repetidos e emoji só separam palavras.
+O leetspeak fica na própria regex ("o" casa "0", "a" casa "4"/"@"...),
+só em palavras que têm alguma letra, para não ler telefone como texto.
+
+Entradas da lista:
+  "lixo"            palavra inteira (não pega "lixeira")
+  "estupr*"         prefixo (estupro, estuprador...)
+  "vaga de emprego" expressão, palavra a palavra
+
+Lista customizada: settings.BAD_WORDS_FILE (uma entrada por linha, "#"
+comenta). O arquivo é relido sozinho quando muda, sem reiniciar o servidor.
+"""
+import os
+import re
+import threading
+import time
+import unicodedata
+
+from django.conf import settings
+
+DEFAULT_WORDS = (
+    # ofensas
+    "puta", "viado", "bicha", "arrombad*", "caralho", "porra", "desgraca", "desgracad*",
+    "idiota", "retardad*", "macaco", "biscate", "lixo",
+    # violência / ódio
+    "matar", "suicid*", "bomba", "arma", "odio", "nazi*", "estupr*",
+    # golpes
+    "vaga de emprego", "pix gratis", "golpe", "golpista",
+)
+
+RELOAD_INTERVAL = 5  # segundos entre conferências do mtime do BAD_WORDS_FILE
+
+# leetspeak: cada letra da lista também casa com os sinais equivalentes
+_LEET = {"a": "4@", "e": "3", "i": "1", "o": "0", "s": "5$", "t": "7"}
+_WORD_CHAR = "a-z0-9@$"
+_COMBINING = re.compile(r"[\u0300-\u036f]+")
+
+
+def fold(text: str) -> str:
+    """Minúsculas e sem acento; o resto (pontuação, emoji...) separa palavras."""
+    if not text:
+        return ""
+    return _COMBINING.sub("", unicodedata.normalize("NFKD", text.casefold()))
+
+
+def _char_regex(char):
+    if char == " ":
+        return f"[^{_WORD_CHAR}]+"
+    if char in _LEET:
+        return f"[{char}{re.escape(_LEET[char])}]"
+    return re.escape(char)
+
+
+def _trie_regex(node):
+    """Regex de um nó da trie: ramos por caractere + fim de palavra/prefixo."""
+    branches = [_char_regex(char) + _trie_regex(child) for char, child in sorted(node.items()) if len(char) == 1]
+    if "$word" in node:
+        branches.append(f"(?![{_WORD_CHAR}])")
+    if "$prefix" in node:
+        branches.append("")
+    if len(branches) == 1:
+        return branches[0]
+    return "(?:" + "|".join(branches) + ")"
+
+
+class ContentFilter:
+    def __init__(self, words):
+        trie = {}
+        entries = []
+        for raw in words:
+            prefix = raw.strip().endswith("*")
+            entry = " ".join(re.findall(r"[a-z0-9]+", fold(raw.strip().rstrip("*"))))
+            if not entry:
+                continue
+            entries.append(entry + ("*" if prefix else ""))
+            node = trie
+            for char in entry:
+                node = node.setdefault(char, {})
+            node["$prefix" if prefix else "$word"] = True
+
+        self.words = tuple(entries)
+        # começo de palavra, e a palavra tem letra: "5373" (telefone) não vira "sete"
+        self._regex = re.compile(
+            f"(?<![{_WORD_CHAR}])(?=[0-9@$]*[a-z])" + _trie_regex(trie)
+        ) if trie else None
+
+    def find(self, *texts):
+        """Trechos (sem acento, em minúsculas) que bateram com a lista."""
+        if self._regex is None:
+            return set()
+        return {m.group() for m in self._regex.finditer(fold(" ".join(t for t in texts if t)))}
+
+    def contains(self, *texts) -> bool:
+        if self._regex is None:
+            return False
+        return self._regex.search(fold(" ".join(t for t in texts if t))) is not None
+
+    def check_many(self, fields):
+        """
+        {nome: texto} -> {nome: {trechos}} só com os campos reprovados.
+        Também aceita uma lista de textos (as chaves viram os índices).
+        """
+        items = fields.items() if hasattr(fields, "items") else enumerate(fields)
+        flagged = {}
+        for name, text in items:
+            found = self.find(text)
+            if found:
+                flagged[name] = found
+        return flagged
+
+
+# ---------------- INSTÂNCIA COMPARTILHADA ---------------- #
+
+_lock = threading.Lock()
+_state = {"filter": None, "source": None, "mtime": None, "checked": 0.0}
+
+
+def _read_words_file(path):
+    with open(path, encoding="utf-8") as fh:
+        return [line.split("#", 1)[0].strip() for line in fh if line.split("#", 1)[0].strip()]
+
+
+def reload(words=None):
+    """Recompila a lista (BAD_WORDS_FILE ou DEFAULT_WORDS, ou `words` se dado)."""
+    path = getattr(settings, "BAD_WORDS_FILE", None)
+    mtime = None
+    if words is None and path:
+        mtime = os.stat(path).st_mtime
+        words = _read_words_file(path)
+    content_filter = ContentFilter(words if words is not None else DEFAULT_WORDS)
+    with _lock:
+        _state.update(filter=content_filter, source=path, mtime=mtime, checked=time.monotonic())
+    return content_filter
+
+
+def get_filter() -> ContentFilter:
+    content_filter = _state["filter"]
+    path = getattr(settings, "BAD_WORDS_FILE", None)
+    if content_filter is None or path != _state["source"]:
+        return reload()
+    if path and time.monotonic() - _state["checked"] >= RELOAD_INTERVAL:
+        _state["checked"] = time.monotonic()
+        try:
+            changed = os.stat(path).st_mtime != _state["mtime"]
+        except OSError:
+            changed = False  # arquivo sumiu no meio da troca: fica com a lista atual
+        if changed:
+            return reload()
+    return content_filter
+
+
+def contains_bad_words(*texts) -> bool:
+    return get_filter().contains(*texts)
+
+
+def find_bad_words(*texts):
+    return get_filter().find(*texts)
+
+
+def check_many(fields):
+    return get_filter().check_many(fields)
@@ -0,0 +1,109 @@
+# core/utils/page_cache.py
+"""
+Cache das páginas públicas (home, obrigada, GET de doar/receber) e de
+fragmentos (o <select> de postos).
+
+O HTML guardado não tem nada da pessoa:
+  - o token CSRF vira um marcador na renderização e é trocado pelo token
+    da requisição a cada resposta (get_token, que também manda o cookie);
+  - trechos por requisição ("holes", ex.: as mensagens do obrigada) viram
+    marcadores e são renderizados à parte, com o próprio template.
+
+A chave leva o idioma ativo e a versão do catálogo de postos
+(core.services.post_catalogue): mudou um posto, mudou a chave, e a versão
+antiga some sozinha pelo timeout (settings.PAGE_CACHE_TIMEOUT; 0 desliga).
+
+stats() devolve os acertos/erros deste processo, por página e no total.
+"""
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils import translation
+from django.utils.safestring import mark_safe
+
+from core.services.post_catalogue import current_version
+
+CSRF_MARKER = "@@page-cache:csrf@@"
+
+_lock = threading.Lock()
+_stats = Counter()
+
+
+def _hole(name):
+    return f"@@page-cache:{name}@@"
+
+
+def _count(kind, name, outcome):
+    with _lock:
+        _stats[f"{kind}.{outcome}"] += 1
+        _stats[f"{kind}.{name}.{outcome}"] += 1
+
+
+def stats():
+    """{"page.hit": n, "page.doar.miss": n, "fragment.hit": n, ...}"""
+    with _lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
+
+
+def cache_key(kind, name):
+    return f"{kind}:{name}:{translation.get_language()}:{current_version()}"
+
+
+def _cached_html(kind, name, render):
+    timeout = getattr(settings, "PAGE_CACHE_TIMEOUT", 0)
+    if timeout <= 0:
+        return render()
+    key = cache_key(kind, name)
+    html = cache.get(key)
+    if html is not None:
+        _count(kind, name, "hit")
+        return html
+    _count(kind, name, "miss")
+    html = render()
+    cache.set(key, html, timeout)
+    return html
+
+
+def _context(context):
+    return dict(context() if callable(context) else context or {})
+
+
+def cached_fragment(name, template_name, context=None, request=None):
+    """
+    Trecho de template em cache; `context` pode ser uma função (só é chamada
+    na renderização). O trecho não pode depender da requisição.
+    """
+    return mark_safe(_cached_html(
+        "fragment", name, lambda: render_to_string(template_name, _context(context), request)
+    ))
+
+
+def render_cached(request, name, template_name, context=None, holes=None):
+    """
+    render() com cache da página inteira.
+    holes: {variável do template: template renderizado por requisição}.
+    """
+    holes = holes or {}
+
+    def render():
+        ctx = _context(context)
+        ctx["csrf_token"] = CSRF_MARKER  # o contexto da view vence o context processor
+        ctx.update({var: mark_safe(_hole(var)) for var in holes})
+        return render_to_string(template_name, ctx, request)
+
+    html = _cached_html("page", name, render)
+    if CSRF_MARKER in html:
+        html = html.replace(CSRF_MARKER, get_token(request))
+    for var, hole_template in holes.items():
+        html = html.replace(_hole(var), render_to_string(hole_template, request=request))
+    return HttpResponse(html)
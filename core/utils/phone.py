@@ -0,0 +1,50 @@
+# core/utils/phone.py
+"""
+Telefone canônico: E.164 brasileiro, "+55" + DDD + número.
+
+    normalize_phone("(15) 99123-4567")    -> "+5515991234567"
+    normalize_phone("+55 15 99123 4567")  -> "+5515991234567"
+    normalize_phone("0 15 99123-4567")    -> "+5515991234567"
+    normalize_phone("123")                -> ""  (inválido)
+
+É a forma gravada em Donor/Receiver.whatsapp_e164 (indexado), usada para
+dedupe e busca. normalize_many() faz o mesmo para uma lista inteira de uma
+vez (importações).
+"""
+import re
+
+# [00] [55 | 0 de longa distância] DDD (dois dígitos de 1 a 9) +
+# 8 dígitos (fixo) ou 9 começando com 9 (celular).
+_CANONICAL = re.compile(r"(?:00)?(?:55|0)?([1-9]{2}(?:9\d{8}|\d{8}))")
+_NON_DIGITS = re.compile(r"\D+")
+_KEEP = frozenset("0123456789\n")
+
+
+def normalize_phone(raw) -> str:
+    """E.164 ("+55DDNNNNNNNNN") ou "" se não for um telefone BR válido."""
+    if not raw:
+        return ""
+    match = _CANONICAL.fullmatch(_NON_DIGITS.sub("", str(raw)))
+    return "+55" + match[1] if match else ""
+
+
+def normalize_many(values):
+    """
+    Lista de telefones canônicos ("" nos inválidos), na ordem de `values`.
+    O lote vira uma string só (um valor por linha) e a pontuação sai com um
+    único str.translate, montado com os caracteres que aparecem no lote;
+    sobra só um fullmatch por linha.
+    """
+    values = ["" if v is None else str(v) for v in values]
+    text = "\n".join(values)
+    text = text.translate(str.maketrans("", "", "".join(set(text) - _KEEP)))
+    lines = text.split("\n")
+    if len(lines) != len(values):  # algum valor tinha quebra de linha
+        return [normalize_phone(v) for v in values]
+    fullmatch = _CANONICAL.fullmatch
+    return ["+55" + match[1] if (match := fullmatch(digits)) else "" for digits in lines]
+
+
+def national(e164: str) -> str:
+    """DDD + número (sem +55), o formato antigo dos campos whatsapp."""
+    return e164[3:] if e164.startswith("+55") else ""
@@ -0,0 +1,193 @@
+# core/utils/profiler.py
+"""
+Profiler (cProfile) de uma requisição inteira, sob pedido ou por amostragem.
+
+ProfilerMiddleware liga o cProfile em volta do resto da pilha (sessão,
+auth, view, signals, on_commit...) quando:
+  - a requisição traz um token assinado, em "X-Profile: <token>" ou
+    "?_profile=<token>" (gerado em /admin/profiles/ por um usuário staff,
+    vale TOKEN_MAX_AGE segundos); ou
+  - cai na amostragem de 1 em SAMPLE_RATE (0 = desligada).
+Fora isso o custo é um sorteio e a leitura de um header.
+
+Cada perfil vira um .prof (pstats/snakeviz) + um .json com os dados da
+requisição em DIR; acima de MAX_PROFILES os mais antigos são apagados.
+
+    PROFILER = {
+        "SAMPLE_RATE": 0,
+        "DIR": BASE_DIR / "profiles",
+        "MAX_PROFILES": 200,
+        "TOKEN_MAX_AGE": 3600,
+    }
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+HEADER = "X-Profile"
+_META_HEADER = "HTTP_X_PROFILE"
+QUERY_PARAM = "_profile"
+SORTS = ("cumulative", "tottime", "ncalls")
+_SALT = "core.utils.profiler"
+_ID = re.compile(r"^[0-9]{13}-[0-9a-f]{8}$")
+
+
+def _config():
+    return getattr(settings, "PROFILER", {})
+
+
+def profile_dir() -> Path:
+    return Path(_config().get("DIR", settings.BASE_DIR / "profiles"))
+
+
+# ---------------- TOKEN ---------------- #
+
+def make_token(user) -> str:
+    """Token assinado (SECRET_KEY) que liga o profiler nas requisições que o trouxerem."""
+    return signing.TimestampSigner(salt=_SALT).sign(str(user.pk))
+
+
+def check_token(token):
+    """pk de quem gerou o token, ou None se for inválido/vencido."""
+    try:
+        return signing.TimestampSigner(salt=_SALT).unsign(token, max_age=_config().get("TOKEN_MAX_AGE", 3600))
+    except signing.BadSignature:  # SignatureExpired é subclasse
+        return None
+
+
+# ---------------- ARMAZENAMENTO (buffer circular em disco) ---------------- #
+
+def _write_atomic(path, write):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def save(profiler, meta):
+    """Grava o perfil e apaga os mais antigos além de MAX_PROFILES. Devolve o id."""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    # o id começa pelo tempo em ms: ordem alfabética = ordem de chegada
+    profile_id = f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+    _write_atomic(directory / f"{profile_id}.prof", lambda tmp: profiler.dump_stats(str(tmp)))
+    _write_atomic(
+        directory / f"{profile_id}.json",
+        lambda tmp: tmp.write_text(json.dumps({"id": profile_id, **meta}), encoding="utf-8"),
+    )
+
+    ids = sorted(p.stem for p in directory.glob("*.json"))
+    for old in ids[: max(0, len(ids) - _config().get("MAX_PROFILES", 200))]:
+        for suffix in (".json", ".prof"):
+            try:
+                (directory / f"{old}{suffix}").unlink()
+            except FileNotFoundError:  # outro worker apagou primeiro
+                pass
+    return profile_id
+
+
+def list_profiles():
+    """Metadados dos perfis guardados, do mais novo para o mais antigo."""
+    result = []
+    for path in sorted(profile_dir().glob("*.json"), reverse=True):
+        try:
+            result.append(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):  # apagado/meio escrito no caminho
+            continue
+    return result
+
+
+def profile_path(profile_id):
+    """Caminho do .prof, ou None se o id não existe (ou não tem o formato: nada de ../)."""
+    if not _ID.match(profile_id or ""):
+        return None
+    path = profile_dir() / f"{profile_id}.prof"
+    return path if path.exists() else None
+
+
+def load_meta(profile_id):
+    path = profile_path(profile_id)
+    if path is None:
+        return None
+    try:
+        return json.loads(path.with_suffix(".json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def report(profile_id, sort="cumulative", limit=60):
+    """Texto do pstats (as `limit` funções mais caras por `sort`), ou None."""
+    path = profile_path(profile_id)
+    if path is None:
+        return None
+    stream = io.StringIO()
+    stats = pstats.Stats(str(path), stream=stream)
+    stats.strip_dirs().sort_stats(sort if sort in SORTS else "cumulative").print_stats(limit)
+    return stream.getvalue()
+
+
+# ---------------- MIDDLEWARE ---------------- #
+
+def _reason(request):
+    """("token", pk) / ("sample", None) se esta requisição deve ser perfilada, senão None."""
+    # META direto: request.headers/request.GET montam objetos a cada requisição
+    token = request.META.get(_META_HEADER)
+    if not token and QUERY_PARAM in request.META.get("QUERY_STRING", ""):
+        token = request.GET.get(QUERY_PARAM)
+    if token:
+        user_id = check_token(token)
+        if user_id is not None:
+            return "token", user_id
+    rate = _config().get("SAMPLE_RATE", 0)
+    if rate and random.randrange(rate) == 0:
+        return "sample", None
+    return None
+
+
+class ProfilerMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        reason = _reason(request)
+        if reason is None:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        try:
+            save(profiler, {
+                "created_at": timezone.now().isoformat(),
+                "method": request.method,
+                "path": request.path,
+                "route": match.view_name if match else "",
+                "status": response.status_code,
+                "duration_ms": round(elapsed * 1000, 2),
+                "reason": reason[0],
+                "user_id": reason[1],
+                "pid": os.getpid(),
+            })
+        except OSError:
+            logger.exception("profiler: não deu para gravar o perfil de %s", request.path)
+        return response
@@ -0,0 +1,343 @@
+# core/utils/rate_limit.py
+"""
+Rate limit das rotas públicas, atômico e compartilhado entre processos.
+
+Regras por rota em settings.RATE_LIMITS:
+
+    RATE_LIMITS = {
+        "form_doar": {"algorithm": "sliding_window", "limit": 5, "period": 300, "keys": ["ip"]},
+        "form_phone": {"algorithm": "token_bucket", "limit": 5, "period": 3600, "keys": ["phone"]},
+    }
+
+  sliding_window  no máximo `limit` requisições em qualquer janela de
+                  `period` segundos (contador deslizante: janela atual +
+                  fração da anterior, dois números por chave).
+  token_bucket    rajada de até `burst` (padrão: limit), repostas à taxa
+                  de `limit` por `period`.
+  keys            "ip" (REMOTE_ADDR) e/ou "phone" (campo whatsapp do POST,
+                  canônico); cada chave tem o seu contador.
+  methods         métodos HTTP limitados (padrão: só POST).
+
+Os contadores ficam em settings.RATE_LIMIT_STORE (BACKEND/OPTIONS, como o
+WHATSAPP_SENDER):
+  SQLiteStore   arquivo SQLite próprio (não o banco do app); cada decisão é
+                um BEGIN IMMEDIATE, então vale entre processos sem Redis.
+  RedisStore    Redis ou compatível (WATCH/MULTI); precisa do pacote redis.
+  MemoryStore   só dentro do processo (dev).
+
+Na view: @rate_limit("form_doar", "form_phone") -> 429 com Retry-After.
+Se o store falhar, a requisição passa (e o erro vai para o log).
+"""
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+from core.utils import metrics
+from core.utils.phone import normalize_phone
+
+logger = logging.getLogger(__name__)
+
+BLOCKED_MESSAGE = "Muitas tentativas. Aguarde alguns minutos e tente novamente."
+
+
+@dataclass(frozen=True)
+class Decision:
+    allowed: bool
+    retry_after: float = 0.0  # segundos até a próxima requisição passar
+    remaining: int = 0
+
+
+# ---------------- ALGORITMOS ---------------- #
+# step(estado, agora) -> (novo estado, Decision). O estado é uma tupla de
+# floats; None = chave nova ou expirada.
+
+class SlidingWindow:
+    def __init__(self, limit, period):
+        self.limit = limit
+        self.period = period
+        self.ttl = 2 * period
+
+    def step(self, state, now):
+        start = now - now % self.period
+        prev = curr = 0.0
+        if state is not None:
+            last_start, last_prev, last_curr = state
+            if last_start == start:
+                prev, curr = last_prev, last_curr
+            elif last_start == start - self.period:
+                prev = last_curr
+
+        elapsed = now - start
+        estimate = prev * (1 - elapsed / self.period) + curr
+        if estimate + 1 <= self.limit:
+            return (start, prev, curr + 1), Decision(True, 0.0, int(self.limit - estimate - 1))
+
+        if curr < self.limit:
+            # a parte da janela anterior ainda pesa: espera ela escorrer
+            wait = self.period * (1 - (self.limit - 1 - curr) / prev) - elapsed
+        else:
+            # a janela atual já lotou: espera a próxima, com a atual como "anterior"
+            wait = self.period - elapsed + self.period * (1 - (self.limit - 1) / curr)
+        return (start, prev, curr), Decision(False, max(wait, 0.0))
+
+
+class TokenBucket:
+    def __init__(self, limit, period, burst=None):
+        self.rate = limit / period
+        self.capacity = burst or limit
+        self.ttl = self.capacity / self.rate
+
+    def step(self, state, now):
+        tokens, last = state if state is not None else (self.capacity, now)
+        tokens = min(self.capacity, tokens + (now - last) * self.rate)
+        if tokens >= 1:
+            return (tokens - 1, now), Decision(True, 0.0, int(tokens - 1))
+        return (tokens, now), Decision(False, (1 - tokens) / self.rate)
+
+
+ALGORITHMS = {"sliding_window": SlidingWindow, "token_bucket": TokenBucket}
+
+
+def _dump(state):
+    return ",".join(repr(float(v)) for v in state)
+
+
+def _load(raw):
+    return tuple(float(v) for v in raw.split(","))
+
+
+# ---------------- STORES ---------------- #
+
+class BaseStore:
+    def apply(self, key, algorithm, now=None) -> Decision:
+        """Lê o estado de `key`, aplica o algoritmo e grava, tudo atômico."""
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryStore(BaseStore):
+    """Contadores no processo: cada worker do gunicorn teria os seus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def apply(self, key, algorithm, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            state, expires = self._data.get(key, (None, 0.0))
+            new, decision = algorithm.step(state if expires > now else None, now)
+            self._data[key] = (new, now + algorithm.ttl)
+        return decision
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteStore(BaseStore):
+    """
+    Uma linha por chave num arquivo SQLite separado (WAL). BEGIN IMMEDIATE
+    pega o lock de escrita antes de ler: duas requisições da mesma chave,
+    de processos diferentes, nunca leem o mesmo estado.
+    Linhas vencidas são apagadas a cada `cleanup_every` decisões.
+    """
+
+    def __init__(self, path, timeout=5.0, cleanup_every=1000):
+        self.path = str(path)
+        self.timeout = timeout
+        self.cleanup_every = cleanup_every
+        self._local = threading.local()
+        self._ops = 0
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():  # conexão herdada de um fork não serve
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit ("
+                " key TEXT PRIMARY KEY, state TEXT NOT NULL, expires REAL NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
+
+    def apply(self, key, algorithm, now=None):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time() if now is None else now  # depois do lock: o relógio anda junto com a fila
+            row = conn.execute("SELECT state, expires FROM rate_limit WHERE key = ?", (key,)).fetchone()
+            state = _load(row[0]) if row and row[1] > now else None
+            new, decision = algorithm.step(state, now)
+            if new != state:
+                conn.execute(
+                    "INSERT INTO rate_limit (key, state, expires) VALUES (?, ?, ?)"
+                    " ON CONFLICT(key) DO UPDATE SET state = excluded.state, expires = excluded.expires",
+                    (key, _dump(new), now + algorithm.ttl),
+                )
+            self._ops += 1
+            if self._ops % self.cleanup_every == 0:
+                conn.execute("DELETE FROM rate_limit WHERE expires < ?", (now,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return decision
+
+    def clear(self):
+        self._connection().execute("DELETE FROM rate_limit")
+
+
+class RedisStore(BaseStore):
+    """
+    Uma chave por contador, com expiração. O ciclo ler-calcular-gravar roda
+    em WATCH/MULTI: se outro processo mexer na chave no meio, refaz.
+    """
+
+    def __init__(self, url="redis://localhost:6379/0", prefix="ratelimit:"):
+        try:
+            import redis
+        except ImportError as exc:
+            raise ImproperlyConfigured("RedisStore precisa do pacote redis (pip install redis).") from exc
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def apply(self, key, algorithm, now=None):
+        name = self.prefix + key
+        decisions = []
+
+        def transaction(pipe):
+            raw = pipe.get(name)
+            current = time.time() if now is None else now
+            new, decision = algorithm.step(_load(raw.decode()) if raw else None, current)
+            pipe.multi()
+            pipe.set(name, _dump(new), px=max(1, math.ceil(algorithm.ttl * 1000)))
+            decisions.append(decision)
+
+        self.client.transaction(transaction, name)
+        return decisions[-1]
+
+    def clear(self):
+        for name in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(name)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store() -> BaseStore:
+    """Store de settings.RATE_LIMIT_STORE (um por configuração, por processo)."""
+    config = getattr(settings, "RATE_LIMIT_STORE", {})
+    cache_key = repr(config)
+    store = _stores.get(cache_key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(cache_key)
+            if store is None:
+                backend = import_string(config.get("BACKEND", "core.utils.rate_limit.MemoryStore"))
+                store = _stores[cache_key] = backend(**config.get("OPTIONS", {}))
+    return store
+
+
+# ---------------- REGRAS ---------------- #
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    algorithm: object
+    keys: tuple
+    methods: tuple
+
+
+_rules = {}
+
+
+def get_rule(name) -> Rule:
+    config = getattr(settings, "RATE_LIMITS", {}).get(name)
+    if config is None:
+        raise ImproperlyConfigured(f"Regra de rate limit {name!r} não está em settings.RATE_LIMITS.")
+    cached = _rules.get(name)
+    if cached is not None and cached[0] == config:
+        return cached[1]
+
+    options = {k: v for k, v in config.items() if k not in ("algorithm", "keys", "methods")}
+    try:
+        algorithm = ALGORITHMS[config.get("algorithm", "sliding_window")](**options)
+    except (KeyError, TypeError) as exc:
+        raise ImproperlyConfigured(f"Regra de rate limit {name!r} inválida: {exc}") from exc
+    rule = Rule(
+        name=name,
+        algorithm=algorithm,
+        keys=tuple(config.get("keys", ("ip",))),
+        methods=tuple(m.upper() for m in config.get("methods", ("POST",))),
+    )
+    _rules[name] = (dict(config), rule)
+    return rule
+
+
+def request_keys(request, names):
+    """[(tipo, valor)] das chaves pedidas; telefone inválido/ausente não conta."""
+    keys = []
+    for name in names:
+        if name == "ip":
+            keys.append(("ip", request.META.get("REMOTE_ADDR", "unknown")))
+        elif name == "phone":
+            phone = normalize_phone(request.POST.get("whatsapp"))
+            if phone:
+                keys.append(("phone", phone))
+        else:
+            raise ImproperlyConfigured(f"Chave de rate limit desconhecida: {name!r} (use ip ou phone).")
+    return keys
+
+
+def check(request, *rule_names) -> Decision:
+    """Consome uma requisição de cada regra/chave; bloqueia se alguma estourar."""
+    store = get_store()
+    blocked = []
+    for rule in map(get_rule, rule_names):
+        if request.method not in rule.methods:
+            continue
+        for kind, value in request_keys(request, rule.keys):
+            try:
+                decision = store.apply(f"{rule.name}:{kind}:{value}", rule.algorithm)
+            except Exception:
+                logger.exception("rate limit indisponível (%s); requisição liberada", rule.name)
+                metrics.inc("rate_limit_errors_total", rule=rule.name)
+                continue
+            if not decision.allowed:
+                blocked.append(decision)
+                metrics.inc("rate_limit_rejections_total", rule=rule.name, key=kind)
+    if blocked:
+        return Decision(False, max(d.retry_after for d in blocked))
+    return Decision(True)
+
+
+def rate_limit(*rule_names):
+    """Decorator de view: 429 + Retry-After quando alguma das regras bloquear."""
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            decision = check(request, *rule_names)
+            if not decision.allowed:
+                response = HttpResponse(BLOCKED_MESSAGE, status=429)
+                response["Retry-After"] = str(max(1, math.ceil(decision.retry_after)))
+                return response
+            return view_func(request, *args, **kwargs)
+        return _wrapped
+    return decorator
@@ -0,0 +1,206 @@
+# core/utils/two_tier_cache.py
+"""
+Cache em duas camadas: LRU na memória do processo na frente de um cache
+compartilhado entre os workers (FileBasedCache, DatabaseCache, Redis...).
+
+    CACHES = {
+        "default": {
+            "BACKEND": "core.utils.two_tier_cache.TwoTierCache",
+            "LOCATION": "coracao-solidario",
+            "OPTIONS": {"SHARED": "shared", "LOCAL_MAX_ENTRIES": 5000, "LOCAL_TIMEOUT": 60},
+        },
+        "shared": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": "..."},
+    }
+
+Leitura: memória do processo; se não tiver (ou venceu), o compartilhado, e
+o valor fica na memória por até LOCAL_TIMEOUT segundos. Escrita: vai para o
+compartilhado e para a memória deste processo. incr/decr/add/delete
+decidem no compartilhado.
+
+Os outros workers não ficam sabendo de um set/delete: a memória deles só
+vence pelo tempo. Por isso o jeito de invalidar entre workers é por chave
+de versão: os dados vão em chaves que levam a versão (versioned_key) e
+nunca mudam de conteúdo; invalidar é trocar a versão (bump_version).
+Chaves terminadas em ":version" (VOLATILE_SUFFIXES) ficam na memória só
+VOLATILE_TIMEOUT segundos (padrão 1): uma troca de versão chega a todos os
+workers nesse prazo, e o resto continua sendo lido da memória.
+"""
+import pickle
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.functional import cached_property
+
+# como no LocMemCache: o django cria um backend por thread, a memória é do processo
+_locals = {}
+_locks = {}
+_stats = {}
+
+_MISSING = object()
+
+
+class TwoTierCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._shared_alias = options.get("SHARED", "shared")
+        self._max_entries = int(options.get("LOCAL_MAX_ENTRIES", 5000))
+        self._local_timeout = float(options.get("LOCAL_TIMEOUT", 60))
+        self._volatile_timeout = float(options.get("VOLATILE_TIMEOUT", 1))
+        self._volatile_suffixes = tuple(options.get("VOLATILE_SUFFIXES", (":version",)))
+        self._local = _locals.setdefault(name, OrderedDict())
+        self._lock = _locks.setdefault(name, threading.Lock())
+        self._stats = _stats.setdefault(name, Counter())
+
+    @cached_property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    # ---------------- memória do processo ---------------- #
+
+    def _ttl(self, key, timeout=DEFAULT_TIMEOUT):
+        ttl = self._volatile_timeout if key.endswith(self._volatile_suffixes) else self._local_timeout
+        expires = self.get_backend_timeout(timeout)
+        if expires is not None:
+            ttl = min(ttl, expires - time.time())
+        return ttl
+
+    def _remember(self, local_key, value, ttl, negative=False):
+        if ttl <= 0:
+            self._forget(local_key)
+            return
+        data = None if negative else pickle.dumps(value, self.pickle_protocol)
+        with self._lock:
+            self._local[local_key] = (time.monotonic() + ttl, data)
+            self._local.move_to_end(local_key)
+            while len(self._local) > self._max_entries:
+                self._local.popitem(last=False)
+                self._stats["local_evictions"] += 1
+
+    def _forget(self, local_key):
+        with self._lock:
+            self._local.pop(local_key, None)
+
+    def _recall(self, local_key):
+        """(achou, valor); valor _MISSING = ausência guardada (chave de versão)."""
+        with self._lock:
+            entry = self._local.get(local_key)
+            if entry is None:
+                return False, None
+            if entry[0] <= time.monotonic():
+                del self._local[local_key]
+                return False, None
+            self._local.move_to_end(local_key)
+            self._stats["local_hits"] += 1
+        return True, _MISSING if entry[1] is None else pickle.loads(entry[1])
+
+    # ---------------- API do cache ---------------- #
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        found, value = self._recall(local_key)
+        if found:
+            return default if value is _MISSING else value
+
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            with self._lock:
+                self._stats["misses"] += 1
+            if key.endswith(self._volatile_suffixes):
+                self._remember(local_key, None, self._volatile_timeout, negative=True)
+            return default
+        with self._lock:
+            self._stats["shared_hits"] += 1
+        self._remember(local_key, value, self._ttl(key))
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self.shared.set(key, value, timeout=timeout, version=version)
+        self._remember(local_key, value, self._ttl(key, timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        if self.shared.add(key, value, timeout=timeout, version=version):
+            self._remember(local_key, value, self._ttl(key, timeout))
+            return True
+        self._forget(local_key)  # já existe lá: a próxima leitura busca o valor de verdade
+        return False
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._forget(self.make_and_validate_key(key, version=version))
+        return self.shared.touch(key, timeout=timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._forget(self.make_and_validate_key(key, version=version))
+        return self.shared.delete(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._forget(self.make_and_validate_key(key, version=version))
+        return self.shared.incr(key, delta, version=version)
+
+    def has_key(self, key, version=None):
+        found, value = self._recall(self.make_and_validate_key(key, version=version))
+        if found:
+            return value is not _MISSING
+        return self.shared.has_key(key, version=version)
+
+    def clear(self):
+        """Limpa a memória deste processo e o compartilhado (os outros workers esperam o LOCAL_TIMEOUT)."""
+        with self._lock:
+            self._local.clear()
+        self.shared.clear()
+
+    def stats(self):
+        """Acertos na memória, no compartilhado, erros e despejos do LRU (deste processo)."""
+        with self._lock:
+            return {**dict.fromkeys(("local_hits", "shared_hits", "misses", "local_evictions"), 0), **self._stats}
+
+
+def all_stats():
+    """stats() de todos os TwoTierCache deste processo, por LOCATION."""
+    result = {}
+    for name, counter in list(_stats.items()):
+        with _locks[name]:
+            result[name] = dict(counter)
+    return result
+
+
+# ---------------- CHAVES DE VERSÃO ---------------- #
+
+def version_key(namespace):
+    return f"{namespace}:version"
+
+
+def get_version(namespace, create=True, using=None):
+    """Versão atual do namespace (criada na primeira leitura, ou None com create=False)."""
+    backend = caches[using] if using else cache
+    key = version_key(namespace)
+    version = backend.get(key)
+    if version is None and create:
+        backend.add(key, uuid.uuid4().hex[:12], timeout=None)
+        version = backend.get(key)
+    return version
+
+
+def bump_version(namespace, using=None):
+    """Invalida tudo o que foi guardado com versioned_key(namespace, ...)."""
+    backend = caches[using] if using else cache
+    backend.set(version_key(namespace), uuid.uuid4().hex[:12], timeout=None)
+
+
+def versioned_key(namespace, *parts, create=True, using=None):
+    """
+    Chave de dados na versão atual; None se o namespace ainda não tem versão
+    e create=False. `using`: alias do cache das versões (padrão: "default").
+    """
+    version = get_version(namespace, create, using)
+    if version is None:
+        return None
+    return ":".join([namespace, version, *map(str, parts)])
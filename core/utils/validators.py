@@ -1,30 +1,58 @@
 # core/utils/validators.py
 import re
 
-BAD_WORDS = {
-    "puta", "viado", "bicha", "arrombado", "caralho", "porra", "desgraça",
-    "idiota", "retardado", "macaco", "nazista", "estupro", "matar", "suicida", "biscate", "lixo" 
+from core.utils import content_filter
+from core.utils.phone import national, normalize_phone
+
+# palavra (já sem acento/minúscula) -> parte do kit; "kit", "de"... são ignoradas
+_KIT_WORDS = {
+    "basico": "basico", "basic": "basico",
+    "completo": "completo", "complete": "completo",
+    "alergia": "alergia", "alergica": "alergia", "alergico": "alergia", "allergy": "alergia",
+}
+_KIT_IGNORED = {"kit", "de", "para", "p"}
+# (completo?, alergia?) -> chave de Donor.KIT_CHOICES
+_KIT_KEYS = {
+    (False, False): "BASICO",
+    (True, False): "COMPLETO",
+    (False, True): "ALERGIA",
+    (True, True): "COMPLETO_ALERGIA",
 }
 
 def normalize_phone_br(raw: str) -> str:
     """
     Aceita: (15) 99123-4567, +55 15 991234567, 15991234567...
-    Retorna somente dígitos com DDI opcional removido e valida tamanho BR (10 ou 11).
+    Retorna DDD + número (10 ou 11 dígitos), sem o 55. Vazio se inválido.
+    A forma canônica (E.164) é core.utils.phone.normalize_phone.
     """
-    if not raw:
-        return ""
-    digits = re.sub(r"\D", "", raw)
+    return national(normalize_phone(raw))
 
-    # remove +55 se vier
-    if digits.startswith("55") and len(digits) in (12, 13):
-        digits = digits[2:]
-
-    # BR: 10 (fixo) ou 11 (celular com 9)
-    if len(digits) not in (10, 11):
+def normalize_kit(raw: str) -> str:
+    """
+    Tipo de kit em qualquer grafia -> chave de Donor.KIT_CHOICES; vazio se não reconhecer.
+    "Basico", "Kit Básico", "BASICO" -> BASICO; "Basico Alergica", "alergia" -> ALERGIA;
+    "Completo", "KIT_COMPLETO" -> COMPLETO; "Completo Alergia", "complete_allergy" -> COMPLETO_ALERGIA.
+    Formulários e importação usam esta mesma função: a fila (QueueEntry) só pareia kits iguais.
+    """
+    words = set(re.split(r"[^a-z]+", content_filter.fold(raw or ""))) - _KIT_IGNORED - {""}
+    parts = {_KIT_WORDS.get(word) for word in words}
+    if not parts or None in parts or {"basico", "completo"} <= parts:
         return ""
-
-    return digits
+    return _KIT_KEYS[("completo" in parts, "alergia" in parts)]
 
 def contains_bad_words(*fields: str) -> bool:
-    text = " ".join([f or "" for f in fields]).lower()
-    return any(w in text for w in BAD_WORDS)
+    return content_filter.contains_bad_words(*fields)
+
+def clean_text(raw: str, max_len: int = 120) -> str:
+    """
+    Sanitização simples (MVP):
+    - remove HTML (sem usar strip_tags pra manter mínimo)
+    - normaliza espaços
+    - limita tamanho
+    """
+    if not raw:
+        return ""
+    txt = str(raw)
+    txt = re.sub(r"<[^>]*?>", "", txt)      # remove tags simples
+    txt = re.sub(r"\s+", " ", txt).strip()  # normaliza espaços
+    return txt[:max_len]
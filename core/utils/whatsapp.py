@@ -1,10 +1,178 @@
-def send_whatsapp_message(phone: str, message: str) -> bool:
+"""
+Envio de WhatsApp com backend configurável em settings.WHATSAPP_SENDER:
+
+    WHATSAPP_SENDER = {
+        "BACKEND": "core.utils.whatsapp.HttpSender",
+        "OPTIONS": {"url": "https://provedor/api/messages", "token": "...", "concurrency": 16},
+    }
+
+Backends:
+  - MockSender: só imprime (padrão, fase manual).
+  - JsonlFileSender: grava uma linha JSON por mensagem num arquivo.
+  - HttpSender: POST JSON num provedor HTTP, com pool de conexões
+    keep-alive e envio em paralelo limitado.
+
+send(phone, message) -> bool: True entregue, False recusada pelo provedor
+(não adianta tentar de novo). Falhas transitórias levantam exceção.
+"""
+import http.client
+import json
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+class BaseSender:
+    concurrency = 1
+
+    def send(self, phone: str, message: str) -> bool:
+        raise NotImplementedError
+
+    def _send_captured(self, item):
+        phone, message = item
+        try:
+            return self.send(phone, message)
+        except Exception as exc:
+            return exc
+
+    def send_many(self, items, max_workers=None):
+        """
+        Envia [(phone, message), ...] e devolve, na mesma ordem, True/False
+        ou a exceção de cada envio. Usa até max_workers (padrão: concurrency)
+        envios simultâneos.
+        """
+        items = list(items)
+        workers = max_workers or self.concurrency
+        if workers <= 1 or len(items) <= 1:
+            return [self._send_captured(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+            return list(pool.map(self._send_captured, items))
+
+
+class MockSender(BaseSender):
     """
     Envio SIMULADO de WhatsApp.
-    Aqui depois você troca por API real.
     """
-    print("📲 Enviando WhatsApp...")
-    print(f"Telefone: {phone}")
-    print(f"Mensagem: {message}")
-    print("✅ WhatsApp enviado (simulado)")
-    return True
+
+    def send(self, phone: str, message: str) -> bool:
+        print("📲 Enviando WhatsApp...")
+        print(f"Telefone: {phone}")
+        print(f"Mensagem: {message}")
+        print("✅ WhatsApp enviado (simulado)")
+        return True
+
+
+class JsonlFileSender(BaseSender):
+    """Acrescenta {"phone", "message", "sent_at"} por linha em `path`."""
+
+    def __init__(self, path, concurrency=1):
+        self.path = path
+        self.concurrency = concurrency
+        self._lock = threading.Lock()
+
+    def send(self, phone: str, message: str) -> bool:
+        line = json.dumps(
+            {"phone": phone, "message": message, "sent_at": timezone.now().isoformat()},
+            ensure_ascii=False,
+        )
+        with self._lock, open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+        return True
+
+
+class HttpSender(BaseSender):
+    """
+    POST {"to": phone, "text": message} em `url`.
+
+    As conexões HTTP/1.1 ficam num pool (até `pool_size`) e são reusadas
+    entre envios, sem handshake TCP/TLS por mensagem. send_many envia até
+    `concurrency` mensagens ao mesmo tempo.
+    2xx = entregue, 4xx = recusada, 5xx/erro de rede = exceção (tentar de novo).
+    """
+
+    def __init__(self, url, token="", timeout=10, concurrency=8, pool_size=None):
+        parts = urlsplit(url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path or "/"
+        if parts.query:
+            self.path += "?" + parts.query
+        self.token = token
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self._pool = queue.LifoQueue(maxsize=pool_size or concurrency)
+
+    def _new_connection(self):
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self._new_connection()
+
+    def _release(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _post(self, conn, body, headers):
+        conn.request("POST", self.path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()  # esvazia a resposta para a conexão poder ser reusada
+        return response
+
+    def send(self, phone: str, message: str) -> bool:
+        body = json.dumps({"to": phone, "text": message}).encode()
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+
+        conn = self._acquire()
+        try:
+            try:
+                response = self._post(conn, body, headers)
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # conexão keep-alive fechada pelo servidor enquanto estava no pool
+                conn.close()
+                conn = self._new_connection()
+                response = self._post(conn, body, headers)
+        except Exception:
+            conn.close()
+            raise
+
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+
+        if response.status >= 500:
+            raise ConnectionError(f"Provedor respondeu {response.status}")
+        return 200 <= response.status < 300
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+@lru_cache(maxsize=None)
+def get_sender():
+    config = getattr(settings, "WHATSAPP_SENDER", {})
+    backend = import_string(config.get("BACKEND", "core.utils.whatsapp.MockSender"))
+    return backend(**config.get("OPTIONS", {}))
+
+
+def send_whatsapp_message(phone: str, message: str) -> bool:
+    return get_sender().send(phone, message)
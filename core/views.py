@@ -1,105 +1,82 @@
 # core/views.py
-import re
-
-from django.core.cache import cache
-from django.http import HttpResponse
+import base64
+import csv
+import hashlib
+import hmac
+import io
+import json
+from datetime import datetime
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import IntegrityError
+from django.db.models import Count, Max, OuterRef, Q, Subquery, Sum
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, StreamingHttpResponse,
+)
 from django.shortcuts import render, redirect
-from django.views.decorators.http import require_http_methods
+from django.utils import timezone
+from django.views.decorators.http import condition, require_GET, require_http_methods
 from django.contrib import messages
 from .permissions import role_required
 
-from .models import Donor, Match, Receiver, ReferencePost
-from .utils.validators import normalize_phone_br, contains_bad_words
-
-
-# ---------------- UTILIDADES ---------------- #
-
-def donor_has_open_match(donor: Donor) -> bool:
-    return Match.objects.filter(donor=donor, is_completed=False).exists()
-
-
-def receiver_has_open_match(receiver: Receiver) -> bool:
-    return Match.objects.filter(receiver=receiver, is_completed=False).exists()
-
-
-def rate_limit_or_429(request, key_prefix: str, limit: int = 5, window_sec: int = 300) -> bool:
-    """
-    True = BLOQUEAR (excedeu limite)
-    False = OK
-    """
-    ip = request.META.get("REMOTE_ADDR", "unknown")
-    key = f"{key_prefix}:{ip}"
-    current = cache.get(key, 0)
-
-    if current >= limit:
-        return True
-
-    if current == 0:
-        cache.set(key, 1, timeout=window_sec)
-    else:
-        try:
-            cache.incr(key)
-        except Exception:
-            cache.set(key, int(current) + 1, timeout=window_sec)
-
-    return False
-
-
-def clean_text(raw: str, max_len: int = 120) -> str:
-    """
-    Sanitização simples (MVP):
-    - remove HTML (sem usar strip_tags pra manter mínimo)
-    - normaliza espaços
-    - limita tamanho
-    """
-    if not raw:
-        return ""
-    txt = str(raw)
-    txt = re.sub(r"<[^>]*?>", "", txt)      # remove tags simples
-    txt = re.sub(r"\s+", " ", txt).strip()  # normaliza espaços
-    return txt[:max_len]
+from .db import write_atomic
+from .models import Donor, Match, Outbox, Receiver
+from .services import match_service, pickup, reports
+from .services.post_catalogue import get_catalogue
+from .services.match_notify import build_match_message
+from .utils import metrics, profiler
+from .utils.page_cache import cached_fragment, render_cached
+from .utils.phone import national, normalize_phone
+from .utils.rate_limit import rate_limit
+from .utils.validators import clean_text, contains_bad_words, normalize_kit
 
 
 # ---------------- HOME ---------------- #
 
 def home(request):
-    return render(request, "core/home.html")
+    return render_cached(request, "home", "core/home.html")
 
 
 # ---------------- TELA OBRIGADA (reutilizável) ---------------- #
 
 def obrigada(request):
-    return render(request, "core/obrigada.html")
+    # as mensagens (código de retirada) são da pessoa: ficam fora do cache
+    return render_cached(request, "obrigada", "core/obrigada.html", holes={"messages_html": "core/_messages.html"})
+
+
+def _post_select():
+    """<select> dos postos, em cache até o catálogo mudar (também nos re-renders com erro)."""
+    return cached_fragment(
+        "post_select", "core/_post_select.html", lambda: {"reference_posts": get_catalogue().posts}
+    )
 
 
 # ---------------- DOAR ---------------- #
 
 @require_http_methods(["GET", "POST"])
+@rate_limit("form_doar", "form_phone")
 def doar(request):
-    reference_posts = ReferencePost.objects.filter(
-        can_receive_donations=True,
-        public=True
-    ).order_by("city", "name")
-
     if request.method == "POST":
-        if rate_limit_or_429(request, "form_doar", limit=5, window_sec=300):
-            return HttpResponse(
-                "Muitas tentativas. Aguarde alguns minutos e tente novamente.",
-                status=429
-            )
+        catalogue = get_catalogue()
 
         # captura + sanitização
         name = clean_text(request.POST.get("name"), max_len=80)
         whatsapp_raw = clean_text(request.POST.get("whatsapp"), max_len=30)
-        whatsapp = normalize_phone_br(whatsapp_raw)
+        whatsapp_e164 = normalize_phone(whatsapp_raw)
+        whatsapp = national(whatsapp_e164)
 
-        kit_type = clean_text(
+        kit_raw = clean_text(
             request.POST.get("preferred_kit")
             or request.POST.get("kit_type")
             or request.POST.get("kit")
             or "",
             max_len=40
         )
+        kit_type = normalize_kit(kit_raw)
 
         reference_post_id = (
             request.POST.get("reference_post")
@@ -113,67 +90,54 @@ def doar(request):
             errors.append("Nome é obrigatório.")
         if not whatsapp:
             errors.append("WhatsApp inválido. Ex: (15) 99123-4567")
-        if not kit_type:
+        if not kit_raw:
             errors.append("Selecione o tipo de kit.")
+        elif not kit_type:
+            errors.append("Tipo de kit inválido.")
         if not reference_post_id:
             errors.append("Selecione o posto de referência.")
 
-        if contains_bad_words(name, kit_type, whatsapp_raw):
+        if contains_bad_words(name, kit_raw, whatsapp_raw):
             errors.append("Por segurança, revise o texto informado.")
 
-        if whatsapp and Donor.objects.filter(whatsapp=whatsapp, active=True).exists():
+        if whatsapp_e164 and Donor.objects.filter(whatsapp_e164=whatsapp_e164, active=True).exists():
             errors.append("Este WhatsApp já está cadastrado como doador.")
 
-        reference_post = None
-        if reference_post_id:
-            reference_post = ReferencePost.objects.filter(id=reference_post_id).first()
-            if not reference_post:
-                errors.append("Posto de referência inválido.")
+        reference_post = catalogue.get(reference_post_id)
+        if reference_post_id and not reference_post:
+            errors.append("Posto de referência inválido.")
 
         if errors:
             return render(
                 request,
                 "core/doar.html",
-                {"reference_posts": reference_posts, "errors": errors, "form": request.POST},
+                {"post_select": _post_select(), "errors": errors, "form": request.POST},
             )
 
-        donor = Donor.objects.create(
-            name=name,
-            whatsapp=whatsapp,
-            kit_type=kit_type,
-            active=True,
-        )
-
-        # se por algum motivo ele já tem match em aberto
-        if donor_has_open_match(donor):
-            messages.info(
+        try:
+            # cadastro + fila/match numa transação só: se o pareamento falhar, o
+            # cadastro é desfeito junto e a pessoa pode tentar de novo
+            with write_atomic():
+                donor = Donor.objects.create(
+                    name=name,
+                    whatsapp=whatsapp,
+                    kit_type=kit_type,
+                    active=True,
+                )
+                match = match_service.match_donor(donor, reference_post.id)
+        except IntegrityError:
+            # outro POST com o mesmo WhatsApp ganhou a corrida (índice único parcial)
+            return render(
                 request,
-                "💛 Doação já registrada: você já possui uma doação em andamento. Assim que ela for concluída, poderá doar novamente."
-            )
-            return redirect("obrigada")
-
-        receiver = (
-            Receiver.objects
-            .filter(
-                active=True,
-                needed_kit=donor.kit_type,
-                reference_post=reference_post,
-            )
-            .exclude(
-                id__in=Match.objects.filter(is_completed=False)
-                .values_list("receiver_id", flat=True)
-            )
-            .order_by("created_at")
-            .first()
-        )
-
-        if receiver:
-            match = Match.objects.create(
-                donor=donor,
-                receiver=receiver,
-                reference_post=reference_post,
+                "core/doar.html",
+                {
+                    "post_select": _post_select(),
+                    "errors": ["Este WhatsApp já está cadastrado como doador."],
+                    "form": request.POST,
+                },
             )
 
+        if match:
             # ✅ Notificação (Caixa B)
             messages.success(
                 request,
@@ -188,39 +152,33 @@ def doar(request):
         )
         return redirect("obrigada")
 
-    return render(request, "core/doar.html", {"reference_posts": reference_posts})
+    return render_cached(request, "doar", "core/doar.html", lambda: {"post_select": _post_select()})
 
 
 # ---------------- RECEBER ---------------- #
 
 @require_http_methods(["GET", "POST"])
+@rate_limit("form_receber", "form_phone")
 def receber(request):
-    reference_posts = ReferencePost.objects.filter(
-        can_receive_donations=True,
-        public=True
-    ).order_by("city", "name")
-
     if request.method == "POST":
-        if rate_limit_or_429(request, "form_receber", limit=5, window_sec=300):
-            return HttpResponse(
-                "Muitas tentativas. Aguarde alguns minutos e tente novamente.",
-                status=429
-            )
+        catalogue = get_catalogue()
 
         name = clean_text(request.POST.get("name"), max_len=80)
         whatsapp_raw = clean_text(request.POST.get("whatsapp"), max_len=30)
-        whatsapp = normalize_phone_br(whatsapp_raw)
+        whatsapp_e164 = normalize_phone(whatsapp_raw)
+        whatsapp = national(whatsapp_e164)
 
         city = clean_text(request.POST.get("city"), max_len=40)
         neighborhood = clean_text(request.POST.get("neighborhood"), max_len=60)
 
-        needed_kit = clean_text(
+        kit_raw = clean_text(
             request.POST.get("needed_kit")
             or request.POST.get("kit_type")
             or request.POST.get("kit")
             or "",
             max_len=40
         )
+        needed_kit = normalize_kit(kit_raw)
 
         reference_post_id = (
             request.POST.get("reference_post")
@@ -237,39 +195,61 @@ def receber(request):
             errors.append("Cidade é obrigatória.")
         if not neighborhood:
             errors.append("Bairro é obrigatório.")
-        if not needed_kit:
+        if not kit_raw:
             errors.append("Selecione o tipo de kit.")
+        elif not needed_kit:
+            errors.append("Tipo de kit inválido.")
         if not reference_post_id:
             errors.append("Selecione o posto de referência.")
 
-        if contains_bad_words(name, needed_kit, whatsapp_raw):
+        if contains_bad_words(name, kit_raw, whatsapp_raw):
             errors.append("Por segurança, revise o texto informado.")
 
-        if whatsapp and Receiver.objects.filter(whatsapp=whatsapp, active=True).exists():
+        if whatsapp_e164 and Receiver.objects.filter(whatsapp_e164=whatsapp_e164, active=True).exists():
             errors.append("Este WhatsApp já está cadastrado como receptora.")
 
-        reference_post = None
-        if reference_post_id:
-            reference_post = ReferencePost.objects.filter(id=reference_post_id).first()
-            if not reference_post:
-                errors.append("Posto de referência inválido.")
+        reference_post = catalogue.get(reference_post_id)
+        if reference_post_id and not reference_post:
+            errors.append("Posto de referência inválido.")
 
         if errors:
             return render(
                 request,
                 "core/receber.html",
-                {"reference_posts": reference_posts, "errors": errors, "form": request.POST},
+                {"post_select": _post_select(), "errors": errors, "form": request.POST},
             )
 
-        Receiver.objects.create(
-            name=name,
-            whatsapp=whatsapp,
-            city=city,
-            neighborhood=neighborhood,
-            needed_kit=needed_kit,
-            reference_post=reference_post,
-            active=True,
-        )
+        try:
+            with write_atomic():  # como em doar: cadastro e pareamento juntos
+                receiver = Receiver.objects.create(
+                    name=name,
+                    whatsapp=whatsapp,
+                    city=city,
+                    neighborhood=neighborhood,
+                    needed_kit=needed_kit,
+                    reference_post_id=reference_post.id,
+                    active=True,
+                )
+                match = match_service.match_receiver(receiver)
+        except IntegrityError:
+            # outro POST com o mesmo WhatsApp ganhou a corrida (índice único parcial)
+            return render(
+                request,
+                "core/receber.html",
+                {
+                    "post_select": _post_select(),
+                    "errors": ["Este WhatsApp já está cadastrado como receptora."],
+                    "form": request.POST,
+                },
+            )
+
+        if match:
+            # ✅ Notificação (Caixa B)
+            messages.success(
+                request,
+                f"✨ Encontramos uma doação compatível! Seu código de retirada é: {match.pickup_code}"
+            )
+            return redirect("obrigada")
 
         # ✅ Notificação (Caixa B)
         messages.success(
@@ -278,7 +258,7 @@ def receber(request):
         )
         return redirect("obrigada")
 
-    return render(request, "core/receber.html", {"reference_posts": reference_posts})
+    return render_cached(request, "receber", "core/receber.html", lambda: {"post_select": _post_select()})
 
 
 # ---------------- RETIRADA (Dupla confirmação) ---------------- #
@@ -288,10 +268,19 @@ def pickup_screen(request):
     return render(request, "core/pickup.html")
 
 
+def _pickup_allowed(request, info):
+    """🔒 Operador/gestor só vê e confirma retiradas do próprio posto."""
+    profile = request.user.profile
+    if profile.role in ("manager", "operator"):
+        return bool(profile.reference_post_id) and info.reference_post_id == profile.reference_post_id
+    return True
+
+
 @role_required("admin", "manager", "operator")
 @require_http_methods(["POST"])
 def pickup_check(request):
-    pickup_code = (request.POST.get("pickup_code") or "").strip()
+    raw_code = request.POST.get("pickup_code") or ""
+    pickup_code = pickup.normalize_code(raw_code)
 
     if not pickup_code:
         return render(request, "core/pickup.html", {
@@ -299,9 +288,7 @@ def pickup_check(request):
             "msg_class": "bad",
         })
 
-    match = Match.objects.select_related("donor", "receiver", "reference_post").filter(
-        pickup_code=pickup_code
-    ).first()
+    match = pickup.lookup(raw_code)
 
     if not match:
         return render(request, "core/pickup.html", {
@@ -310,18 +297,15 @@ def pickup_check(request):
             "msg_class": "bad",
         })
 
-    # 🔒 Regra: operador/gestor só pode ver do próprio posto
-    profile = request.user.profile
-    if profile.role in ("manager", "operator"):
-        if not profile.reference_post or match.reference_post_id != profile.reference_post_id:
-            return render(request, "core/pickup.html", {
-                "pickup_code": pickup_code,
-                "msg": "Sem permissão: este código não pertence ao seu posto.",
-                "msg_class": "bad",
-            })
+    if not _pickup_allowed(request, match):
+        return render(request, "core/pickup.html", {
+            "pickup_code": pickup_code,
+            "msg": "Sem permissão: este código não pertence ao seu posto.",
+            "msg_class": "bad",
+        })
 
     return render(request, "core/pickup.html", {
-        "pickup_code": pickup_code,
+        "pickup_code": match.pickup_code,
         "match": match,
         "msg": "Código válido. Confira os dados e confirme a retirada.",
         "msg_class": "ok",
@@ -332,51 +316,287 @@ def pickup_check(request):
 @require_http_methods(["POST"])
 def pickup_confirm(request):
     match_id = request.POST.get("match_id")
-    pickup_code = (request.POST.get("pickup_code") or "").strip()
+    pickup_code = request.POST.get("pickup_code")
 
-    if not match_id or not pickup_code:
+    if not match_id or not pickup.normalize_code(pickup_code):
         return render(request, "core/pickup.html", {
             "msg": "Dados incompletos para confirmar.",
             "msg_class": "bad",
         })
 
-    match = Match.objects.select_related("donor", "receiver", "reference_post").filter(
-        id=match_id,
-        pickup_code=pickup_code,
-    ).first()
+    match = pickup.lookup(pickup_code)
 
-    if not match:
+    if not match or str(match.id) != match_id.strip():
         return render(request, "core/pickup.html", {
             "msg": "Não foi possível confirmar: match/código inválidos.",
             "msg_class": "bad",
         })
 
-    # 🔒 Regra: operador/gestor só pode confirmar no próprio posto
-    profile = request.user.profile
-    if profile.role in ("manager", "operator"):
-        if not profile.reference_post or match.reference_post_id != profile.reference_post_id:
-            return render(request, "core/pickup.html", {
-                "pickup_code": pickup_code,
-                "msg": "Sem permissão: este match não pertence ao seu posto.",
-                "msg_class": "bad",
-            })
-
-    if match.is_completed:
+    if not _pickup_allowed(request, match):
         return render(request, "core/pickup.html", {
-            "pickup_code": pickup_code,
-            "match": match,
-            "msg": "Este código já foi usado. Retirada já concluída.",
+            "pickup_code": match.pickup_code,
+            "msg": "Sem permissão: este match não pertence ao seu posto.",
             "msg_class": "bad",
         })
 
-    match.is_completed = True
-    match.save()
+    # o UPDATE condicional decide: quem chegou depois cai aqui, mesmo ao mesmo tempo
+    if match.is_completed or not pickup.confirm(match):
+        match = pickup.lookup(pickup_code, fresh=True) or match
+        return render(request, "core/pickup.html", {
+            "pickup_code": match.pickup_code,
+            "match": match,
+            "msg": "Este código já foi usado. Retirada já concluída." if match.is_completed
+            else "Não foi possível confirmar: o match mudou. Verifique o código de novo.",
+            "msg_class": "bad",
+        })
 
     messages.success(request, "✅ Retirada confirmada com sucesso.")
 
     return render(request, "core/pickup.html", {
-        "pickup_code": pickup_code,
-        "match": match,
+        "pickup_code": match.pickup_code,
+        "match": match._replace(is_completed=True),
         "msg": "Retirada confirmada com sucesso ✅",
         "msg_class": "ok",
-    })
\ No newline at end of file
+    })
+
+
+# ---------------- API: FEED DE MATCHES PENDENTES ---------------- #
+
+FEED_PAGE_SIZE = 100
+FEED_MAX_PAGE_SIZE = 1000
+
+
+def _bearer_ok(request, expected) -> bool:
+    auth = request.headers.get("Authorization", "")
+    return bool(expected) and auth.startswith("Bearer ") and hmac.compare_digest(
+        auth[len("Bearer "):].encode(), expected.encode()
+    )
+
+
+def api_token_or_staff(view_func):
+    """Aceita "Authorization: Bearer <MATCHES_API_TOKEN>" ou usuário staff logado."""
+    @wraps(view_func)
+    def _wrapped(request, *args, **kwargs):
+        token_ok = _bearer_ok(request, getattr(settings, "MATCHES_API_TOKEN", ""))
+        if not token_ok and not request.user.is_staff:
+            return HttpResponseForbidden("Acesso negado.")
+        return view_func(request, *args, **kwargs)
+    return _wrapped
+
+
+def encode_cursor(created_at, match_id) -> str:
+    raw = f"{created_at.isoformat()}|{match_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """(created_at, id) do cursor opaco; ValueError se estiver corrompido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, match_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(match_id)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("cursor inválido") from exc
+
+
+def _feed_page_size(request) -> int:
+    try:
+        size = int(request.GET.get("limit", FEED_PAGE_SIZE))
+    except ValueError:
+        size = FEED_PAGE_SIZE
+    return max(1, min(size, FEED_MAX_PAGE_SIZE))
+
+
+def _matches_feed_etag(request):
+    """
+    Uma consulta agregada (pendentes e as mensagens deles no Outbox) basta
+    para saber se o feed mudou: match novo sobe o Max(id), retirada concluída
+    baixa o Count, e cada mudança de situação de uma mensagem mexe na contagem
+    por situação ou na soma de tentativas (toda tentativa de envio soma uma).
+    """
+    state = Match.objects.filter(is_completed=False).aggregate(
+        n=Count("id", distinct=True),
+        last=Max("id"),
+        attempts=Sum("outbox__attempts"),
+        **{status: Count("outbox", filter=Q(outbox__status=status)) for status, _ in Outbox.STATUS_CHOICES},
+    )
+    raw = ":".join(str(state[name]) for name in sorted(state))
+    raw += f":{request.GET.get('cursor', '')}:{_feed_page_size(request)}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def _outbox_status(recipient):
+    """Situação da mensagem do match para `recipient` no Outbox (None se não houver)."""
+    return Subquery(Outbox.objects.filter(match=OuterRef("pk"), recipient=recipient).values("status")[:1])
+
+
+def _feed_item(match):
+    return {
+        "id": match.id,
+        "created_at": match.created_at.isoformat(),
+        "pickup_code": match.pickup_code,
+        "kit": match.donor.kit_type,
+        "reference_post": {
+            "id": match.reference_post_id,
+            "name": match.reference_post.name,
+            "city": match.reference_post.city,
+        },
+        "donor": {"name": match.donor.name, "whatsapp": match.donor.whatsapp},
+        "receiver": {"name": match.receiver.name, "whatsapp": match.receiver.whatsapp},
+        # situação no Outbox (PENDING, SENDING, SENT, DEAD): o notify_worker já mandou?
+        "notification": {"donor": match.donor_notification, "receiver": match.receiver_notification},
+        # o que o whatsapp_bot envia
+        "phone": match.receiver.whatsapp,
+        "message": build_match_message(match),
+    }
+
+
+def _stream_feed(request, queryset, page_size):
+    yield '{"matches":['
+    last = None
+    for n, match in enumerate(queryset.iterator(chunk_size=500)):
+        if n == page_size:  # a linha a mais só diz que existe próxima página
+            break
+        yield ("," if n else "") + json.dumps(_feed_item(match), ensure_ascii=False)
+        last = match
+    else:
+        last = None
+
+    next_url = None
+    if last is not None:
+        query = {"cursor": encode_cursor(last.created_at, last.id)}
+        if "limit" in request.GET:
+            query["limit"] = page_size
+        next_url = request.build_absolute_uri(f"{request.path}?{urlencode(query)}")
+    yield '],"next":' + json.dumps(next_url) + "}"
+
+
+@require_GET
+@api_token_or_staff
+@condition(etag_func=_matches_feed_etag)
+def matches_feed(request):
+    """
+    Matches ainda não retirados, do mais antigo para o mais novo:
+        {"matches": [...], "next": "<url da próxima página>" | null}
+    "Pendente" aqui é a retirada (is_completed); a entrega das notificações
+    vem em cada item, em "notification", lida do Outbox na mesma query.
+    Paginação por cursor em (created_at, id): cada página custa o mesmo,
+    não importa a profundidade. Com If-None-Match devolve 304 se nada mudou
+    (nem match, nem situação de mensagem).
+    """
+    page_size = _feed_page_size(request)
+    queryset = (
+        Match.objects.select_related("donor", "receiver", "reference_post")
+        .filter(is_completed=False)
+        .annotate(donor_notification=_outbox_status("DONOR"), receiver_notification=_outbox_status("RECEIVER"))
+        .order_by("created_at", "id")
+    )
+    if request.GET.get("cursor"):
+        try:
+            created_at, match_id = decode_cursor(request.GET["cursor"])
+        except ValueError:
+            return HttpResponseBadRequest("Cursor inválido.")
+        # o ">=" isolado deixa o banco começar a leitura do índice no cursor
+        queryset = queryset.filter(created_at__gte=created_at).filter(
+            Q(created_at__gt=created_at) | Q(id__gt=match_id)
+        )
+
+    response = StreamingHttpResponse(
+        _stream_feed(request, queryset[:page_size + 1], page_size),
+        content_type="application/json; charset=utf-8",
+    )
+    response["Cache-Control"] = "private, no-cache"
+    response["Vary"] = "Authorization, Cookie"
+    return response
+
+
+# ---------------- ADMIN: RELATÓRIOS ---------------- #
+
+@staff_member_required
+def admin_reports(request):
+    """
+    Lê só o resumo incremental (ReportRollup): uma linha por posto e kit,
+    mais os 10 últimos matches pela chave primária.
+    """
+    context = {
+        **admin.site.each_context(request),
+        **reports.summary(),
+        "title": "Relatórios",
+        "recent": Match.objects.select_related("donor", "receiver", "reference_post").order_by("-id")[:10],
+    }
+    return render(request, "admin/reports.html", context)
+
+
+@staff_member_required
+def admin_reports_csv(request):
+    data = reports.summary()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["posto", "cidade", "receptoras_ativas", "matches", "pendentes", "entregues"])
+    for row in data["posts"]:
+        writer.writerow([
+            row["post"].name, row["post"].city, row["receivers_active"],
+            row["matches_total"], row["matches_pending"], row["matches_delivered"],
+        ])
+    response = HttpResponse("\ufeff" + buffer.getvalue(), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="relatorio-{timezone.localdate():%Y%m%d}.csv"'
+    return response
+
+
+# ---------------- ADMIN: PERFIS (core.utils.profiler) ---------------- #
+
+@staff_member_required
+def admin_profiles(request):
+    """Perfis guardados, mais um token novo para perfilar requisições sob pedido."""
+    config = getattr(settings, "PROFILER", {})
+    context = {
+        **admin.site.each_context(request),
+        "title": "Perfis de requisições",
+        "profiles": profiler.list_profiles(),
+        "token": profiler.make_token(request.user),
+        "header": profiler.HEADER,
+        "query_param": profiler.QUERY_PARAM,
+        "token_minutes": config.get("TOKEN_MAX_AGE", 3600) // 60,
+        "sample_rate": config.get("SAMPLE_RATE", 0),
+        "max_profiles": config.get("MAX_PROFILES", 200),
+    }
+    return render(request, "admin/profiles.html", context)
+
+
+@staff_member_required
+def admin_profile_detail(request, profile_id):
+    sort = request.GET.get("sort", "cumulative")
+    text = profiler.report(profile_id, sort)
+    if text is None:
+        raise Http404("Perfil não encontrado (o buffer já pode ter descartado).")
+    context = {
+        **admin.site.each_context(request),
+        "title": f"Perfil {profile_id}",
+        "meta": profiler.load_meta(profile_id) or {},
+        "profile_id": profile_id,
+        "report": text,
+        "sort": sort,
+        "sorts": profiler.SORTS,
+    }
+    return render(request, "admin/profile_detail.html", context)
+
+
+@staff_member_required
+def admin_profile_download(request, profile_id):
+    """O .prof cru (python -m pstats, snakeviz...)."""
+    path = profiler.profile_path(profile_id)
+    if path is None:
+        raise Http404("Perfil não encontrado.")
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=path.name)
+
+
+# ---------------- MÉTRICAS (Prometheus) ---------------- #
+
+@require_GET
+def metrics_view(request):
+    """Soma de todos os workers (core.utils.metrics). Bearer <METRICS["TOKEN"]> ou staff."""
+    if not _bearer_ok(request, getattr(settings, "METRICS", {}).get("TOKEN", "")) and not request.user.is_staff:
+        return HttpResponseForbidden("Acesso negado.")
+    response = HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+    response["Cache-Control"] = "no-store"
+    return response
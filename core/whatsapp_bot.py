@@ -1,58 +1,207 @@
+"""
+Bot de envio pelo WhatsApp Web (Selenium), em lote.
+
+- Uma única sessão do navegador para a fila inteira.
+- Checkpoint em disco depois de cada envio: se cair, recomeça de onde parou.
+- Esperas explícitas (sessão pronta, caixa de mensagem, caixa vazia depois
+  do ENTER) no lugar de input()/sleep fixos.
+- Latência por mensagem e resumo no final.
+
+Uso:
+    python -m core.whatsapp_bot --headless --profile-dir ~/.cs-chrome
+
+Para testar sem rede, aponte --home-url/--send-url para core/whatsapp_standin.html.
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
 import time
 import urllib.parse
-import requests
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+import urllib.request
+from pathlib import Path
 
-API_URL = "http://127.0.0.1:8000/api/matches/"
+API_URL = os.environ.get("CS_BOT_API_URL", "http://127.0.0.1:8000/api/matches/")
+API_TOKEN = os.environ.get("CS_BOT_API_TOKEN", "")
+HOME_URL = "https://web.whatsapp.com"
+SEND_URL = "https://web.whatsapp.com/send?phone={phone}&text={text}"
+PROFILE_DIR = os.environ.get(
+    "CS_BOT_PROFILE_DIR",
+    str(Path.home() / ".coracao_solidario" / "chrome-profile"),
+)
+CHECKPOINT_PATH = "whatsapp_bot_checkpoint.json"
 
-def start_bot():
+# seletores (By.CSS_SELECTOR == "css selector")
+SESSION_READY = ("css selector", "#pane-side")
+MESSAGE_BOX = ("css selector", "div[data-tab='10'][contenteditable='true']")
 
-    print("Carregando API...")
-    response = requests.get(API_URL)
-    data = response.json()
-    matches = data.get("matches", [])
 
-    if not matches:
-        print("Nenhum match encontrado.")
-        return
+# ---------------- FILA (API) ---------------- #
+
+def fetch_matches(api_url=API_URL, token=API_TOKEN):
+    """Baixa todas as páginas do feed de matches (segue o link "next")."""
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    matches = []
+    url = api_url
+    while url:
+        request = urllib.request.Request(url, headers=headers)
+        with urllib.request.urlopen(request, timeout=30) as response:
+            data = json.load(response)
+        matches.extend(data.get("matches", []))
+        url = data.get("next") and urllib.parse.urljoin(url, data["next"])
+    return matches
+
+
+def item_key(item):
+    if item.get("id") is not None:
+        return str(item["id"])
+    digest = hashlib.sha1(item["message"].encode()).hexdigest()[:12]
+    return f"{item['phone']}:{digest}"
+
+
+# ---------------- CHECKPOINT ---------------- #
+
+class Checkpoint:
+    """Conjunto de mensagens já enviadas, persistido a cada envio."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.done = set()
+        if self.path.exists():
+            self.done = set(json.loads(self.path.read_text(encoding="utf-8")).get("sent", []))
+
+    def __contains__(self, key):
+        return key in self.done
+
+    def mark(self, key):
+        self.done.add(key)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps({"sent": sorted(self.done)}), encoding="utf-8")
+        os.replace(tmp, self.path)  # troca atômica: nunca fica um arquivo pela metade
+
+
+def run_batch(items, send_one, checkpoint, log=print):
+    """
+    Envia cada item ainda não marcado no checkpoint com send_one(phone, message).
+    Devolve um resumo com enviados, pulados, falhas e latências (s).
+    """
+    stats = {"sent": 0, "skipped": 0, "failed": 0, "latencies": []}
+    for item in items:
+        key = item_key(item)
+        if key in checkpoint:
+            stats["skipped"] += 1
+            continue
+
+        start = time.perf_counter()
+        try:
+            send_one(item["phone"], item["message"])
+        except Exception as exc:
+            stats["failed"] += 1
+            log(f"❌ {item['phone']}: {exc}")
+            continue
+        elapsed = time.perf_counter() - start
 
-    print(f"Encontrados {len(matches)} matches para enviar (modo TESTE).")
+        checkpoint.mark(key)
+        stats["sent"] += 1
+        stats["latencies"].append(elapsed)
+        log(f"✅ {item['phone']} em {elapsed * 1000:.0f} ms")
+    return stats
+
+
+# ---------------- NAVEGADOR ---------------- #
+
+def open_driver(profile_dir=PROFILE_DIR, headless=False):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
 
     chrome_options = Options()
-    chrome_options.add_argument(r"--user-data-dir=C:\Users\User\AppData\Local\Google\Chrome\User Data")
+    chrome_options.add_argument(f"--user-data-dir={profile_dir}")
+    if headless:
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--window-size=1280,900")
+    return webdriver.Chrome(options=chrome_options)
 
-    driver = webdriver.Chrome(options=chrome_options)
 
-    driver.get("https://web.whatsapp.com")
-    input("Escaneie o QR Code e pressione ENTER aqui no terminal...")
+class WhatsAppWeb:
+    def __init__(self, driver, home_url=HOME_URL, send_url=SEND_URL, timeout=30):
+        self.driver = driver
+        self.home_url = home_url
+        self.send_url = send_url
+        self.timeout = timeout
 
-    m = matches[0]
-    phone = m["phone"]
-    msg = m["message"]
+    def _wait(self, timeout=None):
+        from selenium.webdriver.support.ui import WebDriverWait
 
-    print(f"Enviando mensagem para {phone}...")
+        return WebDriverWait(self.driver, timeout or self.timeout)
 
-    texto = urllib.parse.quote(msg)
-    link = f"https://web.whatsapp.com/send?phone={phone}&text={texto}"
-    driver.get(link)
+    def wait_ready(self, login_timeout=120):
+        """Abre o WhatsApp Web e espera a lista de conversas (sessão logada / QR lido)."""
+        from selenium.webdriver.support import expected_conditions as EC
 
-    # ESPERAR A CAIXA DE TEXTO APARECER
-    try:
-        print("Aguardando a caixa de mensagem aparecer...")
-        caixa = WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "div[data-tab='10'][contenteditable='true']"))
+        self.driver.get(self.home_url)
+        self._wait(login_timeout).until(EC.presence_of_element_located(SESSION_READY))
+
+    def send(self, phone, message):
+        from selenium.webdriver.common.keys import Keys
+        from selenium.webdriver.support import expected_conditions as EC
+
+        link = self.send_url.format(
+            phone=urllib.parse.quote(phone),
+            text=urllib.parse.quote(message),
         )
-        print("Caixa encontrada! Enviando mensagem...")
+        self.driver.get(link)
+        caixa = self._wait().until(EC.element_to_be_clickable(MESSAGE_BOX))
         caixa.send_keys(Keys.ENTER)
+        # enviada = caixa esvaziada pelo próprio WhatsApp
+        self._wait().until(lambda d: not caixa.text.strip())
+
+
+# ---------------- CLI ---------------- #
+
+def _report(stats):
+    print(
+        f"\nEnviadas: {stats['sent']} | já enviadas antes: {stats['skipped']} | falhas: {stats['failed']}"
+    )
+    latencies = sorted(stats["latencies"])
+    if latencies:
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(
+            f"Latência por mensagem: p50 {statistics.median(latencies) * 1000:.0f} ms | "
+            f"p95 {p95 * 1000:.0f} ms | máx {latencies[-1] * 1000:.0f} ms"
+        )
 
-        print("Mensagem enviada com sucesso! 🎉")
 
-    except Exception as e:
-        print("❌ Erro ao enviar mensagem:", e)
+def start_bot(argv=None):
+    parser = argparse.ArgumentParser(description="Envia pelo WhatsApp Web as mensagens do feed de matches.")
+    parser.add_argument("--api-url", default=API_URL)
+    parser.add_argument("--token", default=API_TOKEN)
+    parser.add_argument("--profile-dir", default=PROFILE_DIR)
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    parser.add_argument("--home-url", default=HOME_URL)
+    parser.add_argument("--send-url", default=SEND_URL, help="Modelo com {phone} e {text}.")
+    parser.add_argument("--login-timeout", type=int, default=120)
+    args = parser.parse_args(argv)
+
+    print("Carregando API...")
+    matches = fetch_matches(args.api_url, args.token)
+    if not matches:
+        print("Nenhum match encontrado.")
+        return
+
+    checkpoint = Checkpoint(args.checkpoint)
+    print(f"Encontrados {len(matches)} matches ({len(checkpoint.done)} já enviados antes).")
+
+    driver = open_driver(args.profile_dir, args.headless)
+    try:
+        web = WhatsAppWeb(driver, args.home_url, args.send_url)
+        print("Aguardando sessão do WhatsApp Web (leia o QR Code se pedir)...")
+        web.wait_ready(args.login_timeout)
+        _report(run_batch(matches, web.send, checkpoint))
+    finally:
+        driver.quit()
+
 
-    time.sleep(5)
+if __name__ == "__main__":
+    start_bot()